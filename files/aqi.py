@@ -0,0 +1,154 @@
+# aqi.py
+"""
+Vectorized US EPA AQI computation shared by the Flask service (main.py) and
+the OpenAQ export script (fetch_openaq_last_month_country.py).
+
+Every function accepts scalars, lists, NumPy arrays or pandas Series and
+returns float arrays where NaN marks a missing / out-of-range value. The
+breakpoint segment for every concentration is located with a single
+np.searchsorted over the table's upper bounds, so a million rows costs a
+handful of array operations instead of a Python call per row.
+"""
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# (C_lo, C_hi, I_lo, I_hi) per pollutant, US EPA breakpoints.
+BREAKPOINTS = {
+    # 24-hr, ug/m3
+    'pm25': [
+        (0.0, 12.0, 0, 50),
+        (12.1, 35.4, 51, 100),
+        (35.5, 55.4, 101, 150),
+        (55.5, 150.4, 151, 200),
+        (150.5, 250.4, 201, 300),
+        (250.5, 350.4, 301, 400),
+        (350.5, 500.4, 401, 500),
+    ],
+    # 24-hr, ug/m3
+    'pm10': [
+        (0, 54, 0, 50),
+        (55, 154, 51, 100),
+        (155, 254, 101, 150),
+        (255, 354, 151, 200),
+        (355, 424, 201, 300),
+        (425, 504, 301, 400),
+        (505, 604, 401, 500),
+    ],
+    # 8-hr, ppm
+    'o3': [
+        (0.000, 0.054, 0, 50),
+        (0.055, 0.070, 51, 100),
+        (0.071, 0.085, 101, 150),
+        (0.086, 0.105, 151, 200),
+        (0.106, 0.200, 201, 300),
+    ],
+    # 1-hr, ppb
+    'no2': [
+        (0, 53, 0, 50),
+        (54, 100, 51, 100),
+        (101, 360, 101, 150),
+        (361, 649, 151, 200),
+        (650, 1249, 201, 300),
+        (1250, 1649, 301, 400),
+        (1650, 2049, 401, 500),
+    ],
+    # 1-hr, ppb
+    'so2': [
+        (0, 35, 0, 50),
+        (36, 75, 51, 100),
+        (76, 185, 101, 150),
+        (186, 304, 151, 200),
+        (305, 604, 201, 300),
+        (605, 804, 301, 400),
+        (805, 1004, 401, 500),
+    ],
+    # 8-hr, ppm
+    'co': [
+        (0.0, 4.4, 0, 50),
+        (4.5, 9.4, 51, 100),
+        (9.5, 12.4, 101, 150),
+        (12.5, 15.4, 151, 200),
+        (15.5, 30.4, 201, 300),
+        (30.5, 40.4, 301, 400),
+        (40.5, 50.4, 401, 500),
+    ],
+}
+
+# EPA truncates concentrations to the precision of the table before lookup,
+# which is what closes the gaps between consecutive segments (e.g. 12.0/12.1).
+TRUNCATION_DECIMALS = {'pm25': 1, 'pm10': 0, 'o3': 3, 'no2': 0, 'so2': 0, 'co': 1}
+
+# Column arrays built once at import time: c_lo, c_hi, i_lo, i_hi
+_TABLES = {
+    name: tuple(np.asarray(col, dtype=np.float64) for col in zip(*rows))
+    for name, rows in BREAKPOINTS.items()
+}
+
+
+def _as_float_array(values) -> np.ndarray:
+    """Coerce scalars / lists / Series (including None and pd.NA) to float64."""
+    if hasattr(values, 'to_numpy'):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        arr = np.array([np.nan if v is None else v for v in arr.ravel()],
+                       dtype=np.float64).reshape(arr.shape)
+    return arr.astype(np.float64, copy=False)
+
+
+def sub_index(pollutant: str, concentration, extrapolate: bool = False) -> np.ndarray:
+    """
+    AQI sub-index for one pollutant.
+
+    Concentrations above the last breakpoint are NaN unless `extrapolate`
+    is set, in which case the top segment's slope is continued (useful for
+    maps where "beyond the AQI" readings are common and must stay ordered).
+    """
+    c_lo, c_hi, i_lo, i_hi = _TABLES[pollutant]
+    c = _as_float_array(concentration)
+    scale = 10.0 ** TRUNCATION_DECIMALS[pollutant]
+    # small epsilon so 12.1 stored as 12.0999... is not truncated to 12.0
+    c = np.floor(c * scale + 1e-6) / scale
+
+    idx = np.searchsorted(c_hi, c, side='left')
+    above = idx >= len(c_hi)
+    seg = np.minimum(idx, len(c_hi) - 1)
+
+    with np.errstate(invalid='ignore'):
+        aqi = (i_hi[seg] - i_lo[seg]) / (c_hi[seg] - c_lo[seg]) * (c - c_lo[seg]) + i_lo[seg]
+        aqi = np.rint(aqi)
+        invalid = np.isnan(c) | (c < 0)
+    if not extrapolate:
+        invalid |= above
+    return np.where(invalid, np.nan, aqi)
+
+
+def compute_aqi(extrapolate: bool = False,
+                **concentrations) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Compute sub-indices and the overall AQI (max of the sub-indices).
+
+    Keyword arguments are pollutant names from BREAKPOINTS mapped to
+    array-likes of equal length; None arguments are skipped. Returns
+    ({pollutant: sub_index_array}, overall_array); the overall value is NaN
+    where every sub-index is missing.
+    """
+    subs = {}
+    for pollutant, values in concentrations.items():
+        if values is None:
+            continue
+        if pollutant not in _TABLES:
+            raise ValueError(f"Unknown pollutant '{pollutant}'")
+        subs[pollutant] = sub_index(pollutant, values, extrapolate=extrapolate)
+    if not subs:
+        raise ValueError("At least one pollutant concentration is required")
+    # fmax ignores NaN unless both operands are NaN, so no all-NaN warnings
+    overall = np.fmax.reduce(np.broadcast_arrays(*subs.values()))
+    return subs, overall
+
+
+def aqi_value(pollutant: str, concentration: Optional[float],
+              extrapolate: bool = False) -> Optional[int]:
+    """Scalar convenience wrapper: int AQI or None."""
+    val = sub_index(pollutant, concentration, extrapolate=extrapolate)
+    return None if np.isnan(val) else int(val)
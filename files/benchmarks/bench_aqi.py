@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized AQI (aqi.compute_aqi) vs. the previous row-wise
+`pivot.apply(compute_us_aqi, axis=1)` used by the OpenAQ export script.
+
+Usage (from files/):
+    python benchmarks/bench_aqi.py --rows 2000000 --legacy-rows 200000
+"""
+import os
+import sys
+import time
+import math
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from aqi import BREAKPOINTS, compute_aqi
+
+
+def _legacy_linear_aqi(c, bps):
+    if c is None or (isinstance(c, float) and math.isnan(c)):
+        return None
+    for c_lo, c_hi, i_lo, i_hi in bps:
+        if c_lo <= c <= c_hi:
+            return int(round((i_hi - i_lo) / (c_hi - c_lo) * (c - c_lo) + i_lo))
+    return None
+
+
+def _legacy_compute_us_aqi(pm25, pm10):
+    vals = [v for v in (_legacy_linear_aqi(pm25, BREAKPOINTS['pm25']),
+                        _legacy_linear_aqi(pm10, BREAKPOINTS['pm10'])) if v is not None]
+    return max(vals) if vals else None
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # table-precision values (as OpenAQ reports them) so both paths agree exactly
+    pm25 = np.round(rng.gamma(2.0, 40.0, rows), 1)
+    pm10 = np.round(rng.gamma(2.0, 80.0, rows))
+    pm25[rng.random(rows) < 0.05] = np.nan
+    pm10[rng.random(rows) < 0.2] = np.nan
+    return pd.DataFrame({'pm25': pm25, 'pm10': pm10})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=2_000_000)
+    ap.add_argument('--legacy-rows', type=int, default=200_000,
+                    help='rows timed with the row-wise path (it is slow)')
+    args = ap.parse_args()
+
+    df = make_frame(args.rows)
+
+    t0 = time.perf_counter()
+    _, aqi = compute_aqi(pm25=df['pm25'], pm10=df['pm10'])
+    vec_s = time.perf_counter() - t0
+
+    legacy = df.iloc[:args.legacy_rows]
+    t0 = time.perf_counter()
+    ref = legacy.apply(lambda r: _legacy_compute_us_aqi(
+        float(r['pm25']) if pd.notna(r['pm25']) else None,
+        float(r['pm10']) if pd.notna(r['pm10']) else None,
+    ), axis=1)
+    legacy_s = time.perf_counter() - t0
+
+    ref = ref.to_numpy(dtype=float, na_value=np.nan)
+    mismatches = int(np.sum(~np.isclose(ref, aqi[:len(ref)], equal_nan=True)))
+
+    vec_rate = args.rows / vec_s
+    legacy_rate = len(legacy) / legacy_s
+    print(f"vectorized : {args.rows:>10,} rows in {vec_s:8.3f}s ({vec_rate:,.0f} rows/s)")
+    print(f"row-wise   : {len(legacy):>10,} rows in {legacy_s:8.3f}s ({legacy_rate:,.0f} rows/s)")
+    print(f"speedup    : {vec_rate / legacy_rate:,.0f}x")
+    print(f"mismatches : {mismatches} of {len(ref):,} compared rows")
+
+
+if __name__ == '__main__':
+    main()
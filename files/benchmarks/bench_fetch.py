@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DataAggregator.fetch_all_data against a local stub server,
+comparing the previous serial loop (one city at a time plus a fixed
+sleep between calls) with the concurrent, token-bucket paced fetch.
+
+Usage (from files/):
+    python benchmarks/bench_fetch.py --latency 0.3 --legacy-sleep 1.0
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from main import DataAggregator, OpenAQClient, WAQIClient
+from rate_limit import TokenBucket
+from stub_aq_server import start_stub_server
+
+
+def legacy_fetch(aggregator, sleep_s):
+    data = list(aggregator.openaq_client.get_latest_measurements())
+    for city in aggregator.MAJOR_CITIES:
+        city_data = aggregator.waqi_client.get_city_data(city)
+        if city_data:
+            data.append(city_data)
+        time.sleep(sleep_s)
+    return data
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--latency', type=float, default=0.3, help='stub latency per request (s)')
+    ap.add_argument('--legacy-sleep', type=float, default=1.0, help='fixed sleep of the serial loop (s)')
+    ap.add_argument('--rate', type=float, default=10.0, help='WAQI token bucket rate (req/s)')
+    ap.add_argument('--workers', type=int, default=8)
+    args = ap.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def make_aggregator(rate_limiter):
+        return DataAggregator(
+            openaq_client=OpenAQClient(base_url=base),
+            waqi_client=WAQIClient('stub-token', base_url=base, rate_limiter=rate_limiter,
+                                   pool_size=args.workers),
+            max_workers=args.workers,
+        )
+
+    t0 = time.perf_counter()
+    legacy = legacy_fetch(make_aggregator(None), args.legacy_sleep)
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    concurrent = make_aggregator(TokenBucket(args.rate, args.rate)).fetch_all_data()
+    concurrent_s = time.perf_counter() - t0
+    server.shutdown()
+
+    print(f"serial + {args.legacy_sleep}s sleep : {len(legacy)} points in {legacy_s:.2f}s")
+    print(f"concurrent ({args.workers} workers, {args.rate:g} req/s) : "
+          f"{len(concurrent)} points in {concurrent_s:.2f}s")
+    print(f"speedup : {legacy_s / concurrent_s:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
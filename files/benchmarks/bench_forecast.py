@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiled forecast generation (forecast_engine) throughput in cells
+per second for different process-pool sizes. A synthetic RandomForest is
+trained, dumped with joblib and memory-mapped by every worker.
+
+Usage (from files/):
+    python benchmarks/bench_forecast.py --step 0.05 --days 14 --workers 1 2 4 8
+"""
+import os
+import sys
+import argparse
+import tempfile
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from config import Config
+from forecast_engine import FORECAST_FEATURES, grid_axes, measure_throughput
+
+
+def train_synthetic_model(n_estimators, rows=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(6, 38, rows), rng.uniform(68, 98, rows),
+        rng.gamma(2, 30, rows), rng.gamma(2, 50, rows),
+        *(rng.uniform(-1, 1, rows) for _ in range(len(FORECAST_FEATURES) - 4)),
+    ])
+    y = (20 + 30*X[:, 4] + 0.05*X[:, 2] + rng.normal(0, 5, rows)).clip(0, 100)
+    return RandomForestRegressor(n_estimators=n_estimators, n_jobs=-1, random_state=42).fit(X, y)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--step', type=float, default=0.1, help='grid step in degrees')
+    ap.add_argument('--days', type=int, default=3)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--tile-deg', type=float, default=Config.FORECAST_TILE_DEG)
+    ap.add_argument('--trees', type=int, default=100)
+    args = ap.parse_args()
+
+    lats, lons = grid_axes(Config.INDIA_BOUNDS, args.step)
+    daysofyear = [(100 + d) % 365 + 1 for d in range(args.days)]
+    tile_cells = max(1, int(round(args.tile_deg / args.step)))
+    print(f"grid {len(lats)} x {len(lons)} x {args.days} days = "
+          f"{len(lats) * len(lons) * args.days:,} cells, tiles of {tile_cells}x{tile_cells}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        model = train_synthetic_model(args.trees)
+        model.n_jobs = 1
+        joblib.dump({'model': model}, model_path)
+        base = None
+        for workers in args.workers:
+            m = measure_throughput(lats, lons, daysofyear, model_path, workers, tile_cells)
+            base = base or m['cells_per_second']
+            print(f"workers={workers:>2}  {m['seconds']:8.2f}s  {m['cells_per_second']:>12,.0f} cells/s  "
+                  f"({m['cells_per_second'] / base:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request interpolation (HeatmapGenerator at a fixed 0.1°
+step, best of --repeat runs) versus slicing the post-ingest heatmap
+pyramid (heatmap_pyramid.py), for a country-wide and a city-sized view.
+
+Reports the one-off pyramid build time, per-request latency and cells
+returned, and checks that the pyramid's 0.1° level matches griddata.
+
+Usage (from files/):
+    python benchmarks/bench_heatmap_pyramid.py --stations 2000 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from config import Config  # noqa: E402
+from heatmap_pyramid import HeatmapPyramidStore, interpolate_levels  # noqa: E402
+from main import HeatmapGenerator  # noqa: E402
+
+VIEWS = {
+    'country': dict(Config.INDIA_BOUNDS),
+    'city': {'north': 28.9, 'south': 28.4, 'east': 77.5, 'west': 76.8},
+}
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=2000)
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--max-cells', type=int, default=Config.HEATMAP_MAX_CELLS)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    region = Config.INDIA_BOUNDS
+    lat = rng.uniform(region['south'] - 1, region['north'] + 1, args.stations)
+    lon = rng.uniform(region['west'] - 1, region['east'] + 1, args.stations)
+    pm25 = rng.gamma(2.0, 25.0, args.stations)
+    sensor_data = [{'latitude': a, 'longitude': o, 'pm25': p} for a, o, p in zip(lat, lon, pm25)]
+
+    store = HeatmapPyramidStore(os.path.join(_tmp.name, 'pyramid'))
+    started = time.perf_counter()
+    levels = interpolate_levels(np.column_stack((lat, lon)), pm25, region, Config.HEATMAP_PYRAMID_STEPS)
+    store.write(1, levels, region, stations=args.stations)
+    print(f"pyramid build ({', '.join(f'{l.step:g}°' for l in levels)}; "
+          f"{sum(l.values.size for l in levels):,} cells): {time.perf_counter() - started:.2f}s")
+    pyramid = store.load()
+
+    fine = [l for l in pyramid.levels if l.step == 0.1][0]
+    _, _, expected = HeatmapGenerator.generate_grid_arrays(sensor_data, VIEWS['country'], 0.1)
+    assert np.allclose(np.sort(fine.arrays(VIEWS['country'])[2]), np.sort(expected), atol=1e-3), \
+        "pyramid 0.1° level differs from griddata"
+    print("pyramid 0.1° level matches griddata")
+
+    print(f"{args.stations} stations, max_cells {args.max_cells:,}")
+    for name, bounds in VIEWS.items():
+        old_s, old = timed(lambda: HeatmapGenerator.generate_grid_arrays(sensor_data, bounds, 0.1), args.repeat)
+        level = pyramid.select(bounds, args.max_cells)
+        new_s, new = timed(lambda: level.arrays(bounds), args.repeat)
+        print(f"{name:8s} per request 0.1°: {old_s * 1e3:8.1f} ms {len(old[2]):7,} cells   "
+              f"pyramid {level.step:g}°: {new_s * 1e3:7.2f} ms {len(new[2]):7,} cells")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: heatmap input as every reading of the last --hours versus one
+value per station (rollups.station_values: latest reading or time-decayed
+mean), then linear interpolation onto a 0.1° grid over India.
+
+Stations report every --interval-min minutes; each reading is the station's
+true PM2.5 at that time (a smooth field rising by --trend over the window)
+plus sensor noise. Reports, per input:
+  - rows interpolated and time to reduce + interpolate (the interpolator
+    keeps its triangulation and weights, as between ingests in main.py);
+  - MAE against the true field *now*, at the stations and on the grid.
+
+Usage (from files/):
+    python benchmarks/bench_heatmap_station_values.py --stations 2000 --hours 6 --interval-min 30
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import rollups  # noqa: E402
+from interpolation import LinearInterpolator  # noqa: E402
+from spatial_index import cell_id  # noqa: E402
+
+REGION = {'north': 37.6, 'south': 6.4, 'east': 97.25, 'west': 68.7}
+
+
+def field(lat, lon, progress, trend):
+    """PM2.5 at window progress 0 (oldest) .. 1 (now)"""
+    base = 60 + 25 * np.sin(lat / 3.0) * np.cos(lon / 4.0) + 1.5 * (lat - 20)
+    return base * (1 + trend * progress)
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=2000)
+    ap.add_argument('--hours', type=float, default=6.0)
+    ap.add_argument('--interval-min', type=float, default=30.0)
+    ap.add_argument('--trend', type=float, default=0.4)
+    ap.add_argument('--noise', type=float, default=8.0)
+    ap.add_argument('--half-life-min', type=float, default=60.0)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(REGION['south'] - 1, REGION['north'] + 1, args.stations)
+    lon = rng.uniform(REGION['west'] - 1, REGION['east'] + 1, args.stations)
+    cells = cell_id(lat, lon)
+    now = datetime(2024, 1, 1, 18)
+    offsets = np.arange(0, args.hours * 60, args.interval_min)  # minutes before now
+    frames = []
+    for minutes in offsets:
+        progress = 1 - minutes / (args.hours * 60)
+        frames.append(pd.DataFrame({
+            'source': 'bench', 'cell': cells, 'latitude': lat, 'longitude': lon,
+            'pm25': field(lat, lon, progress, args.trend) + rng.normal(0, args.noise, args.stations),
+            'timestamp': now - timedelta(minutes=float(minutes)),
+        }))
+    raw = pd.concat(frames, ignore_index=True).sample(frac=1.0, random_state=0)
+    truth_at_stations = field(lat, lon, 1.0, args.trend)
+
+    grid_lat, grid_lon = np.meshgrid(np.arange(REGION['south'], REGION['north'], 0.1),
+                                     np.arange(REGION['west'], REGION['east'], 0.1), indexing='ij')
+    targets = np.column_stack((grid_lat.ravel(), grid_lon.ravel()))
+    truth_on_grid = field(targets[:, 0], targets[:, 1], 1.0, args.trend)
+    half_life = timedelta(minutes=args.half_life_min)
+
+    latest = rollups.station_values(raw, rollups.LATEST)
+    assert len(latest) == args.stations and (latest['readings'] == len(offsets)).all()
+    assert (latest['timestamp'] == pd.Timestamp(now)).all()
+    decayed = rollups.station_values(raw, rollups.DECAY, half_life)
+    weights = np.exp2(-offsets / args.half_life_min)
+    by_cell = raw.pivot_table(index='cell', columns='timestamp', values='pm25').loc[cells]
+    expected = (by_cell.to_numpy()[:, ::-1] * weights).sum(axis=1) / weights.sum()
+    assert np.allclose(decayed.set_index('cell')['pm25'].loc[cells].to_numpy(), expected)
+
+    print(f"{args.stations} stations x {len(offsets)} readings ({args.hours:g} h every {args.interval_min:g} min), "
+          f"trend +{args.trend:.0%}, noise {args.noise:g}")
+    interpolator = LinearInterpolator()
+    points = raw[['latitude', 'longitude']].to_numpy()
+
+    def all_readings():
+        # duplicate coordinates are averaged: the unweighted mean over the window
+        return interpolator.interpolate(points, raw['pm25'].to_numpy(), targets, targets_key='grid'), \
+            raw.groupby('cell')['pm25'].mean().loc[cells].to_numpy()
+
+    def per_station(mode):
+        def run():
+            stations = rollups.station_values(raw, mode, half_life)
+            grid = interpolator.interpolate(stations[['latitude', 'longitude']].to_numpy(),
+                                            stations['pm25'].to_numpy(), targets, targets_key='grid')
+            return grid, stations.set_index('cell')['pm25'].loc[cells].to_numpy()
+        return run
+
+    cases = (('all readings', len(raw), all_readings),
+             ('latest', args.stations, per_station(rollups.LATEST)),
+             (f'decay ({args.half_life_min:g} min)', args.stations, per_station(rollups.DECAY)))
+    for name, rows, fn in cases:
+        fn()  # warm the triangulation / weight caches
+        seconds, (grid, station_values) = best_of(fn, args.repeat)
+        covered = ~np.isnan(grid)
+        print(f"{name:18s} {rows:7,} rows  {seconds * 1e3:7.1f} ms  "
+              f"station MAE {np.abs(station_values - truth_at_stations).mean():6.2f}  "
+              f"grid MAE {np.abs(grid[covered] - truth_on_grid[covered]).mean():6.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full retrain versus incremental (warm-start) training of the
+allergen model, on synthetic hourly station data.
+
+After an initial full fit on `--days` days, each simulated day of new data
+is trained on in two ways:
+  - full: refit a new forest on the whole trailing window (what
+    train_and_persist always did),
+  - incremental: add INCREMENTAL_TREES trees fitted on that day only,
+    keeping at most MODEL_MAX_TREES trees (train_model's incremental mode).
+Both models are then scored on the following day, which neither has seen.
+Reports fit time and validation MAE/RMSE per mode.
+
+Usage (from files/):
+    python benchmarks/bench_incremental_training.py --stations 100 --days 30 --updates 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from train_allergen import evaluate, featurize, fit_forest  # noqa: E402
+
+
+def station_days(rng, stations, start, days):
+    """Hourly readings for `days` days with a drifting synthetic pollen signal"""
+    lat = rng.uniform(8, 37, stations)
+    lon = rng.uniform(68, 97, stations)
+    hours = pd.date_range(start, periods=days * 24, freq='h')
+    ts = np.repeat(hours.values, stations)
+    df = pd.DataFrame({'lat': np.tile(lat, len(hours)), 'lon': np.tile(lon, len(hours)), 'timestamp': ts})
+    df['pm25'] = rng.gamma(2.0, 20.0, len(df))
+    df['pm10'] = df['pm25'] * rng.uniform(1.2, 2.0, len(df))
+    df['dayofyear'] = df['timestamp'].dt.dayofyear
+    season = 30 * np.sin(2 * np.pi * df['dayofyear'] / 365.0)
+    diurnal = 10 * np.sin(2 * np.pi * df['timestamp'].dt.hour / 24.0)
+    north = 0.8 * (df['lat'] - 20)
+    df['pollen_index'] = (40 + season + diurnal + north + 0.1 * df['pm25']
+                          + rng.normal(0, 5, len(df))).clip(0, 100)
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=100)
+    ap.add_argument('--days', type=int, default=30)
+    ap.add_argument('--updates', type=int, default=5)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+    start = datetime(2026, 3, 1)
+
+    history = station_days(rng, args.stations, start, args.days)
+    started = time.perf_counter()
+    incremental = fit_forest(featurize(history), history['pollen_index'])
+    print(f"initial full fit on {len(history):,} rows: {time.perf_counter() - started:.2f}s")
+
+    results = {'full': [], 'incremental': []}
+    day = start + timedelta(days=args.days)
+    rng_days = np.random.default_rng(1)
+    new = station_days(rng_days, args.stations, day, 1)
+    for _ in range(args.updates):
+        history = pd.concat([history, new], ignore_index=True)
+        window = history[history['timestamp'] >= pd.Timestamp(day + timedelta(days=1) - timedelta(days=args.days))]
+        day += timedelta(days=1)
+        following = station_days(rng_days, args.stations, day, 1)
+        X_next, y_next = featurize(following), following['pollen_index']
+
+        started = time.perf_counter()
+        full = fit_forest(featurize(window), window['pollen_index'])
+        results['full'].append((time.perf_counter() - started, len(window), evaluate(full, X_next, y_next)))
+
+        started = time.perf_counter()
+        incremental = fit_forest(featurize(new), new['pollen_index'], model=incremental)
+        results['incremental'].append((time.perf_counter() - started, len(new),
+                                       evaluate(incremental, X_next, y_next)))
+        new = following
+
+    print(f"{args.updates} daily updates, {args.stations} stations, {args.days}-day window")
+    for mode, runs in results.items():
+        seconds = np.mean([r[0] for r in runs])
+        rows = np.mean([r[1] for r in runs])
+        mae = np.mean([r[2]['val_mae'] for r in runs])
+        rmse = np.mean([r[2]['val_rmse'] for r in runs])
+        print(f"{mode:12s} fit {seconds:7.2f}s on {rows:9,.0f} rows  next-day MAE {mae:6.2f}  RMSE {rmse:6.2f}")
+    print(f"incremental forest: {len(incremental.estimators_)} trees")
+
+
+if __name__ == '__main__':
+    main()
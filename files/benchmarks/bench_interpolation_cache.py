@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scipy griddata(method='linear') versus LinearInterpolator
+(interpolation.py), which caches the Delaunay triangulation and the
+barycentric weights for a station set and target grid.
+
+LinearInterpolator cases:
+  - cold: new station set (triangulate, locate targets, build weights),
+  - new grid: same stations, different target grid (reuses the triangulation),
+  - warm: same stations and grid with new values (one sparse mat-vec), with
+    the grid identified by hashing the targets or by a caller-supplied key.
+Results are checked against griddata.
+
+Usage (from files/):
+    python benchmarks/bench_interpolation_cache.py --stations 2000 --grid 300 --repeat 10
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from scipy.interpolate import griddata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from interpolation import LinearInterpolator  # noqa: E402
+
+
+def grid_targets(n, offset=0.0):
+    lat, lon = np.meshgrid(np.linspace(8 + offset, 37, n), np.linspace(68 + offset, 97, n), indexing='ij')
+    return np.column_stack((lat.ravel(), lon.ravel()))
+
+
+def best_of(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=2000)
+    ap.add_argument('--grid', type=int, default=300)
+    ap.add_argument('--repeat', type=int, default=10)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack((rng.uniform(7, 38, args.stations), rng.uniform(67, 98, args.stations)))
+    targets = grid_targets(args.grid)
+    other_targets = grid_targets(args.grid, offset=0.05)
+    value_sets = [rng.gamma(2.0, 25.0, args.stations) for _ in range(args.repeat)]
+
+    griddata_s, expected = best_of(lambda: griddata(points, value_sets[-1], targets, method='linear',
+                                                    fill_value=50), args.repeat)
+
+    def cold():
+        # a fresh cache each time: triangulation and weights are rebuilt
+        return LinearInterpolator().interpolate(points, value_sets[0], targets, fill_value=50)
+    cold_s, _ = best_of(cold, args.repeat)
+
+    interpolator = LinearInterpolator()
+    interpolator.interpolate(points, value_sets[0], targets, fill_value=50)
+    interpolator.interpolate(points, value_sets[0], targets, fill_value=50, targets_key='grid')
+    values = iter(value_sets * 2)
+    hashed_s, _ = best_of(lambda: interpolator.interpolate(points, next(values), targets, fill_value=50),
+                          args.repeat)
+    keyed_s, _ = best_of(lambda: interpolator.interpolate(points, next(values), targets, fill_value=50,
+                                                          targets_key='grid'), args.repeat)
+    for key in (None, 'grid'):
+        actual = interpolator.interpolate(points, value_sets[-1], targets, fill_value=50, targets_key=key)
+        assert np.allclose(actual, expected, equal_nan=True), "cached interpolation differs from griddata"
+
+    started = time.perf_counter()
+    shifted = interpolator.interpolate(points, value_sets[0], other_targets, fill_value=50)
+    new_grid_s = time.perf_counter() - started
+    assert np.allclose(shifted, griddata(points, value_sets[0], other_targets, method='linear', fill_value=50))
+    print("results match griddata")
+
+    print(f"{args.stations} stations -> {args.grid}x{args.grid} grid ({len(targets):,} targets)")
+    print(f"griddata per call:           {griddata_s * 1e3:8.2f} ms")
+    print(f"LinearInterpolator cold:     {cold_s * 1e3:8.2f} ms")
+    print(f"LinearInterpolator new grid: {new_grid_s * 1e3:8.2f} ms")
+    print(f"LinearInterpolator warm:     {hashed_s * 1e3:8.2f} ms  (targets hashed)")
+    print(f"LinearInterpolator warm:     {keyed_s * 1e3:8.2f} ms  (targets_key; "
+          f"{griddata_s / keyed_s:.0f}x faster than griddata)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the heatmap interpolation engines in interpolation.py
+(linear, idw, nearest, gp) on a synthetic PM2.5 field sampled at clustered
+stations (city clusters plus sparse rural sites).
+
+For each engine reports:
+  - k-fold cross-validated MAE / RMSE at held-out stations, and the share of
+    held-out stations the engine covers (linear: convex hull; the others:
+    within --max-distance-km of a station);
+  - latency onto a --step degree grid over India: cold (new station set)
+    and warm (same stations, new values; gp has no warm path);
+  - the share of grid cells with a value.
+
+Usage (from files/):
+    python benchmarks/bench_interpolation_kernels.py --stations 2000 --folds 5 --step 0.1
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from interpolation import (GaussianProcessInterpolator, IDWInterpolator, LinearInterpolator,  # noqa: E402
+                           NearestInterpolator)
+
+REGION = {'north': 37.6, 'south': 6.4, 'east': 97.25, 'west': 68.7}
+
+
+def field(lat, lon):
+    """Smooth background plus city hotspots, roughly PM2.5-like."""
+    base = 60 + 25 * np.sin(lat / 3.0) * np.cos(lon / 4.0) + 1.5 * (lat - 20)
+    hotspots = ((28.6, 77.2, 90), (22.6, 88.4, 60), (19.1, 72.9, 40), (26.8, 80.9, 70), (13.1, 80.3, 30))
+    for h_lat, h_lon, amplitude in hotspots:
+        base = base + amplitude * np.exp(-((lat - h_lat) ** 2 + (lon - h_lon) ** 2) / (2 * 1.2 ** 2))
+    return base
+
+
+def stations(rng, n):
+    n_city = int(n * 0.7)
+    centres = np.column_stack((rng.uniform(9, 34, 30), rng.uniform(70, 95, 30)))
+    pick = centres[rng.integers(0, len(centres), n_city)]
+    city = pick + rng.normal(0, 0.4, (n_city, 2))
+    rural = np.column_stack((rng.uniform(REGION['south'], REGION['north'], n - n_city),
+                             rng.uniform(REGION['west'], REGION['east'], n - n_city)))
+    return np.vstack((city, rural))
+
+
+def engines(max_distance_km):
+    return {
+        'linear': LinearInterpolator(),
+        'idw': IDWInterpolator(k=8, power=2.0, max_distance_km=max_distance_km),
+        'nearest': NearestInterpolator(max_distance_km=max_distance_km),
+        'gp': GaussianProcessInterpolator(max_points=400, max_distance_km=max_distance_km),
+    }
+
+
+def cross_validate(engine, points, values, folds, rng):
+    fold = rng.permutation(len(points)) % folds
+    errors, held_out = [], 0
+    for k in range(folds):
+        test = fold == k
+        predicted = engine.interpolate(points[~test], values[~test], points[test])
+        covered = ~np.isnan(predicted)
+        errors.append(predicted[covered] - values[test][covered])
+        held_out += test.sum()
+    errors = np.concatenate(errors)
+    return np.abs(errors).mean(), np.sqrt((errors ** 2).mean()), len(errors) / held_out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=2000)
+    ap.add_argument('--folds', type=int, default=5)
+    ap.add_argument('--step', type=float, default=0.1)
+    ap.add_argument('--noise', type=float, default=3.0)
+    ap.add_argument('--max-distance-km', type=float, default=150.0)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = stations(rng, args.stations)
+    truth = field(points[:, 0], points[:, 1])
+    value_sets = [truth + rng.normal(0, args.noise, len(truth)) for _ in range(args.repeat + 1)]
+    lat, lon = np.meshgrid(np.arange(REGION['south'], REGION['north'], args.step),
+                           np.arange(REGION['west'], REGION['east'], args.step), indexing='ij')
+    targets = np.column_stack((lat.ravel(), lon.ravel()))
+
+    # sanity: IDW reproduces a station's value at the station, nearest agrees with brute force
+    probe = points[:50]
+    assert np.allclose(IDWInterpolator().interpolate(points, value_sets[0], probe),
+                       value_sets[0][:50], atol=1e-6)
+    brute = np.argmin(((targets[:500, None, :] - points[None, :, :]) ** 2).sum(axis=2), axis=1)
+    nearest = NearestInterpolator().interpolate(points, value_sets[0], targets[:500])
+    assert np.mean(np.isclose(nearest, value_sets[0][brute])) > 0.95, "nearest disagrees with brute force"
+
+    print(f"{args.stations} stations ({args.noise:g} noise), {args.folds}-fold CV, "
+          f"grid {lat.shape[0]}x{lat.shape[1]} at {args.step:g}°, max distance {args.max_distance_km:g} km")
+    print(f"{'method':8s} {'CV MAE':>8s} {'CV RMSE':>8s} {'covered':>8s} {'cold ms':>9s} {'warm ms':>9s} {'grid':>6s}")
+    for name, engine in engines(args.max_distance_km).items():
+        mae, rmse, coverage = cross_validate(engine, points, value_sets[0], args.folds, np.random.default_rng(1))
+        started = time.perf_counter()
+        grid = engine.interpolate(points, value_sets[0], targets, targets_key='grid')
+        cold = time.perf_counter() - started
+        warm = float('nan')
+        if name != 'gp':
+            warm = float('inf')
+            for values in value_sets[1:]:
+                started = time.perf_counter()
+                engine.interpolate(points, values, targets, targets_key='grid')
+                warm = min(warm, time.perf_counter() - started)
+        print(f"{name:8s} {mae:8.2f} {rmse:8.2f} {coverage:8.1%} {cold * 1e3:9.1f} {warm * 1e3:9.1f} "
+              f"{np.mean(~np.isnan(grid)):6.1%}")
+
+
+if __name__ == '__main__':
+    main()
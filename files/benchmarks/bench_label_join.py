@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark + correctness checks: spatio-temporal label join (spatial_join.py)
+versus the old timestamp-only merge_asof, on synthetic sensor readings and
+pollen labels.
+
+Correctness:
+  1. planted matches: every label gets one sensor inside the radius and
+     tolerance, decoy sensors that are too far away or too late, and a
+     decoy label that is in range of the planted sensor but farther in
+     space and time; each planted sensor must match its own label and the
+     decoy sensors must match nothing;
+  2. a brute-force haversine search over all pairs must give the same
+     matches on random data.
+
+Usage (from files/):
+    python benchmarks/bench_label_join.py --sensors 1000000 --labels 20000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from spatial_join import EARTH_RADIUS_KM, match_nearest, spatiotemporal_join
+
+RADIUS_KM = 25.0
+TOLERANCE = pd.Timedelta('6h')
+T0 = pd.Timestamp('2026-01-01')
+
+
+def offset(lat, lon, km, bearing):
+    """Point km away from (lat, lon) along bearing (radians), small-distance approximation"""
+    dlat = km / 111.195 * np.cos(bearing)
+    dlon = km / (111.195 * np.cos(np.radians(lat))) * np.sin(bearing)
+    return lat + dlat, lon + dlon
+
+
+def random_frame(rng, n, days=365):
+    return pd.DataFrame({
+        'lat': rng.uniform(8, 37, n), 'lon': rng.uniform(68, 97, n),
+        'timestamp': T0 + pd.to_timedelta(rng.uniform(0, days * 86400, n), unit='s'),
+    })
+
+
+def check_planted(rng, n_labels=2000):
+    # labels on a coarse grid so their neighbourhoods never overlap
+    side = int(np.ceil(np.sqrt(n_labels)))
+    lat = 8 + (np.arange(n_labels) // side) * 0.6
+    lon = 68 + (np.arange(n_labels) % side) * 0.6
+    times = T0 + pd.to_timedelta(rng.uniform(0, 365 * 86400, n_labels), unit='s')
+    bearing = rng.uniform(0, 2 * np.pi, n_labels)
+    # decoy label opposite the planted sensor: 15-21 km and 2-4 h from it, so in range but worse
+    dla, dlo = offset(lat, lon, 15.0, bearing + np.pi)
+    labels = pd.concat([
+        pd.DataFrame({'lat': lat, 'lon': lon, 'timestamp': times, 'pollen_index': np.arange(n_labels, dtype=float)}),
+        pd.DataFrame({'lat': dla, 'lon': dlo, 'timestamp': times - pd.Timedelta('3h'), 'pollen_index': -1.0}),
+    ], ignore_index=True)
+    rows = []
+    # kind 0: planted match (close in space and time)
+    la, lo = offset(lat, lon, rng.uniform(0, RADIUS_KM / 4, n_labels), bearing)
+    rows.append((la, lo, times + pd.to_timedelta(rng.uniform(-1, 1, n_labels), unit='h'), 0))
+    # kind 1: outside the radius, same time
+    la, lo = offset(lat, lon, RADIUS_KM * 1.2, bearing)
+    rows.append((la, lo, times, 1))
+    # kind 2: same place, outside the tolerance
+    rows.append((lat, lon, times + TOLERANCE + pd.Timedelta('1min'), 2))
+    frames = [pd.DataFrame({'lat': a, 'lon': b, 'timestamp': t, 'kind': k, 'label': np.arange(n_labels)})
+              for a, b, t, k in rows]
+    sensors = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=1).reset_index(drop=True)
+
+    joined = spatiotemporal_join(sensors, labels, RADIUS_KM, TOLERANCE, ['pollen_index'])
+    assert (joined['kind'] == 0).all(), "decoy sensor matched a label"
+    assert len(joined) == n_labels, f"{n_labels - len(joined)} planted sensors unmatched"
+    assert (joined['pollen_index'].to_numpy() == joined['label'].to_numpy()).all(), "matched the wrong label"
+    assert (joined['match_distance_km'] <= RADIUS_KM / 4 + 0.1).all()
+    print(f"planted matches: {n_labels} labels, {len(sensors)} sensors ok")
+
+
+def brute_force(left, right):
+    """Best match per left row by exhaustive haversine search (small inputs only)"""
+    la, lo = np.radians(left['lat'].to_numpy())[:, None], np.radians(left['lon'].to_numpy())[:, None]
+    ra, ro = np.radians(right['lat'].to_numpy())[None, :], np.radians(right['lon'].to_numpy())[None, :]
+    h = np.sin((ra - la) / 2) ** 2 + np.cos(la) * np.cos(ra) * np.sin((ro - lo) / 2) ** 2
+    dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+    dt = (right['timestamp'].to_numpy()[None, :] - left['timestamp'].to_numpy()[:, None]).astype('timedelta64[ns]').astype(np.int64)
+    ok = (dist <= RADIUS_KM) & (np.abs(dt) <= TOLERANCE.value)
+    score = np.where(ok, dist / RADIUS_KM + np.abs(dt) / TOLERANCE.value, np.inf)
+    best = np.argmin(score, axis=1)
+    has = np.isfinite(score[np.arange(len(left)), best])
+    return np.flatnonzero(has), best[has]
+
+
+def check_brute_force(rng, n_sensors=6000, n_labels=1500):
+    # dense enough (small area, short window) that most sensors have several candidates
+    left = random_frame(rng, n_sensors, days=10)
+    right = random_frame(rng, n_labels, days=10)
+    for frame in (left, right):
+        frame['lat'] = 20 + (frame['lat'] - 8) / 29 * 2
+        frame['lon'] = 77 + (frame['lon'] - 68) / 29 * 2
+    li, ri, _, _ = match_nearest(left['lat'], left['lon'], left['timestamp'],
+                                 right['lat'], right['lon'], right['timestamp'], RADIUS_KM, TOLERANCE)
+    bl, br = brute_force(left, right)
+    assert np.array_equal(li, bl), "matched rows differ from brute force"
+    assert np.array_equal(ri, br), "chosen labels differ from brute force"
+    print(f"brute force: {len(li)} of {n_sensors} sensors matched identically")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sensors', type=int, default=200_000)
+    ap.add_argument('--labels', type=int, default=5_000)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    check_planted(rng)
+    check_brute_force(rng)
+
+    sensors = random_frame(rng, args.sensors)
+    labels = random_frame(rng, args.labels).assign(pollen_index=rng.uniform(0, 100, args.labels))
+
+    started = time.perf_counter()
+    old = pd.merge_asof(sensors.sort_values('timestamp'), labels.sort_values('timestamp'),
+                        on='timestamp', direction='nearest', tolerance=TOLERANCE).dropna(subset=['pollen_index'])
+    old_seconds = time.perf_counter() - started
+    far = old[np.hypot(old['lat_x'] - old['lat_y'], old['lon_x'] - old['lon_y']) > 1.0]
+
+    started = time.perf_counter()
+    joined = spatiotemporal_join(sensors, labels, RADIUS_KM, TOLERANCE, ['pollen_index'])
+    new_seconds = time.perf_counter() - started
+
+    print(f"{args.sensors:,} sensors x {args.labels:,} labels")
+    print(f"merge_asof (time only): {old_seconds:7.3f}s  {len(old):,} rows, "
+          f"{len(far):,} with a label more than 1 deg away")
+    print(f"spatio-temporal join:   {new_seconds:7.3f}s  {len(joined):,} rows, "
+          f"max distance {joined['match_distance_km'].max() if len(joined) else 0:.1f} km")
+
+
+if __name__ == '__main__':
+    main()
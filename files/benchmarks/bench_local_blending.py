@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HeatmapGenerator.refine_with_local_observations (KD-tree) against
+the previous per-pair geodesic loop.
+
+The geodesic loop is O(G*N) Python calls, so it is only timed on a small
+subsample of grid points; its per-point cost is extrapolated to the full grid
+and its blended values are compared with the KD-tree result.
+
+Usage (from files/):
+    python benchmarks/bench_local_blending.py --grid 100000 --obs 10000
+"""
+import os
+import sys
+import copy
+import time
+import argparse
+import numpy as np
+from geopy.distance import geodesic
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from main import HeatmapGenerator
+
+
+def legacy_refine(grid_data, observations, radius_km=20):
+    for g in grid_data:
+        weights = []
+        vals = []
+        for o in observations:
+            d = geodesic((g['lat'], g['lon']), (o['lat'], o['lon'])).km
+            if d <= radius_km:
+                weights.append(max(0.01, 1.0 - d / radius_km))
+                vals.append(o['pollen_index'])
+        if weights:
+            blended = sum(w*v for w, v in zip(weights, vals)) / sum(weights)
+            g['value'] = (g['value'] + blended) / 2.0
+    return grid_data
+
+
+def make_data(n_grid, n_obs, seed=0):
+    rng = np.random.default_rng(seed)
+    glat = rng.uniform(8, 37, n_grid)
+    glon = rng.uniform(68, 97, n_grid)
+    grid = [{'lat': float(a), 'lon': float(b), 'value': float(v)}
+            for a, b, v in zip(glat, glon, rng.uniform(0, 100, n_grid))]
+    olat = rng.uniform(8, 37, n_obs)
+    olon = rng.uniform(68, 97, n_obs)
+    obs = [{'lat': float(a), 'lon': float(b), 'pollen_index': float(v)}
+           for a, b, v in zip(olat, olon, rng.uniform(0, 100, n_obs))]
+    return grid, obs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--grid', type=int, default=100_000)
+    ap.add_argument('--obs', type=int, default=10_000)
+    ap.add_argument('--radius-km', type=float, default=20.0)
+    ap.add_argument('--legacy-grid', type=int, default=10,
+                    help='grid points timed with the geodesic loop')
+    args = ap.parse_args()
+
+    grid, obs = make_data(args.grid, args.obs)
+
+    kd_grid = copy.deepcopy(grid)
+    t0 = time.perf_counter()
+    HeatmapGenerator.refine_with_local_observations(kd_grid, obs, radius_km=args.radius_km)
+    kd_s = time.perf_counter() - t0
+
+    # pick legacy sample points that actually have neighbours, plus random ones
+    changed = [i for i, (a, b) in enumerate(zip(grid, kd_grid)) if a['value'] != b['value']]
+    rng = np.random.default_rng(1)
+    half = args.legacy_grid // 2
+    sample = list(rng.choice(changed, min(half, len(changed)), replace=False)) if changed else []
+    sample += list(rng.choice(len(grid), args.legacy_grid - len(sample), replace=False))
+    legacy_grid = [dict(grid[i]) for i in sample]
+    t0 = time.perf_counter()
+    legacy_refine(legacy_grid, obs, radius_km=args.radius_km)
+    legacy_s = time.perf_counter() - t0
+
+    ref = np.array([g['value'] for g in legacy_grid])
+    got = np.array([kd_grid[i]['value'] for i in sample])
+    max_err = float(np.max(np.abs(ref - got))) if len(sample) else 0.0
+
+    legacy_full_s = legacy_s / len(sample) * args.grid
+    print(f"kd-tree  : {args.grid:,} grid x {args.obs:,} obs in {kd_s:.3f}s")
+    print(f"geodesic : {len(sample)} grid points in {legacy_s:.3f}s "
+          f"(~{legacy_full_s:,.0f}s extrapolated to full grid)")
+    print(f"speedup  : ~{legacy_full_s / kd_s:,.0f}x")
+    print(f"max |diff| on sample: {max_err:.4f} (pollen index units)")
+
+
+if __name__ == '__main__':
+    main()
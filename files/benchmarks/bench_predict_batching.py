@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-point pollen predictions from many concurrent clients,
+one model.predict per request versus coalesced through MicroBatcher
+(micro_batch.py), as /api/allergen/predict does.
+
+Uses a 100-tree RandomForestRegressor trained on synthetic rows with the
+forecast feature layout. Reports throughput, median/p99 latency and the
+number of predict calls, and checks batched results equal direct ones.
+
+Usage (from files/):
+    python benchmarks/bench_predict_batching.py --clients 32 --requests 50 --wait-ms 5
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from forecast_engine import point_feature_matrix, predict_in_chunks  # noqa: E402
+from micro_batch import MicroBatcher  # noqa: E402
+
+
+def random_points(rng, n):
+    return point_feature_matrix(rng.uniform(8, 37, n), rng.uniform(68, 97, n),
+                                rng.integers(1, 366, n), hours=rng.integers(0, 24, n),
+                                pm25=rng.gamma(2, 20, n), pm10=rng.gamma(2, 30, n))
+
+
+def run_clients(clients, requests, call, seed=0):
+    latencies = [[] for _ in range(clients)]
+
+    def client(i):
+        rng = np.random.default_rng(seed + i)
+        for _ in range(requests):
+            X = random_points(rng, 1)
+            started = time.perf_counter()
+            call(X)
+            latencies[i].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, np.concatenate(latencies)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--clients', type=int, default=32)
+    ap.add_argument('--requests', type=int, default=50)
+    ap.add_argument('--wait-ms', type=float, default=5.0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = random_points(rng, 20_000)
+    y = 40 + 30 * X[:, 4] + 0.1 * X[:, 2] + rng.normal(0, 5, len(X))
+    model = RandomForestRegressor(n_estimators=100, max_depth=16, n_jobs=1, random_state=42).fit(X, y)
+
+    calls = {'n': 0}
+
+    def predict(rows):
+        calls['n'] += 1
+        return predict_in_chunks(model, rows)
+
+    batcher = MicroBatcher(predict, max_wait_ms=args.wait_ms)
+    check = random_points(np.random.default_rng(99), 64)
+    assert np.allclose(batcher.submit(check), predict_in_chunks(model, check))
+
+    total = args.clients * args.requests
+    print(f"{args.clients} clients x {args.requests} single-point requests, 100 trees")
+    for name, call in (('predict per request', predict), (f'micro-batched ({args.wait_ms:g} ms)', batcher.submit)):
+        calls['n'] = 0
+        seconds, latency = run_clients(args.clients, args.requests, call)
+        print(f"{name:26s} {total / seconds:8.0f} req/s  p50 {np.median(latency) * 1e3:6.1f} ms  "
+              f"p99 {np.percentile(latency, 99) * 1e3:6.1f} ms  {calls['n']:5d} predict calls")
+
+
+if __name__ == '__main__':
+    main()
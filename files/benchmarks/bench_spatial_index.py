@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bounding-box + time-window queries on synthetic sensor readings,
+comparing the lat/lon BETWEEN filter on a (latitude, longitude) index with
+the cell-range plan from spatial_index.py on a (cell, timestamp) index.
+The lat/lon plan is what SPATIAL_BACKEND=auto uses without PostGIS; the
+cell plan is SPATIAL_BACKEND=cells (on SQLite it measured 0.7x-1.0x the
+lat/lon plan's speed at 200k-2M rows).
+
+Usage (from files/):
+    python benchmarks/bench_spatial_index.py --rows 10000000 --queries 50
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from spatial_index import cell_id, covering_ranges
+
+WEEK_S = 7 * 24 * 3600
+
+
+def build_db(path, rows, seed=0, chunk=500_000):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE sensor_reading (id INTEGER PRIMARY KEY, latitude REAL, longitude REAL, "
+                 "pm25 REAL, timestamp INTEGER, cell INTEGER)")
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        lat = rng.uniform(8, 37, n)
+        lon = rng.uniform(68, 97, n)
+        ts = rng.integers(0, WEEK_S, n)
+        cells = cell_id(lat, lon)
+        conn.executemany("INSERT INTO sensor_reading (latitude, longitude, pm25, timestamp, cell) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         zip(lat.tolist(), lon.tolist(), rng.uniform(5, 300, n).tolist(),
+                             ts.tolist(), cells.tolist()))
+    conn.commit()
+    conn.execute("CREATE INDEX idx_latlon ON sensor_reading (latitude, longitude)")
+    conn.execute("CREATE INDEX idx_cell_ts ON sensor_reading (cell, timestamp)")
+    conn.execute("ANALYZE")
+    return conn
+
+
+def latlon_query(conn, b, since):
+    return conn.execute(
+        "SELECT id, pm25 FROM sensor_reading INDEXED BY idx_latlon "
+        "WHERE timestamp >= ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+        (since, b['south'], b['north'], b['west'], b['east'])).fetchall()
+
+
+def cell_query(conn, b, since):
+    ranges = covering_ranges(b)
+    cond = " OR ".join("(cell BETWEEN ? AND ? AND timestamp >= ?)" for _ in ranges)
+    params = [p for lo, hi in ranges for p in (lo, hi, since)]
+    return conn.execute(
+        f"SELECT id, pm25 FROM sensor_reading WHERE ({cond}) "
+        "AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+        params + [b['south'], b['north'], b['west'], b['east']]).fetchall()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=10_000_000)
+    ap.add_argument('--queries', type=int, default=50)
+    ap.add_argument('--window-hours', type=float, default=6)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        conn = build_db(os.path.join(tmp, 'bench.db'), args.rows)
+        print(f"built {args.rows:,} rows in {time.perf_counter() - t0:.1f}s")
+        since = WEEK_S - int(args.window_hours * 3600)
+        rng = np.random.default_rng(1)
+        for label, size in (('city 0.5deg', 0.5), ('state 5deg', 5.0)):
+            boxes = []
+            for _ in range(args.queries):
+                s, w = rng.uniform(8, 37 - size), rng.uniform(68, 97 - size)
+                boxes.append({'south': s, 'north': s + size, 'west': w, 'east': w + size})
+            timings = {}
+            for name, fn in (('lat/lon', latlon_query), ('cell', cell_query)):
+                t0 = time.perf_counter()
+                counts = [len(fn(conn, b, since)) for b in boxes]
+                timings[name] = ((time.perf_counter() - t0) / len(boxes) * 1000, counts)
+            assert timings['lat/lon'][1] == timings['cell'][1], "plans returned different rows"
+            avg_rows = np.mean(timings['cell'][1])
+            print(f"{label:12s} avg {avg_rows:8.0f} rows | lat/lon {timings['lat/lon'][0]:8.2f} ms | "
+                  f"cell {timings['cell'][0]:8.2f} ms | {timings['lat/lon'][0] / timings['cell'][0]:.1f}x")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
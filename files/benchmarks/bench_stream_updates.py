@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a map client polling /api/sensors after every ingest versus
+following /api/stream (server-sent events with a resume cursor).
+
+Seeds a temporary SQLite database with --history-hours of hourly readings
+from --stations stations, then runs --ingests ingests of one reading per
+station. Reports bytes the client downloads per ingest both ways, and the
+delay from the end of store_sensor_data to the stream event arriving (same
+worker: woken by the notifier; other workers pick changes up within
+Config.STREAM_POLL_SECONDS). Checks that the stream delivers every new
+reading exactly once, including across a reconnect with Last-Event-ID, and
+including a late reading for the previous UTC day, which is stored in an
+older partition with a smaller id than readings already sent.
+
+Usage (from files/):
+    python benchmarks/bench_stream_updates.py --stations 500 --history-hours 23 --ingests 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ['HEATMAP_PYRAMID_DIR'] = os.path.join(_tmp.name, 'pyramid')
+
+from config import Config  # noqa: E402
+from main import AirQualityData, app, data_aggregator, db  # noqa: E402
+
+
+def readings(lat, lon, rng, when):
+    return [AirQualityData(float(a), float(o), float(p), None, 50, 'bench', when)
+            for a, o, p in zip(lat, lon, rng.gamma(2.0, 25.0, len(lat)))]
+
+
+def parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.split('\n') if ': ' in line and not line.startswith(':'))
+    return fields.get('event'), fields.get('id'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--stations', type=int, default=500)
+    ap.add_argument('--history-hours', type=int, default=23)
+    ap.add_argument('--ingests', type=int, default=5)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(8, 37, args.stations)
+    lon = rng.uniform(69, 97, args.stations)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        history = []
+        for hour in range(args.history_hours, 0, -1):
+            history += readings(lat, lon, rng, now - timedelta(hours=hour))
+        data_aggregator.store_sensor_data(history)
+        client = app.test_client()
+        cursor = client.get('/api/sensors').get_json()['cursor']
+
+    # the stream stays open for the whole run; frames are collected with their arrival time
+    Config.STREAM_MAX_SECONDS = 3600
+    received, received_bytes, done = [], [0], threading.Event()
+
+    def follow(start_cursor, stop_after):
+        response = client.get('/api/stream', query_string={'cursor': start_cursor}, buffered=False)
+        buffer = ''
+        for chunk in response.response:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            received_bytes[0] += len(text.encode())
+            buffer += text
+            while '\n\n' in buffer:
+                frame, buffer = buffer.split('\n\n', 1)
+                event, event_id, data = parse(frame)
+                if event == 'update':
+                    received.append((time.perf_counter(), event_id, data))
+                    if len(received) >= stop_after:
+                        response.close()
+                        done.set()
+                        return
+
+    follower = threading.Thread(target=follow, args=(cursor, args.ingests + 1), daemon=True)
+    follower.start()
+    time.sleep(0.5)
+
+    poll_bytes, stored_ids, delays = 0, [], []
+    with app.app_context():
+        for i in range(args.ingests):
+            data_aggregator.store_sensor_data(readings(lat, lon, rng, datetime.utcnow() - timedelta(seconds=i)))
+            committed = time.perf_counter()
+            while len(received) <= i and follower.is_alive():
+                time.sleep(0.001)
+            delays.append(received[i][0] - committed)
+            # the polling client re-downloads the whole 24-hour list instead
+            poll_bytes += len(client.get('/api/sensors').get_data())
+        # a late reading for the previous UTC day, e.g. a delayed OpenAQ "latest" value
+        late = datetime.combine(datetime.utcnow().date(), datetime.min.time()) - timedelta(minutes=1)
+        data_aggregator.store_sensor_data(readings(np.array([20.0]), np.array([80.0]), rng, late))
+    done.wait(10)
+    for _, _, data in received:
+        stored_ids += [r['id'] for r in data['readings']]
+    assert len(stored_ids) == len(set(stored_ids)) == args.stations * args.ingests + 1, \
+        "stream lost or repeated readings"
+    late_id = received[-1][2]['readings'][0]['id']
+    assert received[-1][2]['readings'][0]['timestamp'] == late.isoformat() and late_id < max(stored_ids), \
+        "late reading missing from the stream"
+
+    # reconnecting from the cursor of the first update replays exactly the later ones (the late one too)
+    first_cursor = received[0][1]
+    with app.app_context():
+        Config.STREAM_MAX_SECONDS = 0.5
+        body = app.test_client().get('/api/stream', headers={'Last-Event-ID': first_cursor}).get_data(as_text=True)
+    replayed = [r['id'] for frame in body.split('\n\n') if frame
+                for event, _, data in [parse(frame)] if event == 'update' for r in data['readings']]
+    assert replayed == stored_ids[args.stations:], "resume did not replay the missed readings"
+
+    print(f"{args.stations} stations, {args.history_hours} h history, {args.ingests} ingests")
+    print(f"polling /api/sensors: {poll_bytes / args.ingests / 1024:9.1f} KiB per ingest")
+    print(f"/api/stream:          {received_bytes[0] / args.ingests / 1024:9.1f} KiB per ingest  "
+          f"(event delay after commit: median {np.median(delays) * 1e3:.1f} ms, max {max(delays) * 1e3:.1f} ms)")
+    print(f"resume via Last-Event-ID replayed {len(replayed)} readings (including the late reading, id {late_id})")
+
+
+if __name__ == '__main__':
+    main()
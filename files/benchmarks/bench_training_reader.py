@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading training labels via ORM objects + list of dicts (the old
+load_training_data path) versus the chunked pandas.read_sql reader in
+training_data.py. Reports wall time, peak traced allocations and the
+resulting DataFrame size on a throwaway SQLite database.
+
+Usage (from files/):
+    python benchmarks/bench_training_reader.py --rows 1000000 --chunksize 100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+_tmp = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+from main import app, db, AllergenReading  # noqa: E402
+from training_data import LABEL_COLUMNS, concat_chunks, label_chunks  # noqa: E402
+
+
+def populate(rows, seed=0, batch=100_000):
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    table = AllergenReading.__table__
+    sources = [f'station-{i}' for i in range(200)]
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        db.session.execute(table.insert(), [{
+            'latitude': float(lat), 'longitude': float(lon), 'pollen_index': float(p),
+            'pollen_type': 'tree', 'source': sources[s], 'timestamp': now - timedelta(minutes=float(m)),
+            'cell': 0, 'is_verified': False,
+        } for lat, lon, p, s, m in zip(rng.uniform(8, 37, n), rng.uniform(68, 97, n), rng.uniform(0, 100, n),
+                                       rng.integers(0, len(sources), n), rng.uniform(0, 360 * 24 * 60, n))])
+        db.session.commit()
+
+
+def orm_path(cutoff):
+    rows = AllergenReading.query.filter(AllergenReading.timestamp >= cutoff).all()
+    df = pd.DataFrame([{'lat': a.latitude, 'lon': a.longitude, 'pollen_index': a.pollen_index,
+                        'timestamp': a.timestamp} for a in rows])
+    db.session.expunge_all()
+    return df
+
+
+def chunked_path(cutoff, chunksize):
+    return concat_chunks(label_chunks(cutoff, chunksize=chunksize), LABEL_COLUMNS)
+
+
+def measure(fn):
+    started = time.perf_counter()
+    df = fn()
+    seconds = time.perf_counter() - started
+    del df
+    tracemalloc.start()
+    df = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--rows', type=int, default=200_000)
+    ap.add_argument('--chunksize', type=int, default=100_000)
+    args = ap.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        populate(args.rows)
+        print(f"populated {args.rows:,} allergen readings in {time.perf_counter() - t0:.1f}s")
+        cutoff = datetime.utcnow() - timedelta(days=365)
+        results = {}
+        for name, fn in (('orm + dicts', lambda: orm_path(cutoff)),
+                         ('read_sql chunks', lambda: chunked_path(cutoff, args.chunksize))):
+            seconds, peak, df = measure(fn)
+            results[name] = df
+            print(f"{name:16s} {seconds:7.2f}s  peak {peak / 2**20:8.1f} MiB  "
+                  f"frame {df.memory_usage(deep=True).sum() / 2**20:7.1f} MiB")
+        a = results['orm + dicts'].sort_values('timestamp', kind='stable').reset_index(drop=True)
+        b = results['read_sql chunks'].sort_values('timestamp', kind='stable').reset_index(drop=True)
+        assert len(a) == len(b)
+        assert np.allclose(a['pollen_index'].to_numpy(), b['pollen_index'].to_numpy(), atol=1e-4)
+        print("results match")
+
+
+if __name__ == '__main__':
+    main()
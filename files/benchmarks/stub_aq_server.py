@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Local stub of the OpenAQ `/latest` and WAQI `/feed/<city>/` endpoints with a
+configurable per-request latency, so fetch concurrency can be measured and
+exercised offline.
+
+Usage (from files/):
+    python benchmarks/stub_aq_server.py --port 8765 --latency 0.3
+
+or in-process:
+    server = start_stub_server(latency=0.3)   # serves on 127.0.0.1:<port>
+    ...
+    server.shutdown()
+"""
+import json
+import random
+import argparse
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def _openaq_latest(count):
+    now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    rng = random.Random(0)
+    return {'results': [{
+        'location': f'stub-{i}',
+        'coordinates': {'latitude': rng.uniform(8, 37), 'longitude': rng.uniform(68, 97)},
+        'measurements': [{'parameter': 'pm25', 'value': rng.uniform(5, 300), 'date': {'utc': now}}],
+    } for i in range(count)]}
+
+
+def _waqi_feed(city):
+    rng = random.Random(city)
+    return {'status': 'ok', 'data': {
+        'aqi': rng.randint(20, 400),
+        'city': {'name': city, 'geo': [rng.uniform(8, 37), rng.uniform(68, 97)]},
+        'iaqi': {'pm25': {'v': rng.uniform(5, 300)}, 'pm10': {'v': rng.uniform(10, 400)}},
+        'time': {'iso': datetime.now(timezone.utc).isoformat()},
+    }}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    openaq_count = 100
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = urlparse(self.path).path
+        if path.endswith('/latest'):
+            body = _openaq_latest(self.openaq_count)
+        elif '/feed/' in path:
+            body = _waqi_feed(path.rstrip('/').rsplit('/', 1)[-1])
+        else:
+            self.send_error(404)
+            return
+        with StubHandler._lock:
+            StubHandler.requests_served += 1
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.2, openaq_count=100):
+    """Start the stub on a daemon thread; `server.server_address` has the port."""
+    handler = type('Handler', (StubHandler,), {'latency': latency, 'openaq_count': openaq_count})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--latency', type=float, default=0.2)
+    args = ap.parse_args()
+    server = start_stub_server(args.host, args.port, args.latency)
+    print(f"Stub OpenAQ/WAQI server on http://{args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
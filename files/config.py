@@ -9,15 +9,102 @@ class Config:
     # Database
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///air_quality.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Spatial queries: 'auto' (PostGIS on PostgreSQL servers that have the extension,
+    # lat/lon bounds otherwise), 'postgis', 'spatialite' (SQLite + mod_spatialite),
+    # 'latlon' or 'cells' (lat/lon bounds plus cell-id range scans, see spatial_index.py)
+    SPATIAL_BACKEND = os.environ.get("SPATIAL_BACKEND", "auto")
+    SPATIALITE_LIBRARY = os.environ.get("SPATIALITE_LIBRARY", "mod_spatialite")
 
     # External APIs
     WAQI_API_TOKEN = os.environ.get("WAQI_API_TOKEN")
     OPENAQ_API_URL = "https://api.openaq.org/v2"
+    # WAQI request budget shared by concurrent fetch workers (token bucket)
+    WAQI_REQUESTS_PER_SECOND = float(os.environ.get("WAQI_REQUESTS_PER_SECOND", 10))
+    WAQI_BURST = int(os.environ.get("WAQI_BURST", 10))
+    FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", 8))
 
     # Data refresh intervals
     DATA_REFRESH_INTERVAL = timedelta(minutes=30)
     USER_REPORT_RETENTION = timedelta(days=30)
     SENSOR_DATA_RETENTION = timedelta(days=7)
+    # Hourly PM rollups (daily rollups are kept indefinitely)
+    ROLLUP_HOURLY_RETENTION = timedelta(days=int(os.environ.get("ROLLUP_HOURLY_RETENTION_DAYS", 90)))
+
+    # Rows per executemany/commit when ingesting sensor readings
+    SENSOR_INSERT_BATCH_SIZE = int(os.environ.get("SENSOR_INSERT_BATCH_SIZE", 500))
+
+    # Background jobs (refresh / retrain) per web worker
+    JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", 2))
+
+    # Rows per chunk when streaming training data from the database
+    TRAINING_CHUNK_SIZE = int(os.environ.get("TRAINING_CHUNK_SIZE", 100_000))
+    # Training labels are joined to sensor readings within this distance and time
+    LABEL_JOIN_RADIUS_KM = float(os.environ.get("LABEL_JOIN_RADIUS_KM", 25))
+    LABEL_JOIN_TOLERANCE = timedelta(hours=float(os.environ.get("LABEL_JOIN_TOLERANCE_HOURS", 6)))
+    # Allergen model training: 'incremental' adds trees fitted on data since the last
+    # checkpoint (full retrain when there is none), 'full' refits on the whole window
+    # (sensor features older than ROLLUP_HOURLY_RETENTION come from daily rollups)
+    TRAINING_MODE = os.environ.get("TRAINING_MODE", "incremental")
+    TRAINING_WINDOW_DAYS = int(os.environ.get("TRAINING_WINDOW_DAYS", 365))
+    TRAINING_VALIDATION_FRACTION = float(os.environ.get("TRAINING_VALIDATION_FRACTION", 0.1))
+    INCREMENTAL_TREES = int(os.environ.get("INCREMENTAL_TREES", 10))
+    MODEL_MAX_TREES = int(os.environ.get("MODEL_MAX_TREES", 200))
+    # Versioned allergen models (model.joblib + meta.json per version); older versions are pruned
+    MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "models/allergen")
+    MODEL_REGISTRY_KEEP = int(os.environ.get("MODEL_REGISTRY_KEEP", 5))
+    # Online point predictions: concurrent requests arriving within the wait window
+    # (up to max rows) share one predict call
+    PREDICT_BATCH_WAIT_MS = float(os.environ.get("PREDICT_BATCH_WAIT_MS", 5))
+    PREDICT_BATCH_MAX_ROWS = int(os.environ.get("PREDICT_BATCH_MAX_ROWS", 10_000))
+    PREDICT_MAX_POINTS = int(os.environ.get("PREDICT_MAX_POINTS", 10_000))
+    PREDICT_TIMEOUT_SECONDS = float(os.environ.get("PREDICT_TIMEOUT_SECONDS", 10))
+
+    # Pollen forecast generation: process pool size and spatial tile size (degrees)
+    FORECAST_WORKERS = int(os.environ.get("FORECAST_WORKERS", 1))
+    FORECAST_TILE_DEG = float(os.environ.get("FORECAST_TILE_DEG", 5.0))
+    # Dense per-run forecast arrays (memory-mapped .npy) for O(1) lookups
+    FORECAST_STORE_DIR = os.environ.get("FORECAST_STORE_DIR", "forecast_store")
+
+    # Heatmap tile cache (in-process, per worker)
+    HEATMAP_CACHE_MAX_ENTRIES = int(os.environ.get("HEATMAP_CACHE_MAX_ENTRIES", 256))
+    HEATMAP_CACHE_MAX_BYTES = int(os.environ.get("HEATMAP_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    HEATMAP_CACHE_TTL = DATA_REFRESH_INTERVAL
+    # Cached spatial indexes / interpolation weights (per worker and engine)
+    INTERPOLATION_CACHE_MAX_BYTES = int(os.environ.get("INTERPOLATION_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+    # Heatmap interpolation engine (linear, idw, nearest or gp; see interpolation.py),
+    # overridable per request, and its parameters. Cells farther than
+    # HEATMAP_MAX_DISTANCE_KM from every station are left empty (idw, nearest, gp).
+    HEATMAP_METHOD = os.environ.get("HEATMAP_METHOD", "linear")
+    HEATMAP_MAX_DISTANCE_KM = float(os.environ.get("HEATMAP_MAX_DISTANCE_KM", 150.0))
+    HEATMAP_IDW_NEIGHBOURS = int(os.environ.get("HEATMAP_IDW_NEIGHBOURS", 8))
+    HEATMAP_IDW_POWER = float(os.environ.get("HEATMAP_IDW_POWER", 2.0))
+    HEATMAP_GP_MAX_POINTS = int(os.environ.get("HEATMAP_GP_MAX_POINTS", 400))
+    # Readings interpolated into the heatmap, reduced to one value per station:
+    # its latest reading ("latest") or a mean with weights halving every
+    # HEATMAP_DECAY_HALF_LIFE_MINUTES ("decay"); see rollups.station_values
+    HEATMAP_READING_WINDOW = timedelta(hours=6)
+    HEATMAP_STATION_VALUE = os.environ.get("HEATMAP_STATION_VALUE", "decay")
+    HEATMAP_DECAY_HALF_LIFE = timedelta(minutes=float(os.environ.get("HEATMAP_DECAY_HALF_LIFE_MINUTES", 60)))
+    # Heatmap pyramid rebuilt over INDIA_BOUNDS after every ingest: grid steps (degrees)
+    # and the per-request cell budget used to pick a level
+    HEATMAP_PYRAMID_DIR = os.environ.get("HEATMAP_PYRAMID_DIR", "heatmap_pyramid")
+    HEATMAP_PYRAMID_STEPS = [float(s) for s in os.environ.get("HEATMAP_PYRAMID_STEPS", "0.4,0.1,0.025").split(",")]
+    HEATMAP_MAX_CELLS = int(os.environ.get("HEATMAP_MAX_CELLS", 20_000))
+
+    # Live update stream (/api/stream): how often a stream polls for readings
+    # stored by other workers, keep-alive interval, connection lifetime before
+    # the client reconnects, readings per event, the zoom of the heatmap tiles
+    # reported as changed, and how long an unfinished ingest may hold back the
+    # stream before it counts as abandoned
+    STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", 2.0))
+    STREAM_HEARTBEAT_SECONDS = float(os.environ.get("STREAM_HEARTBEAT_SECONDS", 15.0))
+    STREAM_MAX_SECONDS = float(os.environ.get("STREAM_MAX_SECONDS", 300.0))
+    STREAM_MAX_READINGS = int(os.environ.get("STREAM_MAX_READINGS", 5000))
+    STREAM_TILE_ZOOM = int(os.environ.get("STREAM_TILE_ZOOM", 6))
+    # How long a worker reuses its list of daily partitions before listing
+    # tables again (partitions it creates or drops itself are seen at once)
+    PARTITION_LIST_SECONDS = float(os.environ.get("PARTITION_LIST_SECONDS", 10))
+    INGEST_TIMEOUT = timedelta(minutes=float(os.environ.get("INGEST_TIMEOUT_MINUTES", 30)))
 
     # Rate limiting
     REQUESTS_PER_MINUTE = 60
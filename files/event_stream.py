@@ -0,0 +1,78 @@
+# event_stream.py
+"""
+Server-sent events (text/event-stream) with resumable cursors.
+
+A stream is a generator of SSE frames driven by `poll(cursor)`, which
+returns the events that happened after `cursor` and the cursor to continue
+from. Every event carries that cursor as its SSE id, so a browser
+EventSource that reconnects sends it back as Last-Event-ID and receives
+only what it missed.
+
+Ingest in the same process calls ChangeNotifier.notify() to wake its
+streams at once. Streams served by other worker processes see the change on
+their next poll (every `poll_seconds`). A stream ends after `max_seconds`,
+so a long-lived connection does not hold a worker forever. The client then
+reconnects after `retry_ms` with its cursor.
+"""
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+Events = List[Tuple[str, Dict]]
+
+
+def format_event(data: Dict, event: Optional[str] = None, event_id=None) -> str:
+    """One SSE frame with a JSON payload."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class ChangeNotifier:
+    """Wakes waiting streams when new data has been committed (per process)."""
+
+    def __init__(self):
+        self.version = 0
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, seen: int, timeout: float) -> int:
+        """Block until version differs from `seen` or `timeout` passes; returns the version."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+def event_stream(poll: Callable[[object], Tuple[Events, object]], cursor,
+                 notifier: Optional[ChangeNotifier] = None, poll_seconds: float = 2.0,
+                 heartbeat_seconds: float = 15.0, max_seconds: float = 300.0,
+                 retry_ms: int = 2000) -> Iterator[str]:
+    """
+    SSE frames for everything after `cursor`: polls until `max_seconds` have
+    passed, draining backlogs without waiting and sending a comment line
+    every `heartbeat_seconds` of silence so proxies keep the connection open.
+    """
+    notifier = notifier or ChangeNotifier()
+    yield f'retry: {retry_ms}\n\n'
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < max_seconds:
+        seen = notifier.version
+        events, cursor = poll(cursor)
+        for name, data in events:
+            yield format_event(data, name, cursor)
+        if events:
+            last_sent = time.monotonic()
+            continue
+        if time.monotonic() - last_sent >= heartbeat_seconds:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        notifier.wait(seen, min(poll_seconds, max(0.0, max_seconds - (time.monotonic() - started))))
@@ -4,7 +4,7 @@ Fetch last 30 days of hourly PM2.5 & PM10 for ALL cities in a country from OpenA
 then compute US AQI (max of PM2.5/PM10 sub-indices) at the city-hour level.
 
 Requirements:
-    pip install requests pandas python-dateutil tqdm
+    pip install requests numpy pandas python-dateutil tqdm
 
 Usage:
     OPENAQ_API_KEY=your_key python fetch_openaq_last_month_country.py --iso IN
@@ -23,60 +23,15 @@ from dateutil import parser as dateparser
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+# US EPA breakpoint tables and the vectorized AQI lookup (shared with main.py)
+from aqi import compute_aqi
+
 BASE_URL = "https://api.openaq.org/v3"
 DEFAULT_PARAMS = {
     "limit": 100,
     "page": 1,
 }
 
-# -------------- AQI helpers (US EPA breakpoints) --------------
-# Source: US EPA 24-hr breakpoints for PM2.5 and PM10.
-PM25_BREAKPOINTS = [
-    # (C_lo, C_hi, I_lo, I_hi)
-    (0.0, 12.0, 0, 50),
-    (12.1, 35.4, 51, 100),
-    (35.5, 55.4, 101, 150),
-    (55.5, 150.4, 151, 200),
-    (150.5, 250.4, 201, 300),
-    (250.5, 350.4, 301, 400),
-    (350.5, 500.4, 401, 500),
-]
-
-PM10_BREAKPOINTS = [
-    (0, 54, 0, 50),
-    (55, 154, 51, 100),
-    (155, 254, 101, 150),
-    (255, 354, 151, 200),
-    (355, 424, 201, 300),
-    (425, 504, 301, 400),
-    (505, 604, 401, 500),
-]
-
-def _linear_aqi(c: float, bps: List[Tuple[float, float, int, int]]) -> Optional[int]:
-    if c is None or (isinstance(c, float) and math.isnan(c)):
-        return None
-    for c_lo, c_hi, i_lo, i_hi in bps:
-        if c_lo <= c <= c_hi:
-            # Truncate to 1 decimal for PM2.5, integer for PM10 per EPA guidance (optional)
-            return int(round((i_hi - i_lo) / (c_hi - c_lo) * (c - c_lo) + i_lo))
-    return None
-
-def aqi_pm25(c: Optional[float]) -> Optional[int]:
-    return _linear_aqi(c, PM25_BREAKPOINTS)
-
-def aqi_pm10(c: Optional[float]) -> Optional[int]:
-    return _linear_aqi(c, PM10_BREAKPOINTS)
-
-def compute_us_aqi(pm25: Optional[float], pm10: Optional[float]) -> Optional[int]:
-    vals = []
-    a25 = aqi_pm25(pm25)
-    a10 = aqi_pm10(pm10)
-    if a25 is not None:
-        vals.append(a25)
-    if a10 is not None:
-        vals.append(a10)
-    return max(vals) if vals else None
-
 # -------------- API helpers --------------
 def get_api_key() -> str:
     key = os.getenv("OPENAQ_API_KEY", "").strip()
@@ -204,11 +159,9 @@ def collect_country_last_month(iso: str, api_key: str, max_workers: int = 16) ->
     if "pm25" not in pivot.columns: pivot["pm25"] = pd.NA
     if "pm10" not in pivot.columns: pivot["pm10"] = pd.NA
 
-    # Compute AQI
-    pivot["aqi_us"] = pivot.apply(lambda r: compute_us_aqi(
-        float(r["pm25"]) if pd.notna(r["pm25"]) else None,
-        float(r["pm10"]) if pd.notna(r["pm10"]) else None,
-    ), axis=1)
+    # Compute AQI (max of PM2.5/PM10 sub-indices) over whole columns at once
+    _, aqi = compute_aqi(pm25=pivot["pm25"], pm10=pivot["pm10"])
+    pivot["aqi_us"] = pd.array(aqi, dtype="Float64").astype("Int64")
 
     pivot["country_iso"] = iso
     # Order columns
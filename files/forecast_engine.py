@@ -0,0 +1,164 @@
+# forecast_engine.py
+"""
+Tiled, optionally multi-process pollen forecast generation.
+
+The forecast grid is split into spatial tiles. Each tile's feature matrix
+is built for every forecast day and predicted in chunked, batched calls.
+With workers > 1 tiles run on a process pool. Each worker loads the
+trained model once from its joblib file with mmap_mode='r', so the tree
+arrays are shared through the page cache instead of being pickled into
+every task. Results are yielded per tile as they complete so the caller
+can persist them incrementally.
+
+This module deliberately does not import main (Flask app / DB) so worker
+processes stay light.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+# Column order produced by train_allergen.featurize() for timestamped data;
+# the forecast feature matrix must match it exactly.
+FORECAST_FEATURES = ['lat', 'lon', 'pm25', 'pm10', 'dayofyear_sin', 'dayofyear_cos', 'hour_sin', 'hour_cos']
+PREDICT_CHUNK_SIZE = 100_000
+# PM2.5/PM10 assumed where no forecast is available (in production use a dispersion model)
+BASELINE_PM = 50.0
+
+# per-process model loaded by the pool initializer
+_worker_model = None
+
+
+def grid_axes(bounds: Dict[str, float], step: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude axes of the forecast grid."""
+    return (np.arange(bounds['south'], bounds['north'], step),
+            np.arange(bounds['west'], bounds['east'], step))
+
+
+def forecast_feature_matrix(lats, lons, dayofyear):
+    """
+    Feature rows for every (lat, lon) grid cell on one day, lat-major
+    (the same order as nested `for lat: for lon:` loops).
+    """
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    X = np.empty((lat_grid.size, len(FORECAST_FEATURES)), dtype=np.float64)
+    X[:, 0] = lat_grid.ravel()
+    X[:, 1] = lon_grid.ravel()
+    X[:, 2] = BASELINE_PM
+    X[:, 3] = BASELINE_PM
+    X[:, 4] = np.sin(2*np.pi*dayofyear/365.0)
+    X[:, 5] = np.cos(2*np.pi*dayofyear/365.0)
+    X[:, 6] = 0.0
+    X[:, 7] = 1.0
+    return X
+
+
+def point_feature_matrix(lats, lons, daysofyear, hours=None, pm25=None, pm10=None):
+    """
+    Feature rows for arbitrary points (one row per point). Missing hours
+    default to 0 and missing PM values to BASELINE_PM, as on the forecast grid.
+    """
+    n = len(lats)
+    fill = lambda values, default: (np.full(n, default) if values is None
+                                    else np.where(np.isnan(np.asarray(values, dtype=np.float64)), default, values))
+    doy = np.asarray(daysofyear, dtype=np.float64)
+    hour = fill(hours, 0.0)
+    X = np.empty((n, len(FORECAST_FEATURES)), dtype=np.float64)
+    X[:, 0] = lats
+    X[:, 1] = lons
+    X[:, 2] = fill(pm25, BASELINE_PM)
+    X[:, 3] = fill(pm10, BASELINE_PM)
+    X[:, 4] = np.sin(2*np.pi*doy/365.0)
+    X[:, 5] = np.cos(2*np.pi*doy/365.0)
+    X[:, 6] = np.sin(2*np.pi*hour/24.0)
+    X[:, 7] = np.cos(2*np.pi*hour/24.0)
+    return X
+
+
+def predict_in_chunks(model, X, chunk_size=PREDICT_CHUNK_SIZE):
+    """model.predict over row chunks to bound peak memory; clipped to 0-100"""
+    out = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), chunk_size):
+        out[start:start + chunk_size] = model.predict(X[start:start + chunk_size])
+    return np.clip(out, 0, 100)
+
+
+def partition_grid(n_lat: int, n_lon: int, tile_cells: int) -> List[Tuple[int, int, int, int]]:
+    """Split an n_lat x n_lon grid into (r0, r1, c0, c1) tiles of at most tile_cells per side."""
+    tile_cells = max(1, tile_cells)
+    return [(r0, min(r0 + tile_cells, n_lat), c0, min(c0 + tile_cells, n_lon))
+            for r0 in range(0, n_lat, tile_cells)
+            for c0 in range(0, n_lon, tile_cells)]
+
+
+def forecast_tile(model, lats, lons, daysofyear: Sequence[int],
+                  chunk_size: int = PREDICT_CHUNK_SIZE) -> np.ndarray:
+    """Predictions for one tile, shape (days, len(lats), len(lons))."""
+    out = np.empty((len(daysofyear), len(lats), len(lons)), dtype=np.float64)
+    for d, doy in enumerate(daysofyear):
+        X = forecast_feature_matrix(lats, lons, doy)
+        out[d] = predict_in_chunks(model, X, chunk_size).reshape(len(lats), len(lons))
+    return out
+
+
+def load_model(model_path: str, mmap: bool = True):
+    """Load the model saved by train_and_persist ({'model': estimator})."""
+    payload = joblib.load(model_path, mmap_mode='r' if mmap else None)
+    return payload['model'] if isinstance(payload, dict) else payload
+
+
+def _init_worker(model_path: str):
+    global _worker_model
+    _worker_model = load_model(model_path)
+    # parallelism comes from the pool; avoid oversubscribing cores
+    if hasattr(_worker_model, 'n_jobs'):
+        _worker_model.n_jobs = 1
+
+
+def _worker_forecast_tile(tile, lats, lons, daysofyear, chunk_size):
+    return tile, forecast_tile(_worker_model, lats, lons, daysofyear, chunk_size)
+
+
+def iter_forecast_tiles(lats: np.ndarray, lons: np.ndarray, daysofyear: Sequence[int],
+                        model=None, model_path: str = None, workers: int = 1,
+                        tile_cells: int = 100, chunk_size: int = PREDICT_CHUNK_SIZE
+                        ) -> Iterator[Tuple[Tuple[int, int, int, int], np.ndarray]]:
+    """
+    Yield ((r0, r1, c0, c1), values[days, r1-r0, c1-c0]) for every tile.
+
+    workers == 1 predicts in-process with `model` (or the model loaded from
+    `model_path`); workers > 1 requires `model_path` and yields tiles in
+    completion order.
+    """
+    tiles = partition_grid(len(lats), len(lons), tile_cells)
+    if workers <= 1:
+        if model is None:
+            model = load_model(model_path)
+        for r0, r1, c0, c1 in tiles:
+            yield (r0, r1, c0, c1), forecast_tile(model, lats[r0:r1], lons[c0:c1], daysofyear, chunk_size)
+        return
+
+    if model_path is None:
+        raise ValueError("model_path is required when workers > 1")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path,)) as executor:
+        futures = [executor.submit(_worker_forecast_tile, tile, lats[tile[0]:tile[1]],
+                                   lons[tile[2]:tile[3]], list(daysofyear), chunk_size)
+                   for tile in tiles]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def measure_throughput(lats, lons, daysofyear, model_path: str, workers: int,
+                       tile_cells: int = 100) -> Dict[str, float]:
+    """Run a full forecast without persisting it and report cells/second."""
+    started = time.perf_counter()
+    cells = 0
+    for _, values in iter_forecast_tiles(lats, lons, daysofyear, model_path=model_path,
+                                         workers=workers, tile_cells=tile_cells):
+        cells += values.size
+    seconds = time.perf_counter() - started
+    return {'workers': workers, 'cells': cells, 'seconds': seconds,
+            'cells_per_second': cells / seconds if seconds else float('inf')}
@@ -0,0 +1,149 @@
+# forecast_store.py
+"""
+Dense, memory-mapped store for gridded pollen forecasts.
+
+Forecasts are produced on a regular grid, so besides the PollenForecast rows
+each run is materialized as one float32 array of shape (days, n_lat, n_lon)
+saved as `values.npy` next to a `meta.json` describing the grid origin,
+step and dates. Point lookups become index arithmetic plus one or four
+array reads, and bounding-box queries are array slices, without touching
+the database.
+
+Layout:
+    <root>/run_<run_id>/meta.json
+    <root>/run_<run_id>/values.npy
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ForecastGrid:
+    """One run's forecast array plus its grid geometry."""
+
+    def __init__(self, values: np.ndarray, meta: Dict):
+        self.values = values
+        self.meta = meta
+        self.run_id = meta['run_id']
+        self.south = meta['south']
+        self.west = meta['west']
+        self.step = meta['step']
+        self.n_lat = meta['n_lat']
+        self.n_lon = meta['n_lon']
+        self.dates = [date.fromisoformat(d) for d in meta['dates']]
+
+    @property
+    def lats(self) -> np.ndarray:
+        return self.south + np.arange(self.n_lat) * self.step
+
+    @property
+    def lons(self) -> np.ndarray:
+        return self.west + np.arange(self.n_lon) * self.step
+
+    def day_indices(self, start: date, days: int) -> List[int]:
+        """Indices of up to `days` stored dates on or after `start`."""
+        return [i for i, d in enumerate(self.dates) if d >= start][:days]
+
+    def nearest(self, lat: float, lon: float, day_idx: Sequence[int]) -> Optional[np.ndarray]:
+        """Values of the nearest grid cell for the given days, or None outside the grid."""
+        row = int(round((lat - self.south) / self.step))
+        col = int(round((lon - self.west) / self.step))
+        if not (0 <= row < self.n_lat and 0 <= col < self.n_lon):
+            return None
+        return np.asarray(self.values[list(day_idx), row, col], dtype=np.float64)
+
+    def bilinear(self, lat: float, lon: float, day_idx: Sequence[int]) -> Optional[np.ndarray]:
+        """Bilinear interpolation between the four surrounding cells, or None outside the grid."""
+        y = (lat - self.south) / self.step
+        x = (lon - self.west) / self.step
+        if not (0 <= y <= self.n_lat - 1 and 0 <= x <= self.n_lon - 1):
+            return None
+        r0, c0 = int(np.floor(y)), int(np.floor(x))
+        r1, c1 = min(r0 + 1, self.n_lat - 1), min(c0 + 1, self.n_lon - 1)
+        fy, fx = y - r0, x - c0
+        days = list(day_idx)
+        cell = lambda r, c: np.asarray(self.values[days, r, c], dtype=np.float64)
+        top = cell(r0, c0) * (1 - fx) + cell(r0, c1) * fx
+        bottom = cell(r1, c0) * (1 - fx) + cell(r1, c1) * fx
+        return top * (1 - fy) + bottom * fy
+
+    def window(self, bounds: Dict[str, float]) -> Tuple[slice, slice]:
+        """Row/column slices of the cells inside bounds (inclusive)."""
+        r0 = max(0, int(np.ceil((bounds['south'] - self.south) / self.step - 1e-9)))
+        r1 = min(self.n_lat, int(np.floor((bounds['north'] - self.south) / self.step + 1e-9)) + 1)
+        c0 = max(0, int(np.ceil((bounds['west'] - self.west) / self.step - 1e-9)))
+        c1 = min(self.n_lon, int(np.floor((bounds['east'] - self.west) / self.step + 1e-9)) + 1)
+        return slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+
+
+class ForecastGridStore:
+    """Writes run arrays and serves the grid of a given run from a per-process cache."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._grid: Optional[ForecastGrid] = None
+        self._lock = threading.Lock()
+
+    def _run_dir(self, run_id: int) -> str:
+        return os.path.join(self.root, f'run_{run_id}')
+
+    def write(self, run_id: int, values: np.ndarray, south: float, west: float, step: float,
+              dates: Sequence[date], model_version: Optional[str] = None,
+              pollen_type: str = 'general') -> str:
+        """Persist a run; written to a temp dir and renamed so readers never see partial files."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f'.run_{run_id}_', dir=self.root)
+        meta = {
+            'run_id': run_id,
+            'south': float(south),
+            'west': float(west),
+            'step': float(step),
+            'n_lat': int(values.shape[1]),
+            'n_lon': int(values.shape[2]),
+            'dates': [d.isoformat() for d in dates],
+            'model_version': model_version,
+            'pollen_type': pollen_type,
+        }
+        np.save(os.path.join(tmp, 'values.npy'), np.ascontiguousarray(values, dtype=np.float32))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        target = self._run_dir(run_id)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(tmp, target)
+        return target
+
+    def load(self, run_id: Optional[int]) -> Optional[ForecastGrid]:
+        """Memory-mapped grid for run_id (cached until another run is requested)."""
+        if run_id is None:
+            return None
+        with self._lock:
+            if self._grid is not None and self._grid.run_id == run_id:
+                return self._grid
+            run_dir = self._run_dir(run_id)
+            try:
+                with open(os.path.join(run_dir, 'meta.json')) as f:
+                    meta = json.load(f)
+                values = np.load(os.path.join(run_dir, 'values.npy'), mmap_mode='r')
+            except (OSError, ValueError):
+                return None
+            self._grid = ForecastGrid(values, meta)
+            return self._grid
+
+    def collect_garbage(self, keep_run_ids: Sequence[int]) -> int:
+        """Remove run directories not listed in keep_run_ids; returns how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        keep = {f'run_{run_id}' for run_id in keep_run_ids}
+        removed = 0
+        for name in os.listdir(self.root):
+            if name.startswith('run_') and name not in keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,147 @@
+# heatmap_cache.py
+"""
+In-process cache for interpolated heatmap grids.
+
+Grids are computed per slippy-map tile (z/x/y, Web Mercator numbering, the
+same scheme the frontend map uses) on a lattice aligned to multiples of the
+grid step, so neighbouring tiles stitch seamlessly and any requested bounds
+can be served from the tiles that cover them. Entries are keyed by
+(z, x, y, step, method, generation), where `method` is the interpolation
+engine (tiles from different engines never share an entry) and `generation`
+identifies the ingested data; a new ingest makes every older entry unreachable, and `invalidate()` drops
+them eagerly. Eviction is LRU under both an entry-count and a byte budget.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+MAX_MERCATOR_LAT = 85.05112878
+MAX_ZOOM = 12
+
+
+def _lat_to_tile_y(lat: float, z: int) -> float:
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    lat_r = math.radians(lat)
+    return (1.0 - math.asinh(math.tan(lat_r)) / math.pi) / 2.0 * (1 << z)
+
+
+def _lon_to_tile_x(lon: float, z: int) -> float:
+    return (lon + 180.0) / 360.0 * (1 << z)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Dict[str, float]:
+    """Geographic bounds of tile z/x/y."""
+    n = 1 << z
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return {
+        'north': north,
+        'south': south,
+        'west': x / n * 360.0 - 180.0,
+        'east': (x + 1) / n * 360.0 - 180.0,
+    }
+
+
+def zoom_for_bounds(bounds: Dict[str, float]) -> int:
+    """Coarsest zoom whose tile width does not exceed the bounds' width."""
+    span = max(bounds['east'] - bounds['west'], 1e-6)
+    return int(max(0, min(MAX_ZOOM, math.floor(math.log2(360.0 / span)))))
+
+
+def tiles_for_bounds(bounds: Dict[str, float], z: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """Tiles at zoom `z` (derived from the bounds if omitted) covering `bounds`."""
+    if z is None:
+        z = zoom_for_bounds(bounds)
+    n = 1 << z
+    # east/south edges are exclusive so a tile's own bounds map back to it
+    x0 = int(_lon_to_tile_x(bounds['west'], z))
+    x1 = max(x0, math.ceil(_lon_to_tile_x(bounds['east'], z)) - 1)
+    y0 = int(_lat_to_tile_y(bounds['north'], z))
+    y1 = max(y0, math.ceil(_lat_to_tile_y(bounds['south'], z)) - 1)
+    return [(z, x, y)
+            for x in range(max(0, x0), min(n - 1, x1) + 1)
+            for y in range(max(0, y0), min(n - 1, y1) + 1)]
+
+
+def tiles_near_points(lats, lons, z: int) -> List[Tuple[int, int, int]]:
+    """
+    Tiles at zoom `z` whose heatmap depends on stations at the given points.
+    A tile is interpolated from stations up to half a tile beyond its edges
+    (main.build_heatmap_tile), so each point affects its own tile and the
+    neighbours within about half a tile of it.
+    """
+    n = 1 << z
+    lat_r = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    fx = (np.asarray(lons, dtype=np.float64) + 180.0) / 360.0 * n
+    fy = (1.0 - np.arcsinh(np.tan(lat_r)) / np.pi) / 2.0 * n
+    # half a tile, plus a margin for tiles of different heights (Mercator stretch)
+    reach = 0.55
+    xs = np.clip(np.stack((np.floor(fx - reach), np.floor(fx + reach))), 0, n - 1).astype(np.int64)
+    ys = np.clip(np.stack((np.floor(fy - reach), np.floor(fy + reach))), 0, n - 1).astype(np.int64)
+    # every (x, y) combination of the two candidate columns and rows of each point
+    pairs = np.unique(np.column_stack((np.repeat(xs, 2, axis=0).ravel(), np.tile(ys, (2, 1)).ravel())), axis=0)
+    return [(z, int(x), int(y)) for x, y in pairs]
+
+
+class HeatmapCache:
+    """Thread-safe LRU cache of grid arrays with entry, byte and age limits."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Tuple[np.ndarray, ...]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[np.ndarray, ...]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            created, nbytes, arrays = entry
+            if self.ttl_seconds is not None and time.monotonic() - created > self.ttl_seconds:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return arrays
+
+    def put(self, key: Hashable, arrays: Tuple[np.ndarray, ...]):
+        nbytes = sum(a.nbytes for a in arrays)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), nbytes, arrays)
+            self._bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self):
+        """Drop every entry (called after ingest commits)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
@@ -0,0 +1,236 @@
+# heatmap_pyramid.py
+"""
+Multi-resolution heatmap pyramid, built once per ingest.
+
+After each ingest the readings are interpolated once over the whole
+configured region at several grid steps (e.g. 0.4, 0.1 and 0.025 degrees)
+with one interpolation engine (interpolation.py), all levels sharing its
+spatial index (cached across ingests while the station set is unchanged).
+Each level is a float32 array (NaN where there is no value) aligned to
+multiples of its step, the same lattice HeatmapGenerator.grid_axis uses,
+so a request is answered by picking a level and slicing it rather than by
+interpolating again. The level is the
+finest one whose grid for the requested bounds fits within `max_cells`.
+A level only holds the region; the parts of a request beyond it
+(PyramidLevel.outside) have to be interpolated by the caller on the same
+lattice.
+
+Pyramids are written like forecast_store runs (temp dir + rename) and
+named by a `CURRENT` file, so every web worker memory-maps the same arrays
+and switches to a new pyramid on its next request.
+
+Layout:
+    <root>/gen_<generation>/meta.json
+    <root>/gen_<generation>/level_<i>.npy
+    <root>/CURRENT
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from interpolation import InterpolationEngine, LinearInterpolator
+
+CURRENT_FILE = 'CURRENT'
+
+
+def aligned_axis(lo: float, hi: float, step: float) -> np.ndarray:
+    """Multiples of `step` in [lo, hi), so grids of adjacent bounds line up."""
+    start = int(np.ceil(lo / step - 1e-9))
+    stop = int(np.ceil(hi / step - 1e-9))
+    return np.arange(start, stop) * step
+
+
+def _index_range(lo: float, hi: float, step: float) -> Tuple[int, int]:
+    return int(np.ceil(lo / step - 1e-9)), int(np.ceil(hi / step - 1e-9))
+
+
+class PyramidLevel:
+    """One level: values[r, c] is the cell at ((row0 + r) * step, (col0 + c) * step)."""
+
+    def __init__(self, values: np.ndarray, step: float, row0: int, col0: int):
+        self.values = values
+        self.step = step
+        self.row0 = row0
+        self.col0 = col0
+
+    def window(self, bounds: Dict[str, float]) -> Tuple[slice, slice]:
+        """Row/column slices of the cells in [south, north) x [west, east)."""
+        r0, r1 = _index_range(bounds['south'], bounds['north'], self.step)
+        c0, c1 = _index_range(bounds['west'], bounds['east'], self.step)
+        n_lat, n_lon = self.values.shape
+        r0, r1 = max(0, r0 - self.row0), min(n_lat, r1 - self.row0)
+        c0, c1 = max(0, c0 - self.col0), min(n_lon, c1 - self.col0)
+        return slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+
+    def cells(self, bounds: Dict[str, float]) -> int:
+        """Cells of this level's lattice in bounds, including any beyond the region."""
+        r0, r1 = _index_range(bounds['south'], bounds['north'], self.step)
+        c0, c1 = _index_range(bounds['west'], bounds['east'], self.step)
+        return max(0, r1 - r0) * max(0, c1 - c0)
+
+    def outside(self, bounds: Dict[str, float]) -> List[Dict[str, float]]:
+        """
+        Parts of bounds with cells this level does not hold: up to four strips
+        (south, north, west, east), none when bounds lie within the region.
+        Strip edges fall half a step outside the level's outermost cells, so
+        the strips and arrays(bounds) together hold every cell exactly once.
+        """
+        n_lat, n_lon = self.values.shape
+        south, north = (self.row0 - 0.5) * self.step, (self.row0 + n_lat - 0.5) * self.step
+        west, east = (self.col0 - 0.5) * self.step, (self.col0 + n_lon - 0.5) * self.step
+        band = dict(bounds, south=max(bounds['south'], south), north=min(bounds['north'], north))
+        parts = [dict(bounds, north=min(bounds['north'], south)),
+                 dict(bounds, south=max(bounds['south'], north)),
+                 dict(band, east=min(bounds['east'], west)),
+                 dict(band, west=max(bounds['west'], east))]
+        return [part for part in parts if part['north'] > part['south'] and part['east'] > part['west']]
+
+    def arrays(self, bounds: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(lats, lons, values) of the cells with a value inside bounds, lat-major."""
+        rows, cols = self.window(bounds)
+        lats = (self.row0 + np.arange(rows.start, rows.stop)) * self.step
+        lons = (self.col0 + np.arange(cols.start, cols.stop)) * self.step
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        values = np.asarray(self.values[rows, cols], dtype=np.float64)
+        keep = ~np.isnan(values)
+        return lat_grid[keep], lon_grid[keep], values[keep]
+
+
+class HeatmapPyramid:
+    """All levels of one build, coarsest first."""
+
+    def __init__(self, levels: List[PyramidLevel], meta: Dict):
+        self.levels = sorted(levels, key=lambda level: -level.step)
+        self.meta = meta
+        self.generation = meta['generation']
+        self.region = meta['region']
+        self.built_at = datetime.fromisoformat(meta['built_at'])
+        # pyramids written before engines were selectable are linear
+        self.method = meta.get('method', 'linear')
+
+    def covers(self, bounds: Dict[str, float]) -> bool:
+        """
+        Whether bounds overlap the region the pyramid was built for. Only the
+        overlap is in the pyramid; see PyramidLevel.outside for the rest.
+        """
+        return (bounds['south'] < self.region['north'] and bounds['north'] > self.region['south'] and
+                bounds['west'] < self.region['east'] and bounds['east'] > self.region['west'])
+
+    def select(self, bounds: Dict[str, float], max_cells: int) -> PyramidLevel:
+        """Finest level whose grid over bounds has at most max_cells cells (else the coarsest)."""
+        for level in reversed(self.levels):
+            if level.cells(bounds) <= max_cells:
+                return level
+        return self.levels[0]
+
+
+def interpolate_levels(points: np.ndarray, values: np.ndarray, region: Dict[str, float],
+                       steps: Sequence[float], fill_value: float = np.nan,
+                       interpolator: Optional[InterpolationEngine] = None) -> List[PyramidLevel]:
+    """
+    Interpolation of (lat, lon) points onto every step's grid over region
+    (linear by default; any engine from interpolation.py).
+    With a shared `interpolator`, an unchanged station set reuses its cached weights.
+    """
+    interpolator = interpolator or LinearInterpolator(max_bytes=0)
+    levels = []
+    for step in steps:
+        r0, r1 = _index_range(region['south'], region['north'], step)
+        c0, c1 = _index_range(region['west'], region['east'], step)
+        lat_grid, lon_grid = np.meshgrid(np.arange(r0, r1) * step, np.arange(c0, c1) * step, indexing='ij')
+        targets = np.column_stack((lat_grid.ravel(), lon_grid.ravel()))
+        grid = interpolator.interpolate(points, values, targets, fill_value,
+                                        targets_key=('aligned', step, r0, r1, c0, c1)).reshape(lat_grid.shape)
+        levels.append(PyramidLevel(np.maximum(0, grid).astype(np.float32), step, r0, c0))
+    return levels
+
+
+class HeatmapPyramidStore:
+    """Writes pyramids and serves the current one from a per-process, memory-mapped cache."""
+
+    def __init__(self, root: str, keep: int = 2):
+        self.root = root
+        self.keep = keep
+        self._pyramid: Optional[HeatmapPyramid] = None
+        self._seen_key = None
+        self._lock = threading.Lock()
+
+    def _dir(self, generation: int) -> str:
+        return os.path.join(self.root, f'gen_{generation}')
+
+    def write(self, generation: int, levels: List[PyramidLevel], region: Dict[str, float],
+              stations: int, method: str = 'linear') -> str:
+        """Persist a pyramid (temp dir + rename) and make it current."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f'.gen_{generation}_', dir=self.root)
+        os.chmod(tmp, 0o755)
+        meta = {
+            'generation': generation,
+            'built_at': datetime.utcnow().isoformat(),
+            'region': {k: float(region[k]) for k in ('north', 'south', 'east', 'west')},
+            'stations': int(stations),
+            'method': method,
+            'levels': [{'file': f'level_{i}.npy', 'step': level.step, 'row0': level.row0, 'col0': level.col0}
+                       for i, level in enumerate(levels)],
+        }
+        for entry, level in zip(meta['levels'], levels):
+            np.save(os.path.join(tmp, entry['file']), np.ascontiguousarray(level.values, dtype=np.float32))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        target = self._dir(generation)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(tmp, target)
+        fd, pointer = tempfile.mkstemp(prefix='.current_', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(generation))
+        os.chmod(pointer, 0o644)
+        os.replace(pointer, os.path.join(self.root, CURRENT_FILE))
+        self.collect_garbage(generation)
+        return target
+
+    def load(self) -> Optional[HeatmapPyramid]:
+        """The current pyramid (re-read only when CURRENT has been replaced)."""
+        try:
+            st = os.stat(os.path.join(self.root, CURRENT_FILE))
+            key = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            return None
+        if key == self._seen_key:
+            return self._pyramid
+        with self._lock:
+            if key != self._seen_key:
+                self._pyramid = self._read()
+                self._seen_key = key
+            return self._pyramid
+
+    def _read(self) -> Optional[HeatmapPyramid]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                directory = self._dir(int(f.read().strip()))
+            with open(os.path.join(directory, 'meta.json')) as f:
+                meta = json.load(f)
+            levels = [PyramidLevel(np.load(os.path.join(directory, entry['file']), mmap_mode='r'),
+                                   entry['step'], entry['row0'], entry['col0'])
+                      for entry in meta['levels']]
+        except (OSError, ValueError, KeyError):
+            return None
+        return HeatmapPyramid(levels, meta)
+
+    def collect_garbage(self, current: int) -> int:
+        """Keep the current pyramid plus the newest `keep - 1` others; returns how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        others = sorted((os.path.getmtime(os.path.join(self.root, name)), name)
+                        for name in os.listdir(self.root)
+                        if name.startswith('gen_') and name != f'gen_{current}')
+        stale = [name for _, name in others[:max(0, len(others) - (self.keep - 1))]]
+        for name in stale:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return len(stale)
@@ -0,0 +1,252 @@
+# interpolation.py
+"""
+Interchangeable, vectorized interpolation engines for station values.
+
+All engines implement InterpolationEngine, one call:
+    engine.interpolate(points, values, targets, fill_value=nan, targets_key=None)
+where points/targets are (N, 2) lat/lon arrays. Targets an engine cannot
+cover (outside the hull, or farther than max_distance_km from any station)
+get fill_value.
+
+  - 'linear':  Delaunay barycentric interpolation (griddata(method='linear'))
+  - 'idw':     inverse-distance weighting over the k nearest stations
+  - 'nearest': value of the nearest station
+  - 'gp':      kriging-lite, a Gaussian process fitted on a station subsample
+
+linear, idw and nearest depend on the coordinates only through a weight
+matrix, so they share the Interpolator base, which caches:
+  - the spatial index (Delaunay triangulation or KD-tree), keyed by the
+    station coordinate set;
+  - for each (station set, target grid) pair, the weights as a sparse
+    (targets x stations) matrix.
+With a cached matrix, interpolating new values is one sparse
+matrix-vector product. Linear results equal griddata's for distinct
+stations.
+
+Station order does not matter: coordinates are sorted into a canonical
+order before hashing, and values are permuted to match. Stations that share
+coordinates are averaged (griddata keeps an arbitrary one of them).
+Distances are great-circle km, from a KD-tree over unit-sphere coordinates.
+"""
+import hashlib
+import threading
+import warnings
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.spatial import Delaunay, cKDTree
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel, WhiteKernel
+
+from heatmap_cache import HeatmapCache
+from spatial_join import EARTH_RADIUS_KM, chord_to_km, km_to_chord, latlon_to_unit_xyz
+
+
+def _digest(array: np.ndarray) -> str:
+    array = np.ascontiguousarray(array, dtype=np.float64)
+    return hashlib.blake2b(array.tobytes(), digest_size=16).hexdigest() + str(array.shape)
+
+
+def canonical_stations(points, values) -> Tuple[np.ndarray, np.ndarray]:
+    """Stations sorted by (lat, lon), with the values of stations sharing coordinates averaged."""
+    points = np.asarray(points, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    points, values = points[order], values[order]
+    first = np.ones(len(points), dtype=bool)
+    first[1:] = np.any(points[1:] != points[:-1], axis=1)
+    if first.all():
+        return points, values
+    group = np.cumsum(first) - 1
+    return points[first], np.bincount(group, weights=values) / np.bincount(group)
+
+
+def _unit_xyz(latlon: np.ndarray) -> np.ndarray:
+    return latlon_to_unit_xyz(latlon[:, 0], latlon[:, 1])
+
+
+def barycentric_weights(tri: Delaunay, targets: np.ndarray) -> Tuple[csr_matrix, np.ndarray]:
+    """Sparse (targets x points) linear interpolation weights and the mask of targets inside the hull."""
+    simplex = tri.find_simplex(targets)
+    inside = simplex >= 0
+    s = simplex[inside]
+    transform = tri.transform[s]
+    b = np.einsum('ijk,ik->ij', transform[:, :2, :], targets[inside] - transform[:, 2, :])
+    weights = np.column_stack((b, 1.0 - b.sum(axis=1)))
+    # three entries per inside row, none for rows outside the hull
+    indptr = np.zeros(len(targets) + 1, dtype=np.int64)
+    np.cumsum(inside * 3, out=indptr[1:])
+    matrix = csr_matrix((weights.ravel(), tri.simplices[s].ravel(), indptr),
+                        shape=(len(targets), tri.npoints))
+    return matrix, inside
+
+
+def inverse_distance_weights(tree: cKDTree, targets: np.ndarray, k: int, power: float,
+                             max_distance_km: Optional[float] = None) -> Tuple[csr_matrix, np.ndarray]:
+    """
+    Sparse (targets x points) weights over each target's k nearest stations,
+    proportional to 1 / distance**power, plus the mask of targets with at least one
+    station within max_distance_km.
+    """
+    k = min(k, tree.n)
+    bound = km_to_chord(max_distance_km) if max_distance_km else np.inf
+    chord, idx = tree.query(_unit_xyz(targets), k=k, distance_upper_bound=bound)
+    chord, idx = chord.reshape(len(targets), k), idx.reshape(len(targets), k)
+    found = idx < tree.n
+    # a station closer than a metre counts as an exact hit
+    weights = np.where(found, 1.0 / np.maximum(chord_to_km(np.where(found, chord, 0.0)), 1e-3) ** power, 0.0)
+    totals = weights.sum(axis=1)
+    valid = totals > 0
+    weights[valid] /= totals[valid, None]
+    indptr = np.zeros(len(targets) + 1, dtype=np.int64)
+    np.cumsum(found.sum(axis=1), out=indptr[1:])
+    matrix = csr_matrix((weights[found], idx[found], indptr), shape=(len(targets), tree.n))
+    return matrix, valid
+
+
+class InterpolationEngine(ABC):
+    """Interface of every engine: `name` and `interpolate`."""
+
+    name: str = None
+
+    @abstractmethod
+    def interpolate(self, points: np.ndarray, values: np.ndarray, targets: np.ndarray,
+                    fill_value: float = np.nan, targets_key: Optional[Hashable] = None) -> np.ndarray:
+        """
+        Values at `targets` (N x 2) interpolated from `points` (M x 2) with `values` (M,);
+        fill_value where the engine has no estimate. `targets_key` identifies the
+        target grid (e.g. its step and index range) for engines that cache per grid.
+        """
+
+
+class Interpolator(InterpolationEngine):
+    """Base for engines whose result is (cached sparse weights) @ values."""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, max_entries: int = 64, max_indexes: int = 8):
+        self.weights = HeatmapCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _build_index(self, points: np.ndarray):
+        """Spatial index over the canonical station coordinates."""
+
+    @abstractmethod
+    def _build_weights(self, index, targets: np.ndarray) -> Tuple[csr_matrix, np.ndarray]:
+        """Sparse (targets x stations) weights and the mask of targets with a value."""
+
+    def _index(self, key: str, points: np.ndarray):
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = self._build_index(points)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def interpolate(self, points: np.ndarray, values: np.ndarray, targets: np.ndarray,
+                    fill_value: float = np.nan, targets_key: Optional[Hashable] = None) -> np.ndarray:
+        """Without `targets_key` the targets are hashed to find cached weights."""
+        targets = np.asarray(targets, dtype=np.float64)
+        points, values = canonical_stations(points, values)
+        points_key = _digest(points)
+        key = (points_key, targets_key if targets_key is not None else _digest(targets))
+        cached = self.weights.get(key)
+        if cached is None:
+            matrix, valid = self._build_weights(self._index(points_key, points), targets)
+            self.weights.put(key, (matrix.data, matrix.indices, matrix.indptr, valid))
+        else:
+            data, indices, indptr, valid = cached
+            matrix = csr_matrix((data, indices, indptr), shape=(len(targets), len(points)))
+        out = matrix @ values
+        out[~valid] = fill_value
+        return out
+
+
+class LinearInterpolator(Interpolator):
+    """griddata(method='linear'); targets outside the stations' convex hull get fill_value."""
+
+    name = 'linear'
+
+    def _build_index(self, points):
+        return Delaunay(points)
+
+    def _build_weights(self, tri, targets):
+        return barycentric_weights(tri, targets)
+
+
+class IDWInterpolator(Interpolator):
+    """Inverse-distance weighting over the k nearest stations within max_distance_km."""
+
+    name = 'idw'
+
+    def __init__(self, k: int = 8, power: float = 2.0, max_distance_km: Optional[float] = None, **cache):
+        super().__init__(**cache)
+        self.k = k
+        self.power = power
+        self.max_distance_km = max_distance_km
+
+    def _build_index(self, points):
+        return cKDTree(_unit_xyz(points))
+
+    def _build_weights(self, tree, targets):
+        return inverse_distance_weights(tree, targets, self.k, self.power, self.max_distance_km)
+
+
+class NearestInterpolator(IDWInterpolator):
+    """Value of the nearest station within max_distance_km."""
+
+    name = 'nearest'
+
+    def __init__(self, max_distance_km: Optional[float] = None, **cache):
+        super().__init__(k=1, max_distance_km=max_distance_km, **cache)
+
+
+class GaussianProcessInterpolator(InterpolationEngine):
+    """
+    Kriging-lite: a Gaussian process (constant * RBF + white noise, hyperparameters
+    fitted by maximum likelihood) on at most max_points stations, predicted in chunks.
+    Nothing is cached: the fit depends on the values.
+    """
+
+    name = 'gp'
+
+    def __init__(self, max_points: int = 400, length_scale_km: float = 150.0,
+                 max_distance_km: Optional[float] = None, chunk_size: int = 20_000, seed: int = 0):
+        self.max_points = max_points
+        self.length_scale_km = length_scale_km
+        self.max_distance_km = max_distance_km
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    def interpolate(self, points: np.ndarray, values: np.ndarray, targets: np.ndarray,
+                    fill_value: float = np.nan, targets_key: Optional[Hashable] = None) -> np.ndarray:
+        targets = np.asarray(targets, dtype=np.float64)
+        points, values = canonical_stations(points, values)
+        sample = np.arange(len(points))
+        if len(points) > self.max_points:
+            sample = np.sort(np.random.default_rng(self.seed).choice(len(points), self.max_points, replace=False))
+        kernel = (ConstantKernel(1.0, (1e-2, 1e2)) * RBF(self.length_scale_km, (5.0, 5000.0))
+                  + WhiteKernel(0.1, (1e-5, 1e1)))
+        gp = GaussianProcessRegressor(kernel, normalize_y=True, random_state=self.seed)
+        with warnings.catch_warnings():
+            # uncorrelated or very sparse values push hyperparameters to their bounds; that fit is still usable
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            gp.fit(_unit_xyz(points[sample]) * EARTH_RADIUS_KM, values[sample])
+        target_xyz = _unit_xyz(targets)
+        out = np.empty(len(targets))
+        for start in range(0, len(targets), self.chunk_size):
+            out[start:start + self.chunk_size] = gp.predict(target_xyz[start:start + self.chunk_size] * EARTH_RADIUS_KM)
+        if self.max_distance_km:
+            chord, _ = cKDTree(_unit_xyz(points)).query(target_xyz, k=1)
+            out[chord_to_km(chord) > self.max_distance_km] = fill_value
+        return out
@@ -0,0 +1,130 @@
+# jobs.py
+"""
+In-process background jobs for long-running API actions (data refresh,
+model retraining).
+
+Jobs run on a small thread pool owned by the web worker; the HTTP request
+only enqueues and returns the job id. Submitting a job of a kind that is
+already queued or running returns the existing job instead of starting a
+second one. Job state lives in memory, so status is visible from the
+worker that accepted the job.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = QUEUED
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    _started: Optional[float] = field(default=None, repr=False)
+    _duration: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        if self._duration is not None:
+            return self._duration
+        if self._started is not None:
+            return time.monotonic() - self._started
+        return None
+
+    def report(self, progress: float, message: Optional[str] = None):
+        """Called by the job function to publish progress (0..1)."""
+        self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.duration_seconds
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': round(duration, 3) if duration is not None else None,
+        }
+
+
+class JobManager:
+    """Runs job functions in the background and tracks their state."""
+
+    def __init__(self, max_workers: int = 2, max_history: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._max_history = max_history
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[[Job], Optional[Dict[str, Any]]],
+               coalesce: bool = True) -> Job:
+        """
+        Enqueue `func(job)`; its return value becomes `job.result`.
+        With `coalesce`, an active job of the same kind is returned instead.
+        """
+        with self._lock:
+            if coalesce:
+                for job in self._jobs.values():
+                    if job.kind == kind and job.active:
+                        return job
+            job = Job(id=uuid.uuid4().hex, kind=kind)
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func):
+        job.status = RUNNING
+        job.started_at = datetime.utcnow()
+        job._started = time.monotonic()
+        try:
+            job.result = func(job)
+            job.status = SUCCEEDED
+            job.progress = 1.0
+        except Exception as e:
+            logger.error(f"Job {job.kind} {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job._duration = time.monotonic() - job._started
+            job.finished_at = datetime.utcnow()
+
+    def _trim(self):
+        # drop the oldest finished jobs beyond the history limit
+        excess = len(self._jobs) - self._max_history
+        for job_id in [j.id for j in self._jobs.values() if not j.active][:max(0, excess)]:
+            del self._jobs[job_id]
@@ -1,20 +1,45 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from sqlalchemy import Index 
+from sqlalchemy import Index, and_, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 import sqlite3
-from geopy.distance import geodesic
 import numpy as np
+import pandas as pd
 from scipy.spatial import cKDTree
-from scipy.interpolate import griddata
 import time
+from aqi import compute_aqi, aqi_value
+from config import Config
+from rate_limit import TokenBucket
+from jobs import Job, JobManager
+from forecast_store import ForecastGridStore
+from model_registry import ModelLoader, ModelRegistry
+from micro_batch import MicroBatcher
+from forecast_engine import FORECAST_FEATURES, point_feature_matrix, predict_in_chunks
+from spatial_index import cell_id
+from spatial_join import EARTH_RADIUS_KM, latlon_to_unit_xyz
+from geo_backend import PointTable, make_backend
+from partitions import DailyPartitions
+import rollups
+from heatmap_cache import (MAX_ZOOM, HeatmapCache, tile_bounds, tiles_for_bounds, tiles_near_points,
+                           zoom_for_bounds)
+from event_stream import ChangeNotifier, event_stream, format_event
+from heatmap_pyramid import HeatmapPyramidStore, aligned_axis, interpolate_levels
+from interpolation import (GaussianProcessInterpolator, IDWInterpolator, InterpolationEngine,
+                           LinearInterpolator, NearestInterpolator)
+from response_formats import (
+    UnsupportedFormat, RASTER_MIME, ARROW_MIME, negotiate_format,
+    grid_to_raster, pack_raster, columns_to_arrow, json_column
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,13 +49,20 @@ app = Flask(__name__)
 CORS(app)
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///air_quality.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = Config.SQLALCHEMY_DATABASE_URI
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
 # Initialize database
 db = SQLAlchemy(app)
 
+def cell_default(lat_key: str, lon_key: str):
+    """Column default computing the spatial cell id from the row's coordinates"""
+    def default(context):
+        params = context.get_current_parameters()
+        return cell_id(params[lat_key], params[lon_key])
+    return default
+
 # Data models
 class SensorReading(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,7 +75,21 @@ class SensorReading(db.Model):
     source = db.Column(db.String(100), nullable=False)
     location_name = db.Column(db.String(200), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    cell = db.Column(db.BigInteger, nullable=True, default=cell_default('latitude', 'longitude'))  # spatial_index key
     is_verified = db.Column(db.Boolean, default=False)
+    ingest_id = db.Column(db.Integer, nullable=True)  # SensorIngest that stored the row
+
+class SensorIngest(db.Model):
+    """
+    One store_sensor_data call. Ids follow insertion order, unlike reading ids,
+    which are ordered by measurement day (see partitions.py); /api/stream
+    cursors are built on them.
+    """
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)  # set once no more rows will be added
+    inserted = db.Column(db.Integer, nullable=False, default=0)
 
 class UserReport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -67,6 +113,7 @@ class AllergenReading(db.Model):
     pollen_type = db.Column(db.String(64), nullable=True)  # e.g., "tree", "grass", "weed"
     source = db.Column(db.String(100), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    cell = db.Column(db.BigInteger, nullable=True, default=cell_default('latitude', 'longitude'))  # spatial_index key
     is_verified = db.Column(db.Boolean, default=False)
 
 
@@ -79,10 +126,100 @@ class PollenForecast(db.Model):
     pollen_type = db.Column(db.String(64))
     model_version = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    run_id = db.Column(db.Integer, nullable=True)  # ForecastRun that produced the row
+    cell = db.Column(db.BigInteger, nullable=True, default=cell_default('lat', 'lon'))  # spatial_index key
+
+
+class ForecastRun(db.Model):
+    """One generation of PollenForecast rows; exactly one run is 'active' for reads"""
+    BUILDING = 'building'
+    ACTIVE = 'active'
+    SUPERSEDED = 'superseded'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default=BUILDING, index=True)
+    model_version = db.Column(db.String(50))
+    rows = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    activated_at = db.Column(db.DateTime, nullable=True)
+
+
+class SensorRollup(db.Model):
+    """Hourly / daily PM aggregates per station (source + cell), see rollups.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(8), nullable=False)  # 'hour' or 'day'
+    bucket = db.Column(db.DateTime, nullable=False)  # bucket start, naive UTC
+    source = db.Column(db.String(100), nullable=False)
+    cell = db.Column(db.BigInteger, nullable=True)  # spatial_index key
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    pm25_sum = db.Column(db.Float, nullable=False)
+    pm25_min = db.Column(db.Float, nullable=False)
+    pm25_max = db.Column(db.Float, nullable=False)
+    pm10_count = db.Column(db.Integer, nullable=False, default=0)
+    pm10_sum = db.Column(db.Float, nullable=True)
+    pm10_min = db.Column(db.Float, nullable=True)
+    pm10_max = db.Column(db.Float, nullable=True)
 
 # spatial index helpers (for sqlite this is best-effort; Postgres/PostGIS recommended)
 Index('idx_allergen_latlon', AllergenReading.latitude, AllergenReading.longitude)
 Index('idx_pollen_latlon', PollenForecast.lat, PollenForecast.lon)
+pollen_run_index = Index('idx_pollen_run_date', PollenForecast.run_id, PollenForecast.date)
+Index('idx_sensor_latlon', SensorReading.latitude, SensorReading.longitude)
+# cell-range scans for bounding-box queries with SPATIAL_BACKEND=cells (see spatial_index.py)
+cell_indexes = [
+    Index('idx_sensor_cell_ts', SensorReading.cell, SensorReading.timestamp),
+    Index('idx_allergen_cell_ts', AllergenReading.cell, AllergenReading.timestamp),
+    Index('idx_pollen_run_cell', PollenForecast.run_id, PollenForecast.cell),
+    Index('idx_rollup_cell', SensorRollup.resolution, SensorRollup.cell, SensorRollup.bucket),
+]
+Index('uq_rollup_station_bucket', SensorRollup.resolution, SensorRollup.bucket,
+      SensorRollup.source, SensorRollup.cell, unique=True)
+# rows of one ingest, for /api/stream
+Index('idx_sensor_ingest', SensorReading.ingest_id, SensorReading.id)
+# dedup key for bulk ingestion: the same "latest" measurement fetched twice is one row
+sensor_dedup_index = Index('uq_sensor_source_ts_latlon', SensorReading.source, SensorReading.timestamp,
+                           SensorReading.latitude, SensorReading.longitude, unique=True)
+
+# tables queried by location, and the backend that builds their spatial filters
+# (lat/lon bounds, cell-id ranges, PostGIS or SpatiaLite; see geo_backend.py)
+SPATIAL_COLUMNS = {
+    SensorReading.__tablename__: ('latitude', 'longitude'),
+    AllergenReading.__tablename__: ('latitude', 'longitude'),
+    PollenForecast.__tablename__: ('lat', 'lon'),
+    SensorRollup.__tablename__: ('latitude', 'longitude'),
+}
+with app.app_context():
+    spatial_backend = make_backend(db.engine, Config.SPATIAL_BACKEND, Config.SPATIALITE_LIBRARY)
+
+def point_table(target) -> PointTable:
+    """PointTable for a model, its table, or one of its daily partitions"""
+    table = getattr(target, '__table__', target)
+    lat, lon = SPATIAL_COLUMNS[table.info.get('partition_of', table.name)]
+    return PointTable.for_table(table, lat, lon)
+
+def bbox_filter(target, bounds: Dict) -> List:
+    """Filter clauses for rows of target inside bounds"""
+    return spatial_backend.bbox_clauses(point_table(target), bounds)
+
+def radius_filter(target, lat: float, lon: float, radius_km: float) -> List:
+    """Filter clauses for rows of target within radius_km of (lat, lon)"""
+    return spatial_backend.radius_clauses(point_table(target), lat, lon, radius_km)
+
+# readings and reports are stored in daily partitions (see partitions.py);
+# the model tables only serve as their schema
+sensor_partitions = DailyPartitions(
+    SensorReading.__table__,
+    on_create=lambda engine, table: spatial_backend.setup(engine, [point_table(table)]),
+    list_seconds=Config.PARTITION_LIST_SECONDS)
+report_partitions = DailyPartitions(UserReport.__table__, list_seconds=Config.PARTITION_LIST_SECONDS)
+
+def grid_arrays_to_dicts(lats, lons, values) -> List[Dict]:
+    """Convert grid arrays to the JSON list-of-dicts response format"""
+    return [{'lat': lat, 'lon': lon, 'value': value}
+            for lat, lon, value in zip(lats.tolist(), lons.tolist(), values.tolist())]
 
 @dataclass
 class AirQualityData:
@@ -99,13 +236,14 @@ class OpenAQClient:
     """Client for OpenAQ API - open source air quality data"""
     BASE_URL = "https://api.openaq.org/v3"
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or self.BASE_URL
         self.session = requests.Session()
     
     def get_latest_measurements(self, country: str = "IN", limit: int = 1000) -> List[AirQualityData]:
         """Fetch latest air quality measurements for India"""
         try:
-            url = f"{self.BASE_URL}/latest"
+            url = f"{self.base_url}/latest"
             params = {
                 "country": country,
                 "limit": limit,
@@ -142,32 +280,33 @@ class OpenAQClient:
     @staticmethod
     def pm25_to_aqi(pm25: float) -> int:
         """Convert PM2.5 to AQI using US EPA formula"""
-        if pm25 <= 12.0:
-            return round((50 / 12.0) * pm25)
-        elif pm25 <= 35.4:
-            return round((99 - 51) / (35.4 - 12.1) * (pm25 - 12.1) + 51)
-        elif pm25 <= 55.4:
-            return round((149 - 101) / (55.4 - 35.5) * (pm25 - 35.5) + 101)
-        elif pm25 <= 150.4:
-            return round((199 - 151) / (150.4 - 55.5) * (pm25 - 55.5) + 151)
-        elif pm25 <= 250.4:
-            return round((299 - 201) / (250.4 - 150.5) * (pm25 - 150.5) + 201)
-        else:
-            return round((399 - 301) / (350.4 - 250.5) * (pm25 - 250.5) + 301)
+        return aqi_value('pm25', pm25, extrapolate=True)
 
 class WAQIClient:
     """Client for World Air Quality Index API"""
     BASE_URL = "https://api.waqi.info"
     
-    def __init__(self, api_token: str):
+    def __init__(self, api_token: str, base_url: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None, pool_size: int = 10):
         self.api_token = api_token
+        self.base_url = base_url or self.BASE_URL
+        self.rate_limiter = rate_limiter
         self.session = requests.Session()
+        # one pooled connection per concurrent fetch worker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def _throttle(self):
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
     
     def get_city_data(self, city: str) -> Optional[AirQualityData]:
         """Fetch air quality data for a specific city"""
         try:
-            url = f"{self.BASE_URL}/feed/{city}/"
+            url = f"{self.base_url}/feed/{city}/"
             params = {"token": self.api_token}
+            self._throttle()
             
             response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
@@ -197,11 +336,12 @@ class WAQIClient:
                              lat_max: float, lng_max: float) -> List[AirQualityData]:
         """Fetch stations within geographic bounds"""
         try:
-            url = f"{self.BASE_URL}/map/bounds"
+            url = f"{self.base_url}/map/bounds"
             params = {
                 "token": self.api_token,
                 "latlng": f"{lat_min},{lng_min},{lat_max},{lng_max}"
             }
+            self._throttle()
             
             response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
@@ -233,69 +373,183 @@ class WAQIClient:
 class DataAggregator:
     """Aggregates data from multiple sources"""
     
-    def __init__(self):
-        self.openaq_client = OpenAQClient()
-        waqi_token = os.getenv("WAQI_API_TOKEN")
-        self.waqi_client = WAQIClient(waqi_token) if waqi_token else None
+    # Major Indian cities fetched from WAQI
+    MAJOR_CITIES = [
+        "delhi", "mumbai", "bangalore", "hyderabad", "ahmedabad",
+        "chennai", "kolkata", "surat", "pune", "jaipur", "lucknow",
+        "kanpur", "nagpur", "indore", "thane", "bhopal", "visakhapatnam",
+        "pimpri-chinchwad", "patna", "vadodara", "ghaziabad", "ludhiana",
+        "agra", "nashik", "faridabad", "meerut", "rajkot"
+    ]
+    
+    def __init__(self, openaq_client: Optional[OpenAQClient] = None,
+                 waqi_client: Optional[WAQIClient] = None,
+                 max_workers: Optional[int] = None):
+        self.max_workers = max_workers or Config.FETCH_MAX_WORKERS
+        self.openaq_client = openaq_client or OpenAQClient()
+        if waqi_client is None:
+            waqi_token = os.getenv("WAQI_API_TOKEN")
+            if waqi_token:
+                waqi_client = WAQIClient(
+                    waqi_token,
+                    rate_limiter=TokenBucket(Config.WAQI_REQUESTS_PER_SECOND, Config.WAQI_BURST),
+                    pool_size=self.max_workers
+                )
+        self.waqi_client = waqi_client
         
     def fetch_all_data(self) -> List[AirQualityData]:
-        """Fetch data from all available sources"""
+        """
+        Fetch data from all available sources.
+        OpenAQ and the WAQI city feeds are fetched concurrently on a bounded
+        thread pool; WAQI calls are paced by the client's token bucket.
+        """
         all_data = []
         
-        # Fetch from OpenAQ
-        openaq_data = self.openaq_client.get_latest_measurements()
-        all_data.extend(openaq_data)
-        
-        # Fetch from WAQI if token is available
-        if self.waqi_client:
-            # Get data for major Indian cities
-            major_cities = [
-                "delhi", "mumbai", "bangalore", "hyderabad", "ahmedabad",
-                "chennai", "kolkata", "surat", "pune", "jaipur", "lucknow",
-                "kanpur", "nagpur", "indore", "thane", "bhopal", "visakhapatnam",
-                "pimpri-chinchwad", "patna", "vadodara", "ghaziabad", "ludhiana",
-                "agra", "nashik", "faridabad", "meerut", "rajkot"
-            ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Fetch from OpenAQ
+            openaq_future = executor.submit(self.openaq_client.get_latest_measurements)
+            
+            # Fetch from WAQI if token is available
+            city_futures = []
+            if self.waqi_client:
+                city_futures = [executor.submit(self.waqi_client.get_city_data, city)
+                                for city in self.MAJOR_CITIES]
             
-            for city in major_cities:
-                city_data = self.waqi_client.get_city_data(city)
+            all_data.extend(openaq_future.result())
+            for future in city_futures:
+                city_data = future.result()
                 if city_data:
                     all_data.append(city_data)
-                time.sleep(1)  # Rate limiting
         
         return all_data
     
-    def store_sensor_data(self, data_list: List[AirQualityData]):
-        """Store sensor data in database"""
-        for data in data_list:
-            sensor_reading = SensorReading(
-                latitude=data.latitude,
-                longitude=data.longitude,
-                pm25=data.pm25,
-                pm10=data.pm10,
-                source=data.source,
-                location_name=data.location_name,
-                timestamp=data.timestamp,
-                is_verified=True  # Data from APIs is considered verified
-            )
-            
-            db.session.add(sensor_reading)
+    @staticmethod
+    def _sensor_row(data: AirQualityData) -> Dict:
+        timestamp = data.timestamp
+        if timestamp.tzinfo is not None:
+            # stored naive UTC, like the datetime.utcnow() cutoffs used in queries
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return {
+            'latitude': data.latitude,
+            'longitude': data.longitude,
+            'pm25': data.pm25,
+            'pm10': data.pm10,
+            'source': data.source,
+            'location_name': data.location_name,
+            'timestamp': timestamp,
+            'is_verified': True  # Data from APIs is considered verified
+        }
+
+    @staticmethod
+    def _insert_ignoring_duplicates(table):
+        """INSERT that skips rows hitting the (source, timestamp, lat, lon) key"""
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            return sqlite.insert(table).on_conflict_do_nothing()
+        if dialect == 'postgresql':
+            return postgresql.insert(table).on_conflict_do_nothing()
+        # other backends: the unique index rejects batches containing duplicates
+        return insert(table)
+
+    def store_sensor_data(self, data_list: List[AirQualityData], batch_size: Optional[int] = None) -> Dict:
+        """
+        Store sensor data in database.
+        Rows are written with executemany in batches of `batch_size`, one
+        commit per batch so the SQLite write lock is released between batches.
+        Readings already stored (same source, timestamp and coordinates),
+        readings without PM2.5 and readings older than the retention window
+        are skipped. Rows go to the daily partition of their timestamp.
+        Returns insert statistics.
+        """
+        batch_size = batch_size or Config.SENSOR_INSERT_BATCH_SIZE
+        retention_cutoff = datetime.utcnow() - Config.SENSOR_DATA_RETENTION
+        rows = [row for row in (self._sensor_row(d) for d in data_list if d.pm25 is not None)
+                if row['timestamp'] >= retention_cutoff]
+        if rows:
+            cells = cell_id(np.array([r['latitude'] for r in rows], dtype=float),
+                            np.array([r['longitude'] for r in rows], dtype=float))
+            for row, cell in zip(rows, cells.tolist()):
+                row['cell'] = cell
+        stats = {'received': len(data_list), 'inserted': 0,
+                 'skipped': len(data_list) - len(rows), 'batches': []}
+        if rows:
+            # registered (and committed) first, so the stream knows an ingest is under way
+            ingest = SensorIngest()
+            db.session.add(ingest)
+            db.session.commit()
+            for row in rows:
+                row['ingest_id'] = ingest.id
+        # partitions are created up front: DDL on another connection would
+        # wait on the session's SQLite write lock
+        groups = [(self._insert_ignoring_duplicates(sensor_partitions.ensure(db.engine, day)), day_rows)
+                  for day, day_rows in sensor_partitions.group_by_day(rows).items()]
+        batches = [(stmt, day_rows[start:start + batch_size])
+                   for stmt, day_rows in groups for start in range(0, len(day_rows), batch_size)]
         
-        try:
+        for n, (stmt, batch) in enumerate(batches):
+            started = time.perf_counter()
+            try:
+                result = db.session.execute(stmt, batch)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error storing sensor data: {e}")
+                db.session.rollback()
+                stats['skipped'] += sum(len(b) for _, b in batches[n:])
+                break
+            inserted = max(result.rowcount, 0)
+            stats['inserted'] += inserted
+            stats['skipped'] += len(batch) - inserted
+            stats['batches'].append({'rows': len(batch), 'inserted': inserted,
+                                     'seconds': round(time.perf_counter() - started, 4)})
+        if rows:
+            ingest.completed_at = datetime.utcnow()
+            ingest.inserted = stats['inserted']
             db.session.commit()
-            logger.info(f"Stored {len(data_list)} sensor readings")
-        except Exception as e:
-            logger.error(f"Error storing sensor data: {e}")
-            db.session.rollback()
+        
+        if stats['inserted']:
+            heatmap_cache.invalidate()
+            try:
+                refresh_rollups(rollups.hour_buckets(r['timestamp'] for r in rows))
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error updating sensor rollups: {e}")
+            try:
+                build_heatmap_pyramid()
+            except Exception as e:
+                logger.error(f"Error building heatmap pyramid: {e}")
+            stream_notifier.notify()
+        batch_seconds = [b['seconds'] for b in stats['batches']]
+        logger.info(f"Stored {stats['inserted']} sensor readings, skipped {stats['skipped']} "
+                    f"({len(batch_seconds)} batches, {sum(batch_seconds):.3f}s)")
+        return stats
 
 class HeatmapGenerator:
     """Generate interpolated heatmap data"""
     
     @staticmethod
-    def generate_grid_data(sensor_data: List[Dict], bounds: Dict) -> List[Dict]:
-        """Generate interpolated grid data for heatmap"""
+    def grid_axis(lo: float, hi: float, step: float = 0.1) -> np.ndarray:
+        """Multiples of `step` in [lo, hi), so grids of adjacent bounds line up."""
+        return aligned_axis(lo, hi, step)
+
+    @staticmethod
+    def interpolator(method: Optional[str] = None) -> InterpolationEngine:
+        """The shared engine for `method` (default Config.HEATMAP_METHOD); ValueError if unknown."""
+        method = method or Config.HEATMAP_METHOD
+        if method not in interpolators:
+            raise ValueError(f"Unknown interpolation method '{method}' (expected one of: {', '.join(interpolators)})")
+        return interpolators[method]
+
+    @staticmethod
+    def generate_grid_arrays(sensor_data: List[Dict], bounds: Dict, step: float = 0.1,
+                             method: Optional[str] = None):
+        """
+        Interpolate onto the grid inside bounds with the `method` engine; returns
+        (lats, lons, values) arrays. Cells the engine cannot cover are left out.
+        """
+        empty = (np.empty(0), np.empty(0), np.empty(0))
+        interpolator = HeatmapGenerator.interpolator(method)
         if not sensor_data:
-            return []
+            return empty
         
         try:
             # Extract coordinates and values
@@ -303,78 +557,199 @@ class HeatmapGenerator:
             values = np.array([d.get('pm25', d.get('aqi', 50)) for d in sensor_data])
             
             # Create grid
-            lat_range = np.arange(bounds['south'], bounds['north'], 0.1)
-            lon_range = np.arange(bounds['west'], bounds['east'], 0.1)
+            lat_range = HeatmapGenerator.grid_axis(bounds['south'], bounds['north'], step)
+            lon_range = HeatmapGenerator.grid_axis(bounds['west'], bounds['east'], step)
             lat_grid, lon_grid = np.meshgrid(lat_range, lon_range)
             
             # Interpolate values
             grid_points = np.column_stack((lat_grid.ravel(), lon_grid.ravel()))
-            interpolated_values = griddata(points, values, grid_points, method='linear', fill_value=50)
+            # the grid is fully determined by the step and the aligned index range of the bounds
+            grid_key = ('xy', step) + tuple(int(np.ceil(bounds[k] / step - 1e-9))
+                                            for k in ('south', 'north', 'west', 'east'))
+            interpolated_values = interpolator.interpolate(points, values, grid_points, targets_key=grid_key)
             
-            # Convert to list of dictionaries
-            grid_data = []
-            for i, (lat, lon) in enumerate(grid_points):
-                if not np.isnan(interpolated_values[i]):
-                    grid_data.append({
-                        'lat': float(lat),
-                        'lon': float(lon),
-                        'value': float(max(0, interpolated_values[i]))
-                    })
-            
-            return grid_data
+            keep = ~np.isnan(interpolated_values)
+            return (grid_points[keep, 0], grid_points[keep, 1],
+                    np.maximum(0, interpolated_values[keep]))
             
         except Exception as e:
             logger.error(f"Error generating grid data: {e}")
-            return []
+            return empty
+
+    @staticmethod
+    def generate_grid_data(sensor_data: List[Dict], bounds: Dict, step: float = 0.1,
+                           method: Optional[str] = None) -> List[Dict]:
+        """Generate interpolated grid data for heatmap"""
+        lats, lons, values = HeatmapGenerator.generate_grid_arrays(sensor_data, bounds, step, method)
+        return grid_arrays_to_dicts(lats, lons, values)
 
     @staticmethod
     def refine_with_local_observations(grid_data, observations, radius_km=20):
         # observations: list of dicts with lat, lon, pollen_index
-        # For each grid point, find nearby observations and blend
-        from geopy.distance import distance
-        for g in grid_data:
-            weights = []
-            vals = []
-            for o in observations:
-                d = geodesic((g['lat'], g['lon']), (o['lat'], o['lon'])).km
-                if d <= radius_km:
-                    w = max(0.01, 1.0 - d / radius_km)
-                    weights.append(w)
-                    vals.append(o['pollen_index'])
-            if weights:
-                blended = sum(w*v for w,v in zip(weights, vals)) / sum(weights)
-                # simple average with original
-                g['value'] = (g['value'] + blended) / 2.0
+        # For each grid point, find nearby observations and blend.
+        # Pairs within radius_km come from a KD-tree over unit-sphere coordinates
+        # (chord distance is monotonic in great-circle distance), so the cost is
+        # proportional to the number of matching pairs rather than G*N.
+        if not grid_data or not observations:
+            return grid_data
+
+        grid_xyz = latlon_to_unit_xyz(
+            np.array([g['lat'] for g in grid_data], dtype=float),
+            np.array([g['lon'] for g in grid_data], dtype=float))
+        obs_xyz = latlon_to_unit_xyz(
+            np.array([o['lat'] for o in observations], dtype=float),
+            np.array([o['lon'] for o in observations], dtype=float))
+        obs_vals = np.array([o['pollen_index'] for o in observations], dtype=float)
+
+        chord_radius = 2.0 * np.sin(radius_km / (2.0 * EARTH_RADIUS_KM))
+        pairs = cKDTree(grid_xyz).sparse_distance_matrix(
+            cKDTree(obs_xyz), chord_radius, output_type='ndarray')
+        if len(pairs) == 0:
+            return grid_data
+
+        # chord length -> great-circle km; same linear falloff as before
+        dist_km = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(pairs['v'] / 2.0, 1.0))
+        weights = np.maximum(0.01, 1.0 - dist_km / radius_km)
+        n = len(grid_data)
+        weight_sum = np.bincount(pairs['i'], weights=weights, minlength=n)
+        value_sum = np.bincount(pairs['i'], weights=weights * obs_vals[pairs['j']], minlength=n)
+
+        for i in np.flatnonzero(weight_sum > 0):
+            blended = value_sum[i] / weight_sum[i]
+            # simple average with original
+            grid_data[i]['value'] = (grid_data[i]['value'] + blended) / 2.0
         return grid_data
     
 
 # Initialize data aggregator
 data_aggregator = DataAggregator()
 heatmap_generator = HeatmapGenerator()
+forecast_store = ForecastGridStore(Config.FORECAST_STORE_DIR)
+model_registry = ModelRegistry(Config.MODEL_REGISTRY_DIR, keep=Config.MODEL_REGISTRY_KEEP)
+# warm, per-worker view of the current allergen model (loaded on first use, swapped on publish)
+model_loader = ModelLoader(model_registry)
+
+def predict_pollen_rows(X: np.ndarray) -> np.ndarray:
+    """One model call for a coalesced batch of feature rows"""
+    current = model_loader.get()
+    if current is None:
+        raise RuntimeError('No trained allergen model available')
+    return predict_in_chunks(current.model, X)
+
+pollen_predictor = MicroBatcher(predict_pollen_rows, max_wait_ms=Config.PREDICT_BATCH_WAIT_MS,
+                                max_rows=Config.PREDICT_BATCH_MAX_ROWS, name='pollen')
+job_manager = JobManager(max_workers=Config.JOB_MAX_WORKERS)
+heatmap_cache = HeatmapCache(
+    max_entries=Config.HEATMAP_CACHE_MAX_ENTRIES,
+    max_bytes=Config.HEATMAP_CACHE_MAX_BYTES,
+    ttl_seconds=Config.HEATMAP_CACHE_TTL.total_seconds()
+)
+heatmap_pyramids = HeatmapPyramidStore(Config.HEATMAP_PYRAMID_DIR)
+# wakes this worker's /api/stream clients after an ingest commits
+stream_notifier = ChangeNotifier()
+# heatmap interpolation engines; spatial indexes and weights are reused while the station set is unchanged
+interpolators: Dict[str, InterpolationEngine] = {
+    'linear': LinearInterpolator(max_bytes=Config.INTERPOLATION_CACHE_MAX_BYTES),
+    'idw': IDWInterpolator(k=Config.HEATMAP_IDW_NEIGHBOURS, power=Config.HEATMAP_IDW_POWER,
+                           max_distance_km=Config.HEATMAP_MAX_DISTANCE_KM,
+                           max_bytes=Config.INTERPOLATION_CACHE_MAX_BYTES),
+    'nearest': NearestInterpolator(max_distance_km=Config.HEATMAP_MAX_DISTANCE_KM,
+                                   max_bytes=Config.INTERPOLATION_CACHE_MAX_BYTES),
+    'gp': GaussianProcessInterpolator(max_points=Config.HEATMAP_GP_MAX_POINTS,
+                                      max_distance_km=Config.HEATMAP_MAX_DISTANCE_KM),
+}
 
 # API Routes
 
+def begin_forecast_run(model_version: str) -> int:
+    """Register a new forecast generation; its rows stay invisible until activated"""
+    run = ForecastRun(model_version=model_version)
+    db.session.add(run)
+    db.session.commit()
+    return run.id
+
+def activate_forecast_run(run_id: int, rows: Optional[int] = None):
+    """Atomically make run_id the active generation (one transaction)"""
+    ForecastRun.query.filter(ForecastRun.status == ForecastRun.ACTIVE).update(
+        {'status': ForecastRun.SUPERSEDED}, synchronize_session=False)
+    ForecastRun.query.filter(ForecastRun.id == run_id).update(
+        {'status': ForecastRun.ACTIVE, 'rows': rows, 'activated_at': datetime.utcnow()},
+        synchronize_session=False)
+    db.session.commit()
+
+def fail_forecast_run(run_id: int):
+    db.session.rollback()
+    ForecastRun.query.filter(ForecastRun.id == run_id).update(
+        {'status': ForecastRun.FAILED}, synchronize_session=False)
+    db.session.commit()
+
+def active_forecast_run_id() -> Optional[int]:
+    run = ForecastRun.query.filter(ForecastRun.status == ForecastRun.ACTIVE) \
+        .order_by(ForecastRun.activated_at.desc()).first()
+    return run.id if run else None
+
+def collect_forecast_garbage(keep_superseded: int = 0) -> int:
+    """
+    Delete rows of superseded and failed runs (keeping the newest
+    `keep_superseded` superseded runs for rollback) plus untagged legacy rows.
+    Returns the number of forecast rows removed.
+    """
+    superseded = [r.id for r in ForecastRun.query.filter(ForecastRun.status == ForecastRun.SUPERSEDED)
+                  .order_by(ForecastRun.activated_at.desc()).all()]
+    kept = superseded[:keep_superseded]
+    superseded = superseded[keep_superseded:]
+    failed = [r.id for r in ForecastRun.query.filter(ForecastRun.status == ForecastRun.FAILED).all()]
+    dead = superseded + failed
+    removed = PollenForecast.query.filter(
+        db.or_(PollenForecast.run_id.in_(dead), PollenForecast.run_id.is_(None))
+    ).delete(synchronize_session=False)
+    if dead:
+        ForecastRun.query.filter(ForecastRun.id.in_(dead)).delete(synchronize_session=False)
+    db.session.commit()
+    active = active_forecast_run_id()
+    forecast_store.collect_garbage(kept + ([active] if active is not None else []))
+    return removed
+
 @app.route('/api/allergen/forecast', methods=['GET'])
 def allergen_forecast():
     """
     Return pollen forecast grid or nearest point for lat/lon.
     Query params:
       - lat, lon (optional): if given returns nearest forecast and advice
+      - method: nearest (default) or bilinear, for lat/lon lookups
       - bounds: north,south,east,west to return grid
       - days: number of days ahead (default 3)
+    Only the active forecast run is read: from its dense array in
+    forecast_store when materialized, otherwise from PollenForecast rows.
     """
     try:
         lat = request.args.get('lat', type=float)
         lon = request.args.get('lon', type=float)
         days = int(request.args.get('days', 3))
+        run_id = active_forecast_run_id()
+        grid = forecast_store.load(run_id)
+        today = datetime.utcnow().date()
         # If lat/lon given, return nearest point forecast
         if lat is not None and lon is not None:
+            if grid is not None:
+                day_idx = grid.day_indices(today, days)
+                if request.args.get('method', 'nearest') == 'bilinear':
+                    values = grid.bilinear(lat, lon, day_idx)
+                else:
+                    values = grid.nearest(lat, lon, day_idx)
+                data = [] if values is None else [{
+                    'date': grid.dates[i].isoformat(),
+                    'pollen_index': value,
+                    'pollen_type': grid.meta.get('pollen_type'),
+                    'model_version': grid.meta.get('model_version')
+                } for i, value in zip(day_idx, values.tolist())]
+                return jsonify({'status': 'success', 'data': data})
             # find nearest forecast row
-            cutoff = datetime.utcnow().date()
+            nearby = {'south': lat-0.5, 'north': lat+0.5, 'west': lon-0.5, 'east': lon+0.5}
             forecasts = PollenForecast.query.filter(
-                PollenForecast.lat.between(lat-0.5, lat+0.5),
-                PollenForecast.lon.between(lon-0.5, lon+0.5),
-                PollenForecast.date >= cutoff
+                PollenForecast.run_id == run_id,
+                *bbox_filter(PollenForecast, nearby),
+                PollenForecast.date >= today
             ).order_by(PollenForecast.date).limit(days*3).all()
             data = [{
                 'date': f.date.isoformat(),
@@ -388,10 +763,21 @@ def allergen_forecast():
         south = float(request.args.get('south', 8))
         east = float(request.args.get('east', 97))
         west = float(request.args.get('west', 68))
+        if grid is not None:
+            rows, cols = grid.window({'north': north, 'south': south, 'east': east, 'west': west})
+            lat_col, lon_col = (g.ravel().tolist() for g in np.meshgrid(grid.lats[rows], grid.lons[cols], indexing='ij'))
+            grid_data = []
+            for i in grid.day_indices(today, len(grid.dates)):
+                day = grid.dates[i].isoformat()
+                values = np.asarray(grid.values[i, rows, cols], dtype=np.float64).ravel().tolist()
+                grid_data.extend({'lat': la, 'lon': lo, 'date': day, 'pollen_index': v}
+                                 for la, lo, v in zip(lat_col, lon_col, values))
+            return jsonify({'status': 'success', 'count': len(grid_data), 'data': grid_data})
+        bounds = {'north': north, 'south': south, 'east': east, 'west': west}
         results = PollenForecast.query.filter(
-            PollenForecast.lat.between(south, north),
-            PollenForecast.lon.between(west, east),
-            PollenForecast.date >= datetime.utcnow().date()
+            PollenForecast.run_id == run_id,
+            *bbox_filter(PollenForecast, bounds),
+            PollenForecast.date >= today
         ).all()
         grid = [{'lat': r.lat, 'lon': r.lon, 'date': r.date.isoformat(), 'pollen_index': r.pollen_index} for r in results]
         return jsonify({'status': 'success', 'count': len(grid), 'data': grid})
@@ -399,96 +785,669 @@ def allergen_forecast():
         logger.error(f"Error allergen forecast: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def prediction_points(items: List[Dict]) -> pd.DataFrame:
+    """Validated lat/lon/date/hour (+ optional pm25/pm10) columns for point predictions"""
+    if not isinstance(items, list) or not items:
+        raise ValueError('Expected one or more points')
+    if len(items) > Config.PREDICT_MAX_POINTS:
+        raise ValueError(f'At most {Config.PREDICT_MAX_POINTS} points per request')
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError('Each point must be an object with lat and lon')
+    df = pd.DataFrame(items)
+    for name in ('lat', 'lon'):
+        if name not in df or df[name].isna().any():
+            raise ValueError(f'Missing field: {name}')
+    out = pd.DataFrame({'lat': pd.to_numeric(df['lat'], errors='raise'),
+                        'lon': pd.to_numeric(df['lon'], errors='raise')})
+    today = pd.Timestamp(datetime.utcnow().date())
+    out['date'] = pd.to_datetime(df['date'], format='ISO8601').fillna(today) if 'date' in df else today
+    for name in ('hour', 'pm25', 'pm10'):
+        out[name] = pd.to_numeric(df[name], errors='raise') if name in df else np.nan
+    # a date with a time of day supplies the hour when none is given
+    out['hour'] = out['hour'].fillna(out['date'].dt.hour)
+    return out
+
+@app.route('/api/allergen/predict', methods=['GET', 'POST'])
+def allergen_predict():
+    """
+    Pollen index predicted by the current model at exact locations.
+    GET: lat, lon, optional date (ISO date or datetime, default today), hour, pm25, pm10.
+    POST: JSON list of such points, or {"points": [...]}.
+    Concurrent requests are coalesced into one model call (see micro_batch.py).
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True)
+            items = body.get('points') if isinstance(body, dict) else body
+        else:
+            items = [{k: request.args.get(k) for k in ('lat', 'lon', 'date', 'hour', 'pm25', 'pm10')
+                      if request.args.get(k) is not None}]
+        try:
+            points = prediction_points(items)
+        except (ValueError, TypeError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        current = model_loader.get()
+        if current is None:
+            return jsonify({'status': 'error', 'message': 'No trained allergen model available'}), 503
+        if current.features not in (None, FORECAST_FEATURES):
+            return jsonify({'status': 'error', 'message': f'Model {current.version} has unsupported features'}), 503
+        X = point_feature_matrix(points['lat'].to_numpy(), points['lon'].to_numpy(),
+                                 points['date'].dt.dayofyear.to_numpy(), hours=points['hour'].to_numpy(),
+                                 pm25=points['pm25'].to_numpy(), pm10=points['pm10'].to_numpy())
+        values = pollen_predictor.submit(X, timeout=Config.PREDICT_TIMEOUT_SECONDS)
+        data = [{'lat': la, 'lon': lo, 'date': d, 'pollen_index': v} for la, lo, d, v in zip(
+            points['lat'].tolist(), points['lon'].tolist(),
+            points['date'].dt.strftime('%Y-%m-%d').tolist(), values.tolist())]
+        return jsonify({'status': 'success', 'model_version': current.version, 'count': len(data), 'data': data})
+    except Exception as e:
+        logger.error(f"Error allergen predict: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+def retrain_job(job: Job, mode: Optional[str] = None) -> Dict:
+    """Background job: retrain the allergen model and regenerate forecasts"""
+    # imported lazily: train_allergen imports this module
+    from train_allergen import train_and_persist
+    job.report(0.1, 'training')
+    payload = train_and_persist(mode)
+    if payload is None:
+        raise RuntimeError('No training data found')
+    return {'model_version': payload.get('version'), 'model_path': payload.get('model_path'),
+            'watermark': payload['watermark'].isoformat(), **payload['metrics']}
 
 @app.route('/api/models/retrain', methods=['POST'])
 def retrain_models():
-    """Manual retrain trigger. Should be protected in production."""
+    """
+    Manual retrain trigger. Should be protected in production.
+    ?mode=incremental (default, Config.TRAINING_MODE) or ?mode=full.
+    Runs in the background; poll /api/jobs/<job_id> for progress and metrics.
+    A request while a retrain of the same mode is running gets that job.
+    """
+    mode = request.args.get('mode') or Config.TRAINING_MODE
+    if mode not in ('full', 'incremental'):
+        return jsonify({'status': 'error', 'message': "mode must be 'full' or 'incremental'"}), 400
     try:
-        from datetime import date
-        # Kick off training function (synchronous here; or schedule background thread)
-        train_allergen_model()
-        return jsonify({'status': 'success', 'message': 'Retraining triggered'})
+        # coalesce per mode: a full retrain asked for during an incremental one still runs
+        job = job_manager.submit(f'retrain:{mode}', lambda job: retrain_job(job, mode))
+        return jsonify({
+            'status': 'accepted',
+            'message': 'Retraining triggered',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
     except Exception as e:
         logger.error(f"Retrain failed: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    """Registered allergen model versions with their metadata, newest first"""
+    try:
+        versions = [model_registry.metadata(v) or {'version': v} for v in reversed(model_registry.versions())]
+        return jsonify({
+            'status': 'success',
+            'current': model_registry.current_version(),
+            'serving': model_loader.loaded_version,
+            'versions': versions
+        })
+    except Exception as e:
+        logger.error(f"Error listing models: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/models/<version>/activate', methods=['POST'])
+def activate_model(version):
+    """
+    Make a registered version current (e.g. roll back). Should be protected in production.
+    Workers swap to it on their next prediction.
+    """
+    try:
+        model_registry.activate(version)
+        return jsonify({'status': 'success', 'current': version})
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f'Unknown model version {version}'}), 404
+    except Exception as e:
+        logger.error(f"Error activating model {version}: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress, duration and result of a background job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job.to_dict()})
+
+def sensor_columns(readings) -> Dict[str, np.ndarray]:
+    """Column arrays for the compact sensor encodings (timestamps as epoch ms)"""
+    id_, lat, lon, pm25, pm10, source, location_name, ts, verified = (
+        zip(*readings) if readings else ([],) * 9)
+    return {
+        'id': np.array(id_, dtype=np.int64),
+        'lat': np.array(lat, dtype=np.float32),
+        'lon': np.array(lon, dtype=np.float32),
+        'pm25': np.array(pm25, dtype=np.float32),
+        'pm10': np.array([np.nan if v is None else v for v in pm10], dtype=np.float32),
+        'source': list(source),
+        'location_name': list(location_name),
+        'timestamp': np.array(ts, dtype='datetime64[ms]').astype(np.int64),
+        'is_verified': np.array(verified, dtype=bool),
+    }
+
+SENSOR_READING_COLUMNS = ['id', 'latitude', 'longitude', 'pm25', 'pm10', 'source',
+                          'location_name', 'timestamp', 'is_verified']
+
+def sensor_reading_dict(reading) -> Dict:
+    """JSON form of a SENSOR_READING_COLUMNS row"""
+    return {
+        'id': reading.id,
+        'lat': reading.latitude,
+        'lon': reading.longitude,
+        'pm25': reading.pm25,
+        'pm10': reading.pm10,
+        'source': reading.source,
+        'location_name': reading.location_name,
+        'timestamp': reading.timestamp.isoformat(),
+        'is_verified': reading.is_verified
+    }
+
+def ingest_watermark() -> int:
+    """
+    Newest ingest id at or below which every ingest has completed. Ingests
+    running for longer than Config.INGEST_TIMEOUT count as abandoned.
+    """
+    table = SensorIngest.__table__
+    stale = datetime.utcnow() - Config.INGEST_TIMEOUT
+    finished = or_(table.c.completed_at.isnot(None), table.c.started_at < stale)
+    # both in one statement, so they come from the same snapshot
+    with db.engine.connect() as conn:
+        pending, done = conn.execute(select(
+            select(func.min(table.c.id)).where(~finished).scalar_subquery(),
+            select(func.max(table.c.id)).where(finished).scalar_subquery(),
+        )).one()
+    if pending is not None:
+        return pending - 1
+    return done or 0
+
+def parse_stream_cursor(cursor: str) -> Tuple[int, int]:
+    """'<ingest>' (everything up to that ingest sent) or '<ingest>.<reading id>' (part of it)"""
+    ingest, _, reading = cursor.partition('.')
+    return int(ingest), int(reading or 0)
+
+def format_stream_cursor(ingest: int, reading: int = 0) -> str:
+    return f'{ingest}.{reading}' if reading else str(ingest)
+
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
-    """Get all sensor data"""
+    """
+    Get all sensor data.
+    JSON responses include `cursor`, to pass to /api/stream for the readings
+    stored after this response (readings of ingests still running may be
+    both in this response and in the stream).
+    Query params:
+      - format: json (default), columnar or arrow (also chosen via Accept)
+      - north, south, east, west (optional): only readings inside bounds
+      - lat, lon, radius_km (optional): only readings within radius_km of lat/lon
+    """
     try:
+        fmt = negotiate_format(request.args, request.accept_mimetypes, ('json', 'columnar', 'arrow'))
+        
         # Get recent sensor readings (last 24 hours)
         cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        readings = SensorReading.query.filter(
-            SensorReading.timestamp >= cutoff_time
+        bounds = None
+        if any(k in request.args for k in ('north', 'south', 'east', 'west')):
+            bounds = {
+                'north': float(request.args.get('north', 90)),
+                'south': float(request.args.get('south', -90)),
+                'east': float(request.args.get('east', 180)),
+                'west': float(request.args.get('west', -180))
+            }
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        radius_km = request.args.get('radius_km', type=float)
+        
+        def filters(partition):
+            clauses = []
+            if bounds is not None:
+                clauses += bbox_filter(partition, bounds)
+            if lat is not None and lon is not None and radius_km is not None:
+                clauses += radius_filter(partition, lat, lon, radius_km)
+            return clauses
+        
+        # /api/stream resume cursor, taken before the read so nothing falls in between
+        cursor = str(ingest_watermark())
+        # read plain rows from the partitions covering the window; no ORM objects
+        columns = SENSOR_READING_COLUMNS
+        readings = db.session.execute(
+            sensor_partitions.select(db.engine, cutoff_time, columns=columns, where=filters)
         ).all()
         
-        sensor_data = []
-        for reading in readings:
-            sensor_data.append({
-                'id': reading.id,
-                'lat': reading.latitude,
-                'lon': reading.longitude,
-                'pm25': reading.pm25,
-                'pm10': reading.pm10,
-                'source': reading.source,
-                'location_name': reading.location_name,
-                'timestamp': reading.timestamp.isoformat(),
-                'is_verified': reading.is_verified
+        if fmt != 'json':
+            columns = sensor_columns(readings)
+            if fmt == 'arrow':
+                payload = columns_to_arrow(columns, dictionary_columns=('source', 'location_name'))
+                return Response(payload, mimetype=ARROW_MIME)
+            return jsonify({
+                'status': 'success',
+                'count': len(readings),
+                'cursor': cursor,
+                'columns': {name: json_column(col) for name, col in columns.items()}
             })
         
+        sensor_data = [sensor_reading_dict(reading) for reading in readings]
+        
         return jsonify({
             'status': 'success',
             'count': len(sensor_data),
+            'cursor': cursor,
             'data': sensor_data
         })
         
+    except UnsupportedFormat as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
     except Exception as e:
         logger.error(f"Error fetching sensors: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+ROLLUP_SELECT_COLUMNS = [SensorRollup.__table__.c[name] for name in rollups.ROLLUP_COLUMNS]
+
+def refresh_rollups(hours) -> int:
+    """
+    Recompute the hourly rollups of the given hour buckets from the raw
+    readings, then the daily rollups of the days they fall in. Buckets are
+    replaced as a whole, so re-running after duplicate or late readings is
+    safe. Returns the number of hourly rows written.
+    """
+    hours = sorted(set(pd.Timestamp(h).floor('h') for h in hours))
+    if not hours:
+        return 0
+    table = SensorRollup.__table__
+    start, end = hours[0].to_pydatetime(), (hours[-1] + pd.Timedelta(hours=1)).to_pydatetime()
+    raw = pd.DataFrame(db.session.execute(sensor_partitions.select(
+        db.engine, start, end, columns=rollups.RAW_COLUMNS)).all(), columns=rollups.RAW_COLUMNS)
+    hourly = rollups.aggregate_readings(raw, rollups.HOUR)
+    hourly = hourly[hourly['bucket'].isin(hours)]
+    hour_values = [h.to_pydatetime() for h in hours]
+    db.session.execute(table.delete().where(table.c.resolution == rollups.HOUR,
+                                            table.c.bucket.in_(hour_values)))
+    if len(hourly):
+        db.session.execute(insert(table), rollups.to_records(hourly))
+    
+    # daily rollups are re-derived from all hourly rows of the touched days
+    days = sorted(set(h.floor('D') for h in hours))
+    day_start, day_end = days[0].to_pydatetime(), (days[-1] + pd.Timedelta(days=1)).to_pydatetime()
+    day_hourly = pd.DataFrame(db.session.execute(db.select(*ROLLUP_SELECT_COLUMNS).where(
+        table.c.resolution == rollups.HOUR, table.c.bucket >= day_start, table.c.bucket < day_end
+    )).all(), columns=rollups.ROLLUP_COLUMNS)
+    daily = rollups.combine_rollups(day_hourly, rollups.DAY)
+    daily = daily[daily['bucket'].isin(days)]
+    db.session.execute(table.delete().where(table.c.resolution == rollups.DAY,
+                                            table.c.bucket.in_([d.to_pydatetime() for d in days])))
+    if len(daily):
+        db.session.execute(insert(table), rollups.to_records(daily))
+    db.session.commit()
+    return len(hourly)
+
+def sensor_history(start: datetime, end: datetime, resolution: str,
+                   source: Optional[str] = None, bounds: Optional[Dict] = None,
+                   combine: bool = False) -> pd.DataFrame:
+    """
+    Rollup rows in [start, end) with pm25_mean / pm10_mean, per station or,
+    with combine, merged across all matching stations per bucket.
+    """
+    table = SensorRollup.__table__
+    stmt = db.select(*ROLLUP_SELECT_COLUMNS).where(
+        table.c.resolution == resolution, table.c.bucket >= start, table.c.bucket < end)
+    if source is not None:
+        stmt = stmt.where(table.c.source == source)
+    if bounds is not None:
+        stmt = stmt.where(*bbox_filter(SensorRollup, bounds))
+    history = pd.DataFrame(db.session.execute(stmt.order_by(table.c.bucket)).all(),
+                           columns=rollups.ROLLUP_COLUMNS)
+    if combine:
+        history = rollups.combine_rollups(history, resolution, by=['bucket'])
+    return rollups.with_means(history)
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """
+    Long-range PM history from hourly / daily rollups.
+    Query params:
+      - start, end: ISO dates or datetimes (default: the last 30 days)
+      - resolution: hour or day (default: hour for ranges up to 7 days)
+      - source (optional): a single station
+      - north, south, east, west (optional): stations inside bounds
+      - combine: true to merge all matching stations per bucket
+      - format: json (default) or columnar
+    """
+    try:
+        fmt = negotiate_format(request.args, request.accept_mimetypes, ('json', 'columnar'))
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow()
+        start = (datetime.fromisoformat(request.args['start']) if 'start' in request.args
+                 else end - timedelta(days=30))
+        resolution = request.args.get('resolution') or (
+            rollups.HOUR if end - start <= timedelta(days=7) else rollups.DAY)
+        if resolution not in rollups.FREQ:
+            return jsonify({'status': 'error', 'message': f'Unknown resolution: {resolution}'}), 400
+        bounds = None
+        if any(k in request.args for k in ('north', 'south', 'east', 'west')):
+            bounds = {
+                'north': float(request.args.get('north', 90)),
+                'south': float(request.args.get('south', -90)),
+                'east': float(request.args.get('east', 180)),
+                'west': float(request.args.get('west', -180))
+            }
+        combine = request.args.get('combine', 'false').lower() in ('1', 'true', 'yes')
+        history = sensor_history(start, end, resolution, source=request.args.get('source'),
+                                 bounds=bounds, combine=combine)
+        
+        fields = (['bucket'] + ([] if combine else ['source']) +
+                  ['latitude', 'longitude', 'count', 'pm25_mean', 'pm25_min', 'pm25_max',
+                   'pm10_mean', 'pm10_min', 'pm10_max'])
+        columns = {name: history[name].to_numpy() for name in fields}
+        columns['bucket'] = pd.to_datetime(history['bucket']).dt.strftime('%Y-%m-%dT%H:%M:%S').to_numpy()
+        if fmt == 'columnar':
+            return jsonify({
+                'status': 'success',
+                'resolution': resolution,
+                'count': len(history),
+                'columns': {name: json_column(col) for name, col in columns.items()}
+            })
+        data = [dict(zip(fields, values)) for values in zip(*(json_column(columns[f]) for f in fields))]
+        return jsonify({'status': 'success', 'resolution': resolution, 'count': len(data), 'data': data})
+        
+    except UnsupportedFormat as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
+    except Exception as e:
+        logger.error(f"Error fetching history: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def current_ingest_generation() -> int:
+    """Changes whenever any worker ingests readings newer than a day"""
+    return sensor_partitions.max_id_sum(db.engine, datetime.utcnow() - timedelta(days=1))
+
+def heatmap_station_values(bounds: Dict) -> pd.DataFrame:
+    """
+    One PM2.5 value per station inside bounds from the readings of the last
+    HEATMAP_READING_WINDOW, reduced as Config.HEATMAP_STATION_VALUE says
+    (see rollups.station_values)
+    """
+    columns = rollups.STATION_VALUE_COLUMNS
+    raw = pd.DataFrame(db.session.execute(sensor_partitions.select(
+        db.engine, datetime.utcnow() - Config.HEATMAP_READING_WINDOW, columns=columns,
+        where=lambda partition: bbox_filter(partition, bounds) + [partition.c.pm25.isnot(None)]
+    )).all(), columns=columns)
+    # rows stored before cells were assigned get their cell from the coordinates
+    if raw['cell'].isna().any():
+        cells = cell_id(raw['latitude'].to_numpy(dtype=float), raw['longitude'].to_numpy(dtype=float))
+        raw['cell'] = raw['cell'].fillna(pd.Series(cells, index=raw.index)).astype('int64')
+    return rollups.station_values(raw, Config.HEATMAP_STATION_VALUE, Config.HEATMAP_DECAY_HALF_LIFE)
+
+def build_heatmap_tile(z: int, x: int, y: int, step: float = 0.1, method: Optional[str] = None):
+    """Interpolate one tile's grid from the recent per-station values (heatmap_station_values)"""
+    bounds = tile_bounds(z, x, y)
+    # include sensors just outside the tile so values near its edges match
+    # what a single interpolation over the whole map would produce
+    pad_lat = (bounds['north'] - bounds['south']) / 2
+    pad_lon = (bounds['east'] - bounds['west']) / 2
+    query_bounds = {
+        'south': bounds['south'] - pad_lat, 'north': bounds['north'] + pad_lat,
+        'west': bounds['west'] - pad_lon, 'east': bounds['east'] + pad_lon
+    }
+    stations = heatmap_station_values(query_bounds)
+    
+    # Convert to dict format; AQI is computed for all stations in one pass
+    pm25 = stations['pm25'].to_numpy(dtype=float)
+    _, aqi = compute_aqi(pm25=pm25, extrapolate=True)
+    sensor_data = []
+    for lat, lon, station_pm25, station_aqi in zip(stations['latitude'].tolist(), stations['longitude'].tolist(),
+                                                   pm25.tolist(), aqi):
+        sensor_data.append({
+            'latitude': lat,
+            'longitude': lon,
+            'pm25': station_pm25,
+            'aqi': None if np.isnan(station_aqi) else int(station_aqi)
+        })
+    
+    return heatmap_generator.generate_grid_arrays(sensor_data, bounds, step, method)
+
+def build_heatmap_pyramid(pad: float = 1.0):
+    """
+    Interpolate the recent per-station values over Config.INDIA_BOUNDS at every
+    HEATMAP_PYRAMID_STEPS step with the Config.HEATMAP_METHOD engine and publish
+    the result (see heatmap_pyramid.py).
+    Stations up to `pad` degrees outside the region are included so values
+    near its edges are interpolated rather than filled.
+    Returns the number of stations used (0 when too few to triangulate).
+    """
+    started = time.perf_counter()
+    region = Config.INDIA_BOUNDS
+    generation = current_ingest_generation()
+    query_bounds = {'south': region['south'] - pad, 'north': region['north'] + pad,
+                    'west': region['west'] - pad, 'east': region['east'] + pad}
+    stations = heatmap_station_values(query_bounds)
+    if len(stations) < 3:
+        return 0
+    points = stations[['latitude', 'longitude']].to_numpy(dtype=float)
+    values = stations['pm25'].to_numpy(dtype=float)
+    levels = interpolate_levels(points, values, region, Config.HEATMAP_PYRAMID_STEPS,
+                                interpolator=HeatmapGenerator.interpolator(Config.HEATMAP_METHOD))
+    heatmap_pyramids.write(generation, levels, region, stations=len(stations), method=Config.HEATMAP_METHOD)
+    logger.info(f"Built heatmap pyramid {generation} from {len(stations)} stations "
+                f"({int(stations['readings'].sum())} readings; "
+                f"{', '.join(f'{l.step:g}°: {l.values.size:,}' for l in levels)} cells) "
+                f"in {time.perf_counter() - started:.2f}s")
+    return len(stations)
+
+def current_heatmap_pyramid():
+    """The newest pyramid, unless it was built from readings that have since aged out"""
+    pyramid = heatmap_pyramids.load()
+    if pyramid is None or pyramid.built_at < datetime.utcnow() - Config.HEATMAP_READING_WINDOW:
+        return None
+    return pyramid
+
+def heatmap_arrays_for_bounds(bounds: Dict, z: Optional[int] = None, step: float = 0.1,
+                              method: Optional[str] = None):
+    """Assemble (lats, lons, values) for bounds from cached per-tile grids"""
+    generation = current_ingest_generation()
+    parts = []
+    for tile in tiles_for_bounds(bounds, z):
+        key = tile + (step, method or Config.HEATMAP_METHOD, generation)
+        arrays = heatmap_cache.get(key)
+        if arrays is None:
+            arrays = build_heatmap_tile(*tile, step=step, method=method)
+            heatmap_cache.put(key, arrays)
+        parts.append(arrays)
+    if not parts:
+        return np.empty(0), np.empty(0), np.empty(0)
+    lats, lons, values = (np.concatenate(col) for col in zip(*parts))
+    inside = ((lats >= bounds['south']) & (lats < bounds['north']) &
+              (lons >= bounds['west']) & (lons < bounds['east']))
+    return lats[inside], lons[inside], values[inside]
+
 @app.route('/api/heatmap', methods=['GET'])
 def get_heatmap():
-    """Get interpolated heatmap data"""
+    """
+    Get interpolated heatmap data.
+    Query params:
+      - z, x, y: a single map tile, or
+      - north, south, east, west: bounds (default India)
+      - max_cells: cell budget (default Config.HEATMAP_MAX_CELLS); the finest
+        pyramid level that fits is returned
+      - method: interpolation engine, linear, idw, nearest or gp
+        (default Config.HEATMAP_METHOD)
+      - format: json (default), columnar or raster (also chosen via Accept);
+        raster takes dtype=float32 (default) or uint8
+    The part of the bounds inside the configured region is sliced from the
+    heatmap pyramid built after each ingest (with Config.HEATMAP_METHOD); any
+    part beyond it is interpolated from tiles at the same level's step. Bounds
+    entirely outside the region, other methods, or requests before the first
+    pyramid use the covering tiles at 0.1°. Tiles are cached until the next
+    ingest.
+    """
     try:
-        # Get bounds from query parameters
-        bounds = {
-            'north': float(request.args.get('north', 37)),
-            'south': float(request.args.get('south', 8)),
-            'east': float(request.args.get('east', 97)),
-            'west': float(request.args.get('west', 68))
-        }
+        fmt = negotiate_format(request.args, request.accept_mimetypes, ('json', 'columnar', 'raster'))
+        step = 0.1
+        max_cells = request.args.get('max_cells', Config.HEATMAP_MAX_CELLS, type=int)
+        method = request.args.get('method', Config.HEATMAP_METHOD)
+        if method not in interpolators:
+            return jsonify({'status': 'error',
+                            'message': f"method must be one of: {', '.join(interpolators)}"}), 400
+        z = request.args.get('z', type=int)
+        x = request.args.get('x', type=int)
+        y = request.args.get('y', type=int)
+        if z is not None and x is not None and y is not None:
+            bounds = tile_bounds(z, x, y)
+        else:
+            # Get bounds from query parameters
+            bounds = {
+                'north': float(request.args.get('north', 37)),
+                'south': float(request.args.get('south', 8)),
+                'east': float(request.args.get('east', 97)),
+                'west': float(request.args.get('west', 68))
+            }
+            z = None
         
-        # Get recent sensor readings
-        cutoff_time = datetime.utcnow() - timedelta(hours=6)
-        readings = SensorReading.query.filter(
-            SensorReading.timestamp >= cutoff_time,
-            SensorReading.latitude.between(bounds['south'], bounds['north']),
-            SensorReading.longitude.between(bounds['west'], bounds['east'])
-        ).all()
+        pyramid = current_heatmap_pyramid()
+        if pyramid is not None and pyramid.method == method and pyramid.covers(bounds):
+            level = pyramid.select(bounds, max(1, max_cells))
+            step = level.step
+            parts = [level.arrays(bounds)]
+            tile_zoom = z if z is not None else zoom_for_bounds(bounds)
+            parts += [heatmap_arrays_for_bounds(part, tile_zoom, step, method) for part in level.outside(bounds)]
+            lats, lons, values = (np.concatenate(col) for col in zip(*parts))
+        else:
+            lats, lons, values = heatmap_arrays_for_bounds(bounds, z, step, method)
         
-        # Convert to dict format
-        sensor_data = []
-        for reading in readings:
-            sensor_data.append({
-                'latitude': reading.latitude,
-                'longitude': reading.longitude,
-                'pm25': reading.pm25,
-                'aqi': OpenAQClient.pm25_to_aqi(reading.pm25) if reading.pm25 else None
+        if fmt != 'json':
+            lat_axis = HeatmapGenerator.grid_axis(bounds['south'], bounds['north'], step)
+            lon_axis = HeatmapGenerator.grid_axis(bounds['west'], bounds['east'], step)
+            raster = grid_to_raster(lats, lons, values, lat_axis, lon_axis, step)
+            south = float(lat_axis[0]) if len(lat_axis) else bounds['south']
+            west = float(lon_axis[0]) if len(lon_axis) else bounds['west']
+            if fmt == 'raster':
+                payload = pack_raster(raster, south, west, step,
+                                      dtype=request.args.get('dtype', 'float32'))
+                return Response(payload, mimetype=RASTER_MIME)
+            return jsonify({
+                'status': 'success',
+                'count': len(values),
+                'grid': {'south': south, 'west': west, 'step': step,
+                         'rows': raster.shape[0], 'cols': raster.shape[1]},
+                # row-major, south -> north; null where there is no value
+                'values': json_column(raster.ravel())
             })
         
-        # Generate grid data
-        grid_data = heatmap_generator.generate_grid_data(sensor_data, bounds)
+        grid_data = grid_arrays_to_dicts(lats, lons, values)
         
         return jsonify({
             'status': 'success',
             'count': len(grid_data),
+            'step': step,
+            'method': method,
             'data': grid_data
         })
         
+    except UnsupportedFormat as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
     except Exception as e:
         logger.error(f"Error generating heatmap: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def stream_updates(cursor: str, bounds: Optional[Dict], z: int, limit: int):
+    """
+    Poll for /api/stream: readings of the completed ingests after `cursor`
+    (inside bounds) and the heatmap tiles at zoom z they change, as one
+    'update' event. Readings are ordered by (ingest, id); at most `limit`
+    per event. Returns (events, next cursor).
+    """
+    after_ingest, after_id = parse_stream_cursor(cursor)
+    top = ingest_watermark()
+    if top <= after_ingest and not after_id:
+        return [], cursor
+    
+    def filters(partition):
+        ingest = partition.c.ingest_id
+        after = ingest > after_ingest
+        if after_id:
+            # the rest of a partly sent ingest
+            after = or_(after, and_(ingest == after_ingest, partition.c.id > after_id))
+        clauses = [after, ingest <= top]
+        if bounds is not None:
+            clauses += bbox_filter(partition, bounds)
+        return clauses
+    
+    # late readings land in older partitions: search the whole retention window. The
+    # cursor moves past `top`, so list partitions afresh in case another worker has
+    # just created one (idle polls returned above without a query)
+    stmt = sensor_partitions.select(db.engine, datetime.utcnow() - Config.SENSOR_DATA_RETENTION,
+                                    columns=['ingest_id'] + SENSOR_READING_COLUMNS, where=filters, max_age=0)
+    # a fresh connection per poll, so each poll sees the latest commits
+    with db.engine.connect() as conn:
+        readings = conn.execute(stmt.order_by('ingest_id', 'id').limit(limit)).all()
+    # a full batch may leave more to send; otherwise everything up to top is done
+    if len(readings) == limit:
+        next_cursor = format_stream_cursor(readings[-1].ingest_id, readings[-1].id)
+    else:
+        next_cursor = format_stream_cursor(top)
+    if not readings:
+        return [], next_cursor
+    lats = np.array([r.latitude for r in readings], dtype=float)
+    lons = np.array([r.longitude for r in readings], dtype=float)
+    return [('update', {
+        'cursor': next_cursor,
+        'count': len(readings),
+        'readings': [sensor_reading_dict(reading) for reading in readings],
+        'tiles': {'z': z, 'tiles': [[x, y] for _, x, y in tiles_near_points(lats, lons, z)]},
+    })], next_cursor
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """
+    Server-sent events with readings as they are stored.
+    Query params:
+      - cursor: resume after this cursor, from /api/sensors or an event
+        (also taken from the Last-Event-ID header an EventSource sends on
+        reconnect); default: only readings stored from now on
+      - north, south, east, west (optional): only readings inside bounds
+      - z: zoom of the heatmap tiles reported as changed (default Config.STREAM_TILE_ZOOM)
+    Events:
+      - ready  {cursor}: sent first
+      - update {cursor, count, readings, tiles: {z, tiles: [[x, y], ...]}}:
+        new readings (same fields as /api/sensors) and the tiles whose
+        /api/heatmap?z=&x=&y= grid they change
+    Every event's id is its cursor. Cursors follow the order readings were
+    stored in (SensorIngest), so late readings for earlier days are sent
+    too. The server ends the stream after
+    Config.STREAM_MAX_SECONDS and the client reconnects with its cursor.
+    """
+    try:
+        cursor = request.args.get('cursor', request.headers.get('Last-Event-ID'))
+        cursor = str(ingest_watermark()) if cursor in (None, '') else cursor
+        parse_stream_cursor(cursor)
+        z = request.args.get('z', Config.STREAM_TILE_ZOOM, type=int)
+        if not 0 <= z <= MAX_ZOOM:
+            raise ValueError(f"z must be between 0 and {MAX_ZOOM}")
+        bounds = None
+        if any(k in request.args for k in ('north', 'south', 'east', 'west')):
+            bounds = {
+                'north': float(request.args.get('north', 90)),
+                'south': float(request.args.get('south', -90)),
+                'east': float(request.args.get('east', 180)),
+                'west': float(request.args.get('west', -180))
+            }
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    def generate():
+        yield format_event({'cursor': cursor}, 'ready', cursor)
+        yield from event_stream(lambda c: stream_updates(c, bounds, z, Config.STREAM_MAX_READINGS), cursor,
+                                notifier=stream_notifier, poll_seconds=Config.STREAM_POLL_SECONDS,
+                                heartbeat_seconds=Config.STREAM_HEARTBEAT_SECONDS,
+                                max_seconds=Config.STREAM_MAX_SECONDS)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/user-reports', methods=['POST'])
 def submit_user_report():
     """Submit a user air quality report"""
@@ -501,8 +1460,10 @@ def submit_user_report():
             if field not in data:
                 return jsonify({'status': 'error', 'message': f'Missing field: {field}'}), 400
         
-        # Create user report
-        report = UserReport(
+        # Create user report in today's partition
+        now = datetime.utcnow()
+        table = report_partitions.ensure(db.engine, now.date())
+        result = db.session.execute(table.insert().values(
             latitude=float(data['latitude']),
             longitude=float(data['longitude']),
             air_quality_rating=int(data['air_quality_rating']),
@@ -510,16 +1471,16 @@ def submit_user_report():
             smell_intensity=data.get('smell_intensity'),
             health_symptoms=data.get('health_symptoms'),
             comments=data.get('comments'),
-            user_id=data.get('user_id')
-        )
-        
-        db.session.add(report)
+            user_id=data.get('user_id'),
+            timestamp=now,
+            is_verified=False
+        ))
         db.session.commit()
         
         return jsonify({
             'status': 'success',
             'message': 'Report submitted successfully',
-            'report_id': report.id
+            'report_id': result.inserted_primary_key[0]
         })
         
     except Exception as e:
@@ -532,9 +1493,7 @@ def get_user_reports():
     try:
         # Get recent reports (last 7 days)
         cutoff_time = datetime.utcnow() - timedelta(days=7)
-        reports = UserReport.query.filter(
-            UserReport.timestamp >= cutoff_time
-        ).all()
+        reports = db.session.execute(report_partitions.select(db.engine, cutoff_time)).all()
         
         report_data = []
         for report in reports:
@@ -561,20 +1520,35 @@ def get_user_reports():
         logger.error(f"Error fetching user reports: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def refresh_job(job: Job) -> Dict:
+    """Background job: fetch fresh data from external sources and store it"""
+    with app.app_context():
+        job.report(0.0, 'fetching')
+        fresh_data = data_aggregator.fetch_all_data()
+        job.report(0.8, f'storing {len(fresh_data)} data points')
+        stats = data_aggregator.store_sensor_data(fresh_data)
+        return {
+            'fetched': len(fresh_data),
+            'inserted': stats['inserted'],
+            'skipped': stats['skipped']
+        }
+
 @app.route('/api/refresh-data', methods=['POST'])
 def refresh_data():
-    """Manually refresh data from external sources"""
+    """
+    Manually refresh data from external sources.
+    Runs in the background; a refresh already in progress is reused.
+    Poll /api/jobs/<job_id> for progress and result counts.
+    """
     try:
-        # Fetch fresh data
-        fresh_data = data_aggregator.fetch_all_data()
-        
-        # Store in database
-        data_aggregator.store_sensor_data(fresh_data)
+        job = job_manager.submit('refresh', refresh_job)
         
         return jsonify({
-            'status': 'success',
-            'message': f'Refreshed {len(fresh_data)} data points'
-        })
+            'status': 'accepted',
+            'message': 'Data refresh queued',
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
         
     except Exception as e:
         logger.error(f"Error refreshing data: {e}")
@@ -586,13 +1560,66 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'database': 'connected'
+        'database': 'connected',
+        'spatial_backend': spatial_backend.name,
+        'model_version': model_loader.loaded_version
     })
 
+def add_missing_column(model, name: str, sql_type: str):
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns(model.__tablename__)}
+    if name not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(db.text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {name} {sql_type}"))
+
+def backfill_cells(model, lat_col: str, lon_col: str, batch_size: int = 50000):
+    """Compute cell ids for rows stored before the column existed"""
+    table = model.__table__
+    stmt = table.update().where(table.c.id == db.bindparam('row_id')).values(cell=db.bindparam('row_cell'))
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c[lat_col], table.c[lon_col])
+            .where(table.c.cell.is_(None)).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids, lats, lons = zip(*rows)
+        cells = cell_id(np.array(lats, dtype=float), np.array(lons, dtype=float)).tolist()
+        db.session.execute(stmt, [{'row_id': i, 'row_cell': c} for i, c in zip(ids, cells)])
+        db.session.commit()
+
 def create_tables():
     """Create database tables"""
     with app.app_context():
         db.create_all()
+        # create_all only adds missing tables; bring databases created by older
+        # versions up to date (new columns / indexes on existing tables)
+        add_missing_column(PollenForecast, 'run_id', 'INTEGER')
+        add_missing_column(SensorReading, 'ingest_id', 'INTEGER')
+        for model, lat_col, lon_col in ((SensorReading, 'latitude', 'longitude'),
+                                        (AllergenReading, 'latitude', 'longitude'),
+                                        (PollenForecast, 'lat', 'lon')):
+            add_missing_column(model, 'cell', 'BIGINT')
+            backfill_cells(model, lat_col, lon_col)
+        for index in [pollen_run_index] + cell_indexes:
+            index.create(db.engine, checkfirst=True)
+        spatial_backend.setup(db.engine, [point_table(m) for m in
+                                          (SensorReading, AllergenReading, PollenForecast, SensorRollup)])
+        for partitions in (sensor_partitions, report_partitions):
+            added = partitions.upgrade(db.engine)
+            if added:
+                logger.info(f"Added columns to existing partitions: {', '.join(added)}")
+            moved = partitions.migrate_legacy(db.engine)
+            if moved:
+                logger.info(f"Moved {moved} {partitions.template.name} rows into daily partitions")
+        if db.session.query(SensorRollup.id).first() is None:
+            # first start with rollups: build them from the raw readings still retained
+            for day in sensor_partitions.days(db.engine):
+                start = datetime.combine(day, datetime.min.time())
+                refresh_rollups(pd.date_range(start, periods=24, freq='h'))
+        try:
+            sensor_dedup_index.create(db.engine, checkfirst=True)
+        except Exception as e:
+            logger.warning(f"Could not create sensor dedup index (duplicate rows?): {e}")
         logger.info("Database tables created")
 
 def scheduled_data_fetch():
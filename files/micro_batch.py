@@ -0,0 +1,98 @@
+# micro_batch.py
+"""
+Request coalescing for vectorized calls (e.g. sklearn `predict`).
+
+Concurrent callers submit small row blocks; a background thread takes the
+first waiting block, keeps collecting blocks for up to `max_wait_ms` (or
+until `max_rows` rows are queued), runs the function once on the stacked
+rows and hands every caller its own slice of the result. The fixed
+per-call overhead of the model is then paid once per batch rather than once
+per request, at the cost of at most `max_wait_ms` extra latency.
+
+The worker thread is started lazily (and restarted after a fork), so a
+batcher can be created at import time in a pre-forking web server.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent `submit(rows)` calls into single `func(stacked_rows)` calls."""
+
+    def __init__(self, func: Callable[[np.ndarray], np.ndarray], max_wait_ms: float = 5.0,
+                 max_rows: int = 10_000, name: str = 'batch'):
+        self.func = func
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        # counters for monitoring: calls made and requests served
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, rows: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Run func on `rows` as part of a batch; blocks until the result is ready."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((rows, future))
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # new process (first use or after fork): the parent's thread does not exist here
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, args=(self._queue,), name=f'{self.name}-batcher',
+                             daemon=True).start()
+            self._pid = os.getpid()
+
+    def _collect(self, q: "queue.Queue"):
+        batch = [q.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self, q: "queue.Queue"):
+        while True:
+            batch = self._collect(q)
+            # callers that already gave up are dropped from the batch
+            batch = [(rows, future) for rows, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                result = np.asarray(self.func(np.vstack([rows for rows, _ in batch])))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            start = 0
+            for rows, future in batch:
+                future.set_result(result[start:start + len(rows)])
+                start += len(rows)
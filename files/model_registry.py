@@ -0,0 +1,201 @@
+# model_registry.py
+"""
+Versioned on-disk registry for trained models, plus a lazy serving loader.
+
+Every published model gets its own directory holding the estimator
+(`model.joblib`, uncompressed so it can be memory-mapped) and a
+`meta.json` with its features, training window and metrics. The active
+version is named in `CURRENT`, which is replaced atomically, so publishing
+or rolling back is one rename and readers never see partial files.
+
+Layout:
+    <root>/v<n>/model.joblib
+    <root>/v<n>/meta.json
+    <root>/CURRENT
+
+ModelLoader keeps the active model warm in each web worker. It loads the
+model (memory-mapped) on first use, and when CURRENT changes it swaps to
+the new version on the next call; requests arriving during the load keep
+using the previous model.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = 'model.joblib'
+META_FILE = 'meta.json'
+CURRENT_FILE = 'CURRENT'
+_VERSION_RE = re.compile(r'^v(\d+)$')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ModelVersion:
+    """A loaded model together with its registry metadata."""
+
+    def __init__(self, version: str, model: Any, meta: Dict, path: str):
+        self.version = version
+        self.model = model
+        self.meta = meta
+        self.path = path
+
+    @property
+    def features(self) -> Optional[List[str]]:
+        return self.meta.get('features')
+
+
+class ModelRegistry:
+    """Publishes model versions and resolves the active one."""
+
+    def __init__(self, root: str, keep: int = 5):
+        self.root = root
+        self.keep = keep
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def model_path(self, version: str) -> str:
+        return os.path.join(self._version_dir(version), MODEL_FILE)
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = [(int(m.group(1)), name) for name in os.listdir(self.root)
+                 for m in [_VERSION_RE.match(name)] if m]
+        return [name for _, name in sorted(found)]
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version or None
+
+    def current_key(self) -> Optional[Tuple[int, int]]:
+        """Cheap change token for CURRENT (inode, mtime); changes whenever it is replaced."""
+        try:
+            st = os.stat(os.path.join(self.root, CURRENT_FILE))
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def metadata(self, version: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self._version_dir(version), META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, model: Any, meta: Dict, activate: bool = True) -> str:
+        """Write a new version (temp dir + rename) and optionally make it current; returns its name."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.v_', dir=self.root)
+        os.chmod(tmp, 0o755)
+        try:
+            joblib.dump(model, os.path.join(tmp, MODEL_FILE))
+            while True:
+                existing = self.versions()
+                number = int(existing[-1][1:]) + 1 if existing else 1
+                version = f'v{number}'
+                meta = dict(meta, version=version, published_at=datetime.utcnow())
+                with open(os.path.join(tmp, META_FILE), 'w') as f:
+                    json.dump(meta, f, default=_json_default)
+                try:
+                    os.rename(tmp, self._version_dir(version))
+                    break
+                except OSError:
+                    # another process took this number
+                    if not os.path.isdir(self._version_dir(version)):
+                        raise
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if activate:
+            self.activate(version)
+        self.collect_garbage()
+        return version
+
+    def activate(self, version: str):
+        """Make `version` current (also used to roll back)."""
+        if self.metadata(version) is None:
+            raise KeyError(f"Unknown model version {version!r}")
+        fd, tmp = tempfile.mkstemp(prefix='.current_', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+
+    def load(self, version: Optional[str] = None, mmap: bool = False) -> Optional[ModelVersion]:
+        """Load `version` (default: current); memory-mapped read-only with `mmap`."""
+        version = version or self.current_version()
+        meta = self.metadata(version) if version else None
+        if meta is None:
+            return None
+        path = self.model_path(version)
+        model = joblib.load(path, mmap_mode='r' if mmap else None)
+        return ModelVersion(version, model, meta, path)
+
+    def collect_garbage(self) -> int:
+        """Remove all but the newest `keep` versions (never the current one); returns how many."""
+        current = self.current_version()
+        stale = [v for v in self.versions()[:-self.keep or None] if v != current]
+        for version in stale:
+            shutil.rmtree(self._version_dir(version), ignore_errors=True)
+        return len(stale)
+
+
+class ModelLoader:
+    """Per-process, lazily loaded, hot-swapping view of the registry's current model."""
+
+    def __init__(self, registry: ModelRegistry, mmap: bool = True):
+        self.registry = registry
+        self.mmap = mmap
+        self._loaded: Optional[ModelVersion] = None
+        self._seen_key = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[ModelVersion]:
+        """The current model, loading or swapping it if CURRENT changed since the last call."""
+        key = self.registry.current_key()
+        loaded = self._loaded
+        if key == self._seen_key:
+            return loaded
+        # one thread loads; the others keep serving the previous model meanwhile
+        if not self._lock.acquire(blocking=loaded is None):
+            return loaded
+        try:
+            if key == self._seen_key:
+                return self._loaded
+            version = self.registry.current_version()
+            if version is not None and (self._loaded is None or self._loaded.version != version):
+                try:
+                    self._loaded = self.registry.load(version, mmap=self.mmap)
+                    logger.info(f"Serving model {version}")
+                except Exception as e:
+                    logger.error(f"Could not load model {version}: {e}")
+            self._seen_key = key
+            return self._loaded
+        finally:
+            self._lock.release()
+
+    @property
+    def loaded_version(self) -> Optional[str]:
+        return self._loaded.version if self._loaded is not None else None
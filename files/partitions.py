@@ -0,0 +1,239 @@
+# partitions.py
+"""
+Daily time partitions for append-mostly tables.
+
+Rows of a partitioned table live in one child table per UTC day, named
+<table>_pYYYYMMDD and cloned from the ORM table (columns, defaults and
+indexes). Retention drops whole child tables. That takes constant time and
+leaves nothing to vacuum, unlike a DELETE that rewrites pages while holding
+SQLite's write lock. Reads are a UNION ALL over only the partitions that
+overlap the requested time window. The list of partitions is cached per
+process. Partitions this process creates or drops update the cache at
+once. Those created or dropped by other processes show up once the cache is
+`list_seconds` old; a caller that must see them sooner passes max_age.
+
+Ids stay unique across partitions. On SQLite each child table uses
+AUTOINCREMENT seeded at day_number << ID_DAY_SHIFT. On other databases all
+children draw from one shared sequence.
+
+The ORM table itself is kept as the schema template; rows written there
+by older versions are moved into partitions by migrate_legacy().
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Column, Index, MetaData, Sequence, Table, false, func, inspect, select, text, union_all
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+ID_DAY_SHIFT = 32
+_EPOCH = date(1970, 1, 1)
+
+
+class DailyPartitions:
+    """Per-day child tables of `template`, split on `time_column` (naive UTC)"""
+
+    def __init__(self, template: Table, time_column: str = 'timestamp',
+                 on_create: Optional[Callable[[object, Table], None]] = None, list_seconds: float = 10.0):
+        self.template = template
+        self.time_column = time_column
+        self.on_create = on_create  # called with (engine, table) after a partition is created
+        self.list_seconds = list_seconds
+        self.metadata = MetaData()
+        self.sequence = Sequence(f'{template.name}_part_id_seq', metadata=self.metadata)
+        self._pattern = re.compile(rf'^{re.escape(template.name)}_p(\d{{8}})$')
+        self._tables: Dict[date, Table] = {}
+        self._created = set()
+        self._lock = threading.Lock()
+        self._days: Optional[Set[date]] = None  # partitions in the database, as of _listed_at
+        self._listed_at = 0.0
+        self._changed_at = 0.0  # when this process last created or dropped a partition
+
+    def name_for(self, day: date) -> str:
+        return f'{self.template.name}_p{day:%Y%m%d}'
+
+    def table_for(self, day: date) -> Table:
+        """Table object for day's partition (does not create it in the database)"""
+        with self._lock:
+            table = self._tables.get(day)
+            if table is None:
+                table = self._tables[day] = self._build(day)
+            return table
+
+    def _build(self, day: date) -> Table:
+        name = self.name_for(day)
+        columns = [Column(c.name, c.type, self.sequence, primary_key=True) if c.primary_key else c._copy()
+                   for c in self.template.columns]
+        table = Table(name, self.metadata, *columns, sqlite_autoincrement=True,
+                      info={'partition_of': self.template.name, 'day': day})
+        for index in self.template.indexes:
+            Index(f'{name}_{index.name}', *[table.c[c.name] for c in index.columns], unique=index.unique)
+        return table
+
+    def ensure(self, engine, day: date) -> Table:
+        """Create day's partition if it does not exist yet (in its own transaction)"""
+        table = self.table_for(day)
+        if day in self._created:
+            return table
+        with engine.begin() as conn:
+            if conn.dialect.name != 'sqlite':
+                self.sequence.create(conn, checkfirst=True)
+            conn.execute(CreateTable(table, if_not_exists=True))
+            # a partition created by an older version may lack newer columns
+            self._add_missing_columns(conn, table)
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+            if conn.dialect.name == 'sqlite':
+                conn.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                ), {'name': table.name, 'seq': (day - _EPOCH).days << ID_DAY_SHIFT})
+        if self.on_create:
+            self.on_create(engine, table)
+        self._created.add(day)
+        self._note(day, exists=True)
+        return table
+
+    def _add_missing_columns(self, conn, table: Table) -> List[str]:
+        present = {c['name'] for c in inspect(conn).get_columns(table.name)}
+        added = []
+        for column in table.columns:
+            if column.name not in present:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                                  f'{column.type.compile(dialect=conn.dialect)}'))
+                added.append(column.name)
+        return added
+
+    def upgrade(self, engine) -> List[str]:
+        """
+        Add template columns and indexes missing from existing partitions
+        (CREATE TABLE IF NOT EXISTS leaves those unchanged). New columns must
+        be nullable. Returns the '<table>.<column>' names added.
+        """
+        added = []
+        for day in self.days(engine, max_age=0):
+            table = self.table_for(day)
+            with engine.begin() as conn:
+                added += [f'{table.name}.{name}' for name in self._add_missing_columns(conn, table)]
+                for index in table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        return added
+
+    def days(self, engine, max_age: Optional[float] = None) -> List[date]:
+        """
+        Days that have a partition in the database, oldest first, from a
+        listing at most `max_age` seconds old (default list_seconds)
+        """
+        max_age = self.list_seconds if max_age is None else max_age
+        with self._lock:
+            if self._days is not None and time.monotonic() - self._listed_at <= max_age:
+                return sorted(self._days)
+        listed_at = time.monotonic()
+        found = set()
+        for name in inspect(engine).get_table_names():
+            match = self._pattern.match(name)
+            if match:
+                found.add(datetime.strptime(match.group(1), '%Y%m%d').date())
+        with self._lock:
+            # a listing that raced with our own create/drop may miss it; don't keep it
+            if listed_at >= self._listed_at and listed_at > self._changed_at:
+                self._days, self._listed_at = found, listed_at
+        return sorted(found)
+
+    def _note(self, day: date, exists: bool):
+        with self._lock:
+            self._changed_at = time.monotonic()
+            if self._days is not None:
+                (self._days.add if exists else self._days.discard)(day)
+
+    def overlapping(self, engine, start: datetime, end: Optional[datetime] = None,
+                    max_age: Optional[float] = None) -> List[Table]:
+        """Partitions that can hold rows with start <= time < end"""
+        return [self.table_for(day) for day in self.days(engine, max_age)
+                if day >= start.date() and (end is None or day <= end.date())]
+
+    def select(self, engine, start: datetime, end: Optional[datetime] = None,
+               columns: Optional[Iterable[str]] = None,
+               where: Optional[Callable[[Table], List]] = None, max_age: Optional[float] = None):
+        """
+        UNION ALL of `columns` (default: all) over the partitions overlapping
+        [start, end). `where(table)` returns extra clauses for one partition;
+        max_age is passed to days().
+        """
+        names = list(columns) if columns else [c.name for c in self.template.columns]
+        parts = []
+        for table in self.overlapping(engine, start, end, max_age):
+            time_col = table.c[self.time_column]
+            stmt = select(*[table.c[n] for n in names]).where(time_col >= start)
+            if end is not None:
+                stmt = stmt.where(time_col < end)
+            if where is not None:
+                stmt = stmt.where(*where(table))
+            parts.append(stmt)
+        if not parts:
+            return select(*[self.template.c[n] for n in names]).where(false())
+        return parts[0] if len(parts) == 1 else union_all(*parts)
+
+    def group_by_day(self, rows: Iterable[Dict]) -> Dict[date, List[Dict]]:
+        """Split row dicts by the partition their time column falls into"""
+        groups = defaultdict(list)
+        for row in rows:
+            groups[row[self.time_column].date()].append(row)
+        return dict(sorted(groups.items()))
+
+    def max_id_sum(self, engine, start: datetime) -> int:
+        """
+        Sum of max(id) over partitions overlapping [start, now). Ids only grow
+        within a partition, so this changes whenever any of them gets a row.
+        """
+        tables = self.overlapping(engine, start)
+        if not tables:
+            return 0
+        with engine.connect() as conn:
+            maxima = conn.execute(select(*[select(func.max(t.c.id)).scalar_subquery() for t in tables])).one()
+        return sum(m or 0 for m in maxima)
+
+    def drop_before(self, engine, cutoff: datetime) -> List[str]:
+        """
+        Drop partitions whose whole day is before cutoff. Retention is
+        day-granular: rows on cutoff's own day are kept until a later run.
+        """
+        dropped = []
+        for day in self.days(engine, max_age=0):
+            if day >= cutoff.date():
+                break
+            table = self.table_for(day)
+            with engine.begin() as conn:
+                table.drop(conn, checkfirst=True)
+            self._created.discard(day)
+            self._note(day, exists=False)
+            dropped.append(table.name)
+        return dropped
+
+    def migrate_legacy(self, engine) -> int:
+        """Move rows stored in the unpartitioned template table into partitions"""
+        template = self.template
+        time_col = template.c[self.time_column]
+        with engine.connect() as conn:
+            days = [d if isinstance(d, date) else date.fromisoformat(str(d)[:10]) for (d,) in conn.execute(
+                select(func.date(time_col)).where(time_col.isnot(None)).distinct())]
+        moved = 0
+        names = [c.name for c in template.columns]
+        for day in sorted(days):
+            table = self.ensure(engine, day)
+            start = datetime.combine(day, datetime.min.time())
+            source = select(*[template.c[n] for n in names]).where(
+                time_col >= start, time_col < start + timedelta(days=1))
+            with engine.begin() as conn:
+                moved += conn.execute(table.insert().from_select(names, source)).rowcount or 0
+        if days:
+            with engine.begin() as conn:
+                if conn.dialect.name == 'postgresql':
+                    # keep new ids above the migrated ones
+                    conn.execute(text(f"SELECT setval('{self.sequence.name}', "
+                                      f"(SELECT COALESCE(MAX(id), 1) FROM {template.name}))"))
+                conn.execute(template.delete())
+        return moved
@@ -0,0 +1,139 @@
+# response_formats.py
+"""
+Compact encodings for the heatmap and sensor endpoints.
+
+Clients pick an encoding with `?format=` or the Accept header:
+
+  json      default list-of-dicts response (unchanged)
+  columnar  JSON with one array per field instead of one object per point
+  raster    heatmap only: binary header + row-major value raster
+            (`dtype=float32` or `dtype=uint8`), decodable with a DataView
+            and a Float32Array / Uint8Array
+  arrow     sensors only: Arrow IPC stream (requires the optional pyarrow)
+
+Raster layout (little endian):
+  4s  magic b'AQGR'
+  B   dtype code (1 = float32, 2 = uint8), 3 pad bytes
+  I   rows (latitude, south -> north)
+  I   cols (longitude, west -> east)
+  d   south (latitude of row 0)
+  d   west (longitude of col 0)
+  d   step (degrees)
+  d   scale (uint8 only: value = byte * scale; 255 = no data)
+followed by rows * cols values. float32 rasters use NaN for no data.
+"""
+import struct
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+JSON_MIME = 'application/json'
+RASTER_MIME = 'application/vnd.airq.grid'
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+
+FORMAT_MIMES = {
+    'json': JSON_MIME,
+    'columnar': JSON_MIME,
+    'raster': RASTER_MIME,
+    'arrow': ARROW_MIME,
+}
+
+RASTER_MAGIC = b'AQGR'
+RASTER_HEADER = struct.Struct('<4sB3xIIdddd')
+RASTER_DTYPES = {'float32': 1, 'uint8': 2}
+UINT8_NODATA = 255
+
+
+class UnsupportedFormat(ValueError):
+    """Requested encoding is unknown or unavailable for this endpoint."""
+
+
+def negotiate_format(args, accept_mimetypes, allowed: Iterable[str]) -> str:
+    """Resolve the response format from `format=` or the Accept header."""
+    allowed = list(allowed)
+    fmt = args.get('format')
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in allowed:
+            raise UnsupportedFormat(f"Unsupported format '{fmt}'; expected one of {allowed}")
+        return fmt
+    # only binary encodings have their own mime type; anything else is JSON
+    binary = [f for f in allowed if FORMAT_MIMES[f] != JSON_MIME]
+    best = accept_mimetypes.best_match([JSON_MIME] + [FORMAT_MIMES[f] for f in binary],
+                                       default=JSON_MIME)
+    for f in binary:
+        if FORMAT_MIMES[f] == best:
+            return f
+    return 'json'
+
+
+def json_column(col) -> list:
+    """Column as a JSON-safe list; NaN becomes null."""
+    values = col.tolist() if isinstance(col, np.ndarray) else list(col)
+    return [None if v != v else v for v in values]
+
+
+def grid_to_raster(lats: np.ndarray, lons: np.ndarray, values: np.ndarray,
+                   lat_axis: np.ndarray, lon_axis: np.ndarray, step: float) -> np.ndarray:
+    """Scatter grid points onto a (len(lat_axis), len(lon_axis)) float32 raster."""
+    raster = np.full((len(lat_axis), len(lon_axis)), np.nan, dtype=np.float32)
+    if len(values) and len(lat_axis) and len(lon_axis):
+        rows = np.rint((lats - lat_axis[0]) / step).astype(np.intp)
+        cols = np.rint((lons - lon_axis[0]) / step).astype(np.intp)
+        raster[rows, cols] = values
+    return raster
+
+
+def pack_raster(raster: np.ndarray, south: float, west: float, step: float,
+                dtype: str = 'float32') -> bytes:
+    """Serialize a raster with its header (see module docstring)."""
+    if dtype not in RASTER_DTYPES:
+        raise UnsupportedFormat(f"Unsupported raster dtype '{dtype}'")
+    rows, cols = raster.shape
+    scale = 1.0
+    if dtype == 'uint8':
+        vmax = float(np.nanmax(raster)) if np.isfinite(raster).any() else 0.0
+        scale = vmax / (UINT8_NODATA - 1) if vmax > 0 else 1.0
+        with np.errstate(invalid='ignore'):
+            body = np.rint(raster / scale)
+        body = np.where(np.isnan(raster), UINT8_NODATA, body).astype(np.uint8)
+    else:
+        body = raster.astype('<f4', copy=False)
+    header = RASTER_HEADER.pack(RASTER_MAGIC, RASTER_DTYPES[dtype], rows, cols,
+                                south, west, step, scale)
+    return header + body.tobytes()
+
+
+def unpack_raster(payload: bytes):
+    """Inverse of pack_raster: returns (float32 raster with NaN, header dict)."""
+    magic, code, rows, cols, south, west, step, scale = RASTER_HEADER.unpack_from(payload)
+    if magic != RASTER_MAGIC:
+        raise ValueError('Not a grid raster payload')
+    body = payload[RASTER_HEADER.size:]
+    if code == RASTER_DTYPES['uint8']:
+        raw = np.frombuffer(body, dtype=np.uint8).reshape(rows, cols)
+        raster = np.where(raw == UINT8_NODATA, np.nan, raw * scale).astype(np.float32)
+    else:
+        raster = np.frombuffer(body, dtype='<f4').reshape(rows, cols)
+    return raster, {'south': south, 'west': west, 'step': step, 'rows': rows, 'cols': cols}
+
+
+def columns_to_arrow(columns: Dict[str, np.ndarray],
+                     dictionary_columns: Optional[Iterable[str]] = None) -> bytes:
+    """Encode equal-length columns as an Arrow IPC stream."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise UnsupportedFormat("Arrow output requires the 'pyarrow' package") from e
+    dictionary_columns = set(dictionary_columns or ())
+    arrays = {}
+    for name, col in columns.items():
+        arr = pa.array(col, from_pandas=True)  # NaN -> null
+        if name in dictionary_columns:
+            arr = arr.dictionary_encode()
+        arrays[name] = arr
+    table = pa.table(arrays)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
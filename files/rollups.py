@@ -0,0 +1,128 @@
+# rollups.py
+"""
+Hourly and daily PM aggregates per station.
+
+A station is a (source, cell) pair, where cell is the spatial_index key of
+its location. Rollup rows store count, sum, min and max instead of a mean,
+so they combine exactly: daily rows are built from hourly rows, and
+history queries can merge stations or coarser buckets without touching
+raw readings.
+
+station_values() reduces recent raw readings to one PM2.5 value per
+station (its latest reading or a time-decayed mean) for the heatmap.
+
+This module only does the DataFrame arithmetic; main.py reads and writes
+the SensorRollup table.
+"""
+from datetime import timedelta
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+HOUR = 'hour'
+DAY = 'day'
+FREQ = {HOUR: 'h', DAY: 'D'}
+STATION_KEY = ['bucket', 'source', 'cell']
+RAW_COLUMNS = ['source', 'cell', 'latitude', 'longitude', 'pm25', 'pm10', 'timestamp']
+STATION_VALUE_COLUMNS = ['source', 'cell', 'latitude', 'longitude', 'pm25', 'timestamp']
+LATEST = 'latest'
+DECAY = 'decay'
+ROLLUP_COLUMNS = ['resolution', 'bucket', 'source', 'cell', 'latitude', 'longitude', 'count',
+                  'pm25_sum', 'pm25_min', 'pm25_max', 'pm10_count', 'pm10_sum', 'pm10_min', 'pm10_max']
+
+
+def aggregate_readings(raw: pd.DataFrame, resolution: str = HOUR) -> pd.DataFrame:
+    """Rollup rows (ROLLUP_COLUMNS) from raw readings (RAW_COLUMNS)"""
+    if raw.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    raw = raw.assign(bucket=pd.to_datetime(raw['timestamp']).dt.floor(FREQ[resolution]),
+                     pm25=raw['pm25'].astype(float), pm10=raw['pm10'].astype(float))
+    out = raw.groupby(STATION_KEY, sort=False, dropna=False).agg(
+        latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+        count=('pm25', 'count'), pm25_sum=('pm25', 'sum'), pm25_min=('pm25', 'min'), pm25_max=('pm25', 'max'),
+        pm10_count=('pm10', 'count'), pm10_sum=('pm10', 'sum'), pm10_min=('pm10', 'min'), pm10_max=('pm10', 'max'),
+    ).reset_index()
+    out['resolution'] = resolution
+    return out[ROLLUP_COLUMNS]
+
+
+def combine_rollups(rollups: pd.DataFrame, resolution: str, by: Sequence[str] = STATION_KEY) -> pd.DataFrame:
+    """
+    Merge rollup rows into `resolution` buckets, grouped by `by` (e.g.
+    hourly -> daily per station, or by=['bucket'] to merge stations).
+    Coordinates become the count-weighted centroid.
+    """
+    by = list(by)
+    columns = by + [c for c in ROLLUP_COLUMNS if c not in STATION_KEY]
+    if rollups.empty:
+        return pd.DataFrame(columns=columns)
+    weighted = rollups.assign(bucket=pd.to_datetime(rollups['bucket']).dt.floor(FREQ[resolution]),
+                              lat_w=rollups['latitude'] * rollups['count'],
+                              lon_w=rollups['longitude'] * rollups['count'])
+    out = weighted.groupby(by, sort=True, dropna=False).agg(
+        count=('count', 'sum'), lat_w=('lat_w', 'sum'), lon_w=('lon_w', 'sum'),
+        pm25_sum=('pm25_sum', 'sum'), pm25_min=('pm25_min', 'min'), pm25_max=('pm25_max', 'max'),
+        pm10_count=('pm10_count', 'sum'), pm10_sum=('pm10_sum', 'sum'),
+        pm10_min=('pm10_min', 'min'), pm10_max=('pm10_max', 'max'),
+    ).reset_index()
+    out['latitude'] = out.pop('lat_w') / out['count']
+    out['longitude'] = out.pop('lon_w') / out['count']
+    out['resolution'] = resolution
+    return out[columns]
+
+
+def with_means(rollups: pd.DataFrame) -> pd.DataFrame:
+    """Add pm25_mean / pm10_mean (NaN where a bucket has no values)"""
+    count = rollups['count'].astype(float)
+    pm10_count = rollups['pm10_count'].astype(float)
+    return rollups.assign(
+        pm25_mean=np.where(count > 0, rollups['pm25_sum'] / count.where(count > 0, 1), np.nan),
+        pm10_mean=np.where(pm10_count > 0, rollups['pm10_sum'] / pm10_count.where(pm10_count > 0, 1), np.nan),
+    )
+
+
+def station_values(raw: pd.DataFrame, mode: str = DECAY,
+                   half_life: timedelta = timedelta(hours=1)) -> pd.DataFrame:
+    """
+    One PM2.5 value per station (source, cell) from raw readings
+    (STATION_VALUE_COLUMNS): its latest reading (LATEST), or the mean of its
+    readings weighted by 0.5 ** (age / half_life) (DECAY). Stations are placed
+    at their latest reading's coordinates, so the station set, and with it
+    the interpolation caches, stays stable between ingests.
+    Returns source, cell, latitude, longitude, pm25, readings, timestamp (latest).
+    """
+    if mode not in (LATEST, DECAY):
+        raise ValueError(f"Unknown station value mode '{mode}' (expected '{LATEST}' or '{DECAY}')")
+    columns = ['source', 'cell', 'latitude', 'longitude', 'pm25', 'readings', 'timestamp']
+    raw = raw[raw['pm25'].notna()]
+    if raw.empty:
+        return pd.DataFrame(columns=columns)
+    times = raw['timestamp'].to_numpy(dtype='datetime64[ns]')
+    pm25 = raw['pm25'].to_numpy(dtype=float)
+    group = raw.groupby(['source', 'cell'], sort=False, dropna=False).ngroup().to_numpy()
+    # rows by (station, time); the last row of each station is its latest reading
+    order = np.lexsort((times, group))
+    last = order[np.append(group[order][1:] != group[order][:-1], True)]
+    counts = np.bincount(group)
+    out = raw.iloc[last].assign(timestamp=times[last], readings=counts)
+    if mode == DECAY:
+        # ages relative to the newest reading; only the ratios of the weights matter
+        weight = np.exp2(-((times.max() - times) / np.timedelta64(half_life)))
+        out['pm25'] = np.bincount(group, weight * pm25) / np.bincount(group, weight)
+    else:
+        out['pm25'] = pm25[last]
+    return out[columns].reset_index(drop=True)
+
+
+def hour_buckets(timestamps) -> List[pd.Timestamp]:
+    """Distinct hour bucket starts of the given timestamps, sorted"""
+    return sorted(set(pd.to_datetime(pd.Series(list(timestamps))).dt.floor('h')))
+
+
+def to_records(rollups: pd.DataFrame) -> List[dict]:
+    """Row dicts for insertion: NaN -> None, pandas/numpy scalars -> Python"""
+    records = rollups.astype(object).where(rollups.notna(), None).to_dict('records')
+    for record in records:
+        record['bucket'] = pd.Timestamp(record['bucket']).to_pydatetime()
+    return records
@@ -1,7 +1,7 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import atexit
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,25 +47,32 @@ class DataScheduler:
                 logger.error(f"Background fetch failed: {e}")
     
     def cleanup_old_data(self):
-        """Clean up old sensor readings and user reports"""
+        """Drop expired sensor/report partitions and hourly rollups"""
         with self.app.app_context():
             try:
-                from main import db, SensorReading, UserReport
+                from main import db, sensor_partitions, report_partitions, SensorIngest, SensorRollup
+                from config import Config
                 
-                # Clean old sensor readings (> 7 days)
-                cutoff_sensors = datetime.utcnow() - timedelta(days=7)
-                old_sensors = SensorReading.query.filter(
-                    SensorReading.timestamp < cutoff_sensors
-                ).delete()
+                # Drop sensor reading partitions (> 7 days)
+                cutoff_sensors = datetime.utcnow() - Config.SENSOR_DATA_RETENTION
+                old_sensors = sensor_partitions.drop_before(db.engine, cutoff_sensors)
+                # ingest records are only needed while their readings are kept
+                SensorIngest.query.filter(SensorIngest.started_at < cutoff_sensors).delete()
                 
-                # Clean old user reports (> 30 days)
-                cutoff_reports = datetime.utcnow() - timedelta(days=30)
-                old_reports = UserReport.query.filter(
-                    UserReport.timestamp < cutoff_reports
-                ).delete()
+                # Drop user report partitions (> 30 days)
+                cutoff_reports = datetime.utcnow() - Config.USER_REPORT_RETENTION
+                old_reports = report_partitions.drop_before(db.engine, cutoff_reports)
                 
+                # Hourly rollups (> 90 days); daily rollups are kept
+                cutoff_rollups = datetime.utcnow() - Config.ROLLUP_HOURLY_RETENTION
+                old_rollups = SensorRollup.query.filter(
+                    SensorRollup.resolution == 'hour',
+                    SensorRollup.bucket < cutoff_rollups
+                ).delete()
                 db.session.commit()
-                logger.info(f"Cleanup completed: {old_sensors} sensors, {old_reports} reports removed")
+                
+                logger.info(f"Cleanup completed: dropped {len(old_sensors)} sensor and "
+                            f"{len(old_reports)} report partitions, {old_rollups} hourly rollups")
                 
             except Exception as e:
-                logger.error(f"Cleanup failed: {e}")
\ No newline at end of file
+                logger.error(f"Cleanup failed: {e}")
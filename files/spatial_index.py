@@ -0,0 +1,90 @@
+# spatial_index.py
+"""
+Hierarchical grid cell ids for bounding-box queries on plain SQL indexes.
+
+A location maps to a Z-order (Morton) key: latitude and longitude are
+quantized to CELL_LEVEL bits each (~0.0027 deg lat x 0.0055 deg lon at
+level 16), and the bits are interleaved into one integer. Any prefix of the
+key is a coarser quadtree cell, so every cell at a coarser level is a
+contiguous integer range of keys. A bounding box is covered by at most
+`max_ranges` such ranges; each becomes a `cell BETWEEN lo AND hi`
+index range scan, and an exact lat/lon filter removes the over-coverage
+at the edges.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+CELL_LEVEL = 16
+_MASKS = (
+    (np.uint64(16), np.uint64(0x0000FFFF0000FFFF)),
+    (np.uint64(8), np.uint64(0x00FF00FF00FF00FF)),
+    (np.uint64(4), np.uint64(0x0F0F0F0F0F0F0F0F)),
+    (np.uint64(2), np.uint64(0x3333333333333333)),
+    (np.uint64(1), np.uint64(0x5555555555555555)),
+)
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 32 bits of v."""
+    v = v.astype(np.uint64)
+    for shift, mask in _MASKS:
+        v = (v | (v << shift)) & mask
+    return v
+
+
+def _quantize(lat, lon, level: int = CELL_LEVEL) -> Tuple[np.ndarray, np.ndarray]:
+    n = 1 << level
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    iy = np.clip(np.floor((lat + 90.0) / 180.0 * n), 0, n - 1).astype(np.int64)
+    ix = np.clip(np.floor((lon + 180.0) / 360.0 * n), 0, n - 1).astype(np.int64)
+    return iy, ix
+
+
+def _interleave(iy, ix) -> np.ndarray:
+    return (_spread_bits(np.asarray(ix)) | (_spread_bits(np.asarray(iy)) << np.uint64(1))).astype(np.int64)
+
+
+def cell_id(lat, lon, level: int = CELL_LEVEL):
+    """Cell key for scalar or array lat/lon (int for scalars, int64 array otherwise)."""
+    keys = _interleave(*_quantize(lat, lon, level))
+    return int(keys) if keys.ndim == 0 else keys
+
+
+def covering_ranges(bounds: Dict[str, float], max_ranges: int = 32,
+                    level: int = CELL_LEVEL) -> List[Tuple[int, int]]:
+    """
+    Inclusive (lo, hi) key ranges whose union contains every cell inside bounds.
+
+    Uses the finest quadtree level at which the cells intersecting the box
+    number at most max_ranges, then merges ranges that touch.
+    """
+    y0, x0 = _quantize(bounds['south'], bounds['west'], level)
+    y1, x1 = _quantize(bounds['north'], bounds['east'], level)
+    y0, y1 = int(min(y0, y1)), int(max(y0, y1))
+    x0, x1 = int(x0), int(x1)
+    if x0 > x1:
+        # box crosses the antimeridian: cover both sides
+        west = dict(bounds, east=180.0)
+        east = dict(bounds, west=-180.0)
+        half = max(1, max_ranges // 2)
+        return sorted(covering_ranges(west, half, level) + covering_ranges(east, half, level))
+
+    shift = 0
+    while shift < level and ((y1 >> shift) - (y0 >> shift) + 1) * ((x1 >> shift) - (x0 >> shift) + 1) > max_ranges:
+        shift += 1
+    ys = np.arange(y0 >> shift, (y1 >> shift) + 1)
+    xs = np.arange(x0 >> shift, (x1 >> shift) + 1)
+    gy, gx = np.meshgrid(ys, xs, indexing='ij')
+    prefixes = np.sort(_interleave(gy.ravel(), gx.ravel()))
+    width = 1 << (2 * shift)
+
+    ranges: List[Tuple[int, int]] = []
+    for p in prefixes.tolist():
+        lo, hi = p * width, (p + 1) * width - 1
+        if ranges and ranges[-1][1] + 1 == lo:
+            ranges[-1] = (ranges[-1][0], hi)
+        else:
+            ranges.append((lo, hi))
+    return ranges
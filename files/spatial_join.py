@@ -0,0 +1,110 @@
+# spatial_join.py
+"""
+Vectorized spatio-temporal nearest-match join.
+
+Each left row (e.g. a sensor reading) is matched to the closest right row
+(e.g. a pollen label) that lies within `radius_km` on the sphere and
+within `tolerance` in time. Right rows are bucketed by time into buckets
+`tolerance` wide, so a left row can only match the right rows in its own
+bucket or the two neighbouring ones. For each bucket, one KD-tree over
+unit-sphere coordinates finds all candidate pairs inside the chord radius.
+The time check and the choice of best match are then array operations
+over all pairs.
+
+Among candidates, the best match has the smallest distance / radius_km +
+|time difference| / tolerance; ties go to the lower right index.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088  # mean Earth radius (IUGG)
+
+
+def latlon_to_unit_xyz(lat, lon) -> np.ndarray:
+    """Project degree lat/lon arrays onto the unit sphere as (N, 3) xyz."""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2.0, 1.0))
+
+
+def km_to_chord(km: float) -> float:
+    return 2.0 * np.sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+def match_nearest(left_lat, left_lon, left_time, right_lat, right_lon, right_time,
+                  radius_km: float, tolerance: pd.Timedelta
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Best right match for every left row that has one.
+    Returns (left_idx, right_idx, distance_km, time_delta_seconds), sorted by left_idx.
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    if len(left_lat) == 0 or len(right_lat) == 0:
+        return empty
+    tol_ns = int(pd.Timedelta(tolerance).value)
+    lt = pd.to_datetime(pd.Series(left_time)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    rt = pd.to_datetime(pd.Series(right_time)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    lxyz = latlon_to_unit_xyz(np.asarray(left_lat, dtype=float), np.asarray(left_lon, dtype=float))
+    rxyz = latlon_to_unit_xyz(np.asarray(right_lat, dtype=float), np.asarray(right_lon, dtype=float))
+    chord = km_to_chord(radius_km)
+
+    lb = lt // max(tol_ns, 1)
+    rb = rt // max(tol_ns, 1)
+    l_order = np.argsort(lb, kind='stable')
+    l_sorted = lb[l_order]
+    r_order = np.argsort(rb, kind='stable')
+    buckets, r_starts = np.unique(rb[r_order], return_index=True)
+    r_ends = np.append(r_starts[1:], len(r_order))
+    pairs_l, pairs_r, pairs_d = [], [], []
+    for bucket, r_lo, r_hi in zip(buckets.tolist(), r_starts.tolist(), r_ends.tolist()):
+        r_idx = r_order[r_lo:r_hi]
+        lo, hi = np.searchsorted(l_sorted, [bucket - 1, bucket + 2])
+        if lo == hi:
+            continue
+        l_idx = l_order[lo:hi]
+        found = cKDTree(lxyz[l_idx]).sparse_distance_matrix(cKDTree(rxyz[r_idx]), chord, output_type='ndarray')
+        pairs_l.append(l_idx[found['i']])
+        pairs_r.append(r_idx[found['j']])
+        pairs_d.append(found['v'])
+    if not pairs_l:
+        return empty
+    li = np.concatenate(pairs_l)
+    ri = np.concatenate(pairs_r)
+    dist_km = chord_to_km(np.concatenate(pairs_d))
+    dt = rt[ri] - lt[li]
+    keep = np.abs(dt) <= tol_ns
+    li, ri, dist_km, dt = li[keep], ri[keep], dist_km[keep], dt[keep]
+    if len(li) == 0:
+        return empty
+
+    score = dist_km / radius_km + np.abs(dt) / max(tol_ns, 1)
+    order = np.lexsort((ri, score, li))
+    li, ri, dist_km, dt = li[order], ri[order], dist_km[order], dt[order]
+    first = np.ones(len(li), dtype=bool)
+    first[1:] = li[1:] != li[:-1]
+    return li[first], ri[first], dist_km[first], dt[first] / 1e9
+
+
+def spatiotemporal_join(left: pd.DataFrame, right: pd.DataFrame, radius_km: float,
+                        tolerance: pd.Timedelta, right_columns: Sequence[str],
+                        lat: str = 'lat', lon: str = 'lon', time: str = 'timestamp') -> pd.DataFrame:
+    """
+    Left rows that have a match, with the matched right row's `right_columns`
+    plus `match_distance_km` and `match_lag_seconds` (right time - left time).
+    """
+    li, ri, dist_km, lag = match_nearest(left[lat], left[lon], left[time],
+                                         right[lat], right[lon], right[time], radius_km, tolerance)
+    out = left.iloc[li].reset_index(drop=True)
+    for name in right_columns:
+        out[name] = right[name].to_numpy()[ri]
+    out['match_distance_km'] = dist_km
+    out['match_lag_seconds'] = lag
+    return out
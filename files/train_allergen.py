@@ -1,43 +1,48 @@
 # train_allergen.py
 import os
 import pickle
+import shutil
+import tempfile
+import time
 from datetime import datetime, timedelta, date
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from main import db, SensorReading, AllergenReading, PollenForecast, app, OpenAQClient
+from sqlalchemy import insert
+from main import (
+    db, PollenForecast, app, OpenAQClient,
+    begin_forecast_run, activate_forecast_run, fail_forecast_run, collect_forecast_garbage,
+    forecast_store, model_registry
+)
+from spatial_index import cell_id
+from spatial_join import spatiotemporal_join
+from config import Config
+from training_data import LABEL_COLUMNS, SENSOR_COLUMNS, concat_chunks, label_chunks, sensor_chunks
 import joblib
+from forecast_engine import PREDICT_CHUNK_SIZE, grid_axes, iter_forecast_tiles
 import logging
 
 logger = logging.getLogger(__name__)
 
+# single-pickle checkpoint written before the model registry; only read as a fallback
 MODEL_PATH = os.environ.get('ALLERGEN_MODEL_PATH', 'models/allergen_rf.pkl')
+FULL = 'full'
+INCREMENTAL = 'incremental'
 
-def load_training_data(days_back=365):
+def load_training_data(days_back=365, start=None, end=None):
     """
     Build training dataframe from AllergenReading (if available) and sensor/weather features.
     If no AllergenReading labels exist, build weak-labels from seasonality+user reports.
+    The window is [start, end) when given, else the last `days_back` days.
     """
-    cutoff = datetime.utcnow() - timedelta(days=days_back)
-    # Fetch sensor readings
-    sensors = SensorReading.query.filter(SensorReading.timestamp >= cutoff).all()
-    df_sensors = pd.DataFrame([{
-        'lat': s.latitude, 'lon': s.longitude,
-        'pm25': s.pm25 or np.nan,
-        'pm10': s.pm10 or np.nan,
-        'timestamp': s.timestamp,
-    } for s in sensors])
-    # fetch allergen readings (labels)
-    allergen_rows = AllergenReading.query.filter(AllergenReading.timestamp >= cutoff).all()
-    if allergen_rows:
-        df_labels = pd.DataFrame([{
-            'lat': a.latitude, 'lon': a.longitude,
-            'pollen_index': a.pollen_index,
-            'timestamp': a.timestamp
-        } for a in allergen_rows])
-    else:
-        df_labels = pd.DataFrame()
-    # merge sensors + labels by nearest timestamp and location (here we do join on rounded lat/lon & date)
+    cutoff = start or datetime.utcnow() - timedelta(days=days_back)
+    # Per-station means from the sensor rollups (raw readings are only kept for days):
+    # hourly, and daily before the hourly rollups' retention
+    df_sensors = concat_chunks(sensor_chunks(cutoff, end), SENSOR_COLUMNS)
+    # allergen readings (labels), padded by the join tolerance so edge readings can match
+    tolerance = Config.LABEL_JOIN_TOLERANCE
+    df_labels = concat_chunks(label_chunks(cutoff - tolerance, end + tolerance if end else None), LABEL_COLUMNS)
+    # attach to each sensor reading the nearest label in space and time (see spatial_join.py)
     if df_labels.empty:
         # create weak labels: seasonality + PM2.5 proxy + user reports (not implemented: fallback to seasonal baseline)
         # For now, create dataset by sampling sensor points and computing a seasonal proxy:
@@ -48,11 +53,8 @@ def load_training_data(days_back=365):
         df = df.rename(columns={'timestamp':'ts'})
         return df
     else:
-        # naive spatial-temporal join
-        df = pd.merge_asof(df_sensors.sort_values('timestamp'),
-                           df_labels.sort_values('timestamp'),
-                           left_on='timestamp', right_on='timestamp', direction='nearest', tolerance=pd.Timedelta('6h'))
-        df = df.dropna(subset=['pollen_index'])
+        df = spatiotemporal_join(df_sensors, df_labels, radius_km=Config.LABEL_JOIN_RADIUS_KM,
+                                 tolerance=tolerance, right_columns=['pollen_index'])
         df['dayofyear'] = df['timestamp'].dt.dayofyear
         return df
 
@@ -72,51 +74,194 @@ def featurize(df):
         X['hour_cos'] = np.cos(2*np.pi*hours/24.0)
     return X
 
-def train_and_persist():
-    with app.app_context():
-        df = load_training_data()
-        if df.empty:
-            logger.error("No training data found")
-            return
-        X = featurize(df)
-        y = df['pollen_index']
+def split_validation(df, fraction):
+    """
+    Hold out the newest `fraction` of rows (by time) for validation.
+    Returns (train, valid, split_time); train rows are strictly older than split_time.
+    """
+    ts = df['timestamp' if 'timestamp' in df.columns else 'ts']
+    if len(df) < 2 or fraction <= 0:
+        return df, df.iloc[:0], ts.max() + timedelta(microseconds=1)
+    split_time = ts.sort_values().iloc[min(len(df) - 1, int(len(df) * (1 - fraction)))]
+    return df[ts < split_time], df[ts >= split_time], split_time
+
+def fit_forest(X, y, model=None, add_trees=None, max_trees=None):
+    """
+    Without `model`: fit a new forest. With `model`: warm-start it, growing
+    `add_trees` trees on (X, y) only, then drop the oldest trees beyond `max_trees`.
+    """
+    if model is None:
         model = RandomForestRegressor(n_estimators=100, n_jobs=-1, random_state=42)
         model.fit(X.values, y.values)
-        os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-        joblib.dump({'model': model}, MODEL_PATH)
-        logger.info(f"Saved allergen model to {MODEL_PATH}")
-        # produce short term forecast for next 3 days for grid of sensors
-        produce_forecast(model)
         return model
+    add_trees = add_trees or Config.INCREMENTAL_TREES
+    max_trees = max_trees or Config.MODEL_MAX_TREES
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + add_trees, n_jobs=-1)
+    model.fit(X.values, y.values)
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+    return model
+
+def evaluate(model, X, y):
+    """Validation MAE / RMSE (None without validation rows)"""
+    if len(X) == 0:
+        return {'val_rows': 0, 'val_mae': None, 'val_rmse': None}
+    err = model.predict(X.values) - y.values
+    return {'val_rows': int(len(X)), 'val_mae': float(np.mean(np.abs(err))),
+            'val_rmse': float(np.sqrt(np.mean(err ** 2)))}
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def load_checkpoint():
+    """
+    The current registry version as a training payload ({'model', 'watermark', ...}),
+    falling back to a legacy pickle at MODEL_PATH; None if neither exists
+    """
+    current = model_registry.load()
+    if current is None:
+        if not os.path.exists(MODEL_PATH):
+            return None
+        payload = joblib.load(MODEL_PATH)
+        return payload if isinstance(payload, dict) else {'model': payload}
+    meta = current.meta
+    return {'model': current.model, 'version': current.version, 'model_path': current.path,
+            'watermark': _as_datetime(meta.get('watermark')), 'window_start': _as_datetime(meta.get('window_start')),
+            'features': meta.get('features'), 'metrics': meta.get('metrics')}
 
-def produce_forecast(model, days=3, grid_step=0.25):
+def train_model(mode=None):
+    """
+    Train the allergen model and publish it as a new model_registry version.
+
+    'full' fits a new forest on the last TRAINING_WINDOW_DAYS days.
+    'incremental' loads the checkpoint and adds trees fitted only on data
+    since its watermark; it falls back to full when there is no usable
+    checkpoint. Data is read up to the last complete hour, the newest
+    TRAINING_VALIDATION_FRACTION of it is held out for validation, and
+    the watermark is set to the start of that held-out slice so the next
+    incremental run trains on it.
+    Returns the checkpoint payload with 'metrics', or None without data.
+    """
+    mode = mode or Config.TRAINING_MODE
+    if mode not in (FULL, INCREMENTAL):
+        raise ValueError(f"Unknown training mode {mode!r}")
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    window_start = end - timedelta(days=Config.TRAINING_WINDOW_DAYS)
+    checkpoint = load_checkpoint() if mode == INCREMENTAL else None
+    if mode == INCREMENTAL:
+        reason = None
+        if checkpoint is None or checkpoint.get('watermark') is None:
+            reason = 'no checkpoint'
+        elif not hasattr(checkpoint['model'], 'estimators_'):
+            reason = 'checkpoint is not a forest'
+        elif checkpoint['watermark'] < window_start:
+            reason = 'checkpoint older than the training window'
+        if reason:
+            logger.info(f"Incremental training falls back to full retrain: {reason}")
+            mode, checkpoint = FULL, None
+
+    started = time.perf_counter()
+    start = checkpoint['watermark'] if checkpoint else window_start
+    df = load_training_data(start=start, end=end)
+    if df.empty:
+        if checkpoint:
+            logger.info(f"No new training data since {start}; keeping the current model")
+            return dict(checkpoint, metrics=dict(checkpoint.get('metrics') or {}, mode=mode, train_rows=0))
+        logger.error("No training data found")
+        return None
+    train, valid, split_time = split_validation(df, Config.TRAINING_VALIDATION_FRACTION)
+    if train.empty:
+        train, valid, split_time = df, df.iloc[:0], end
+    X = featurize(train)
+    if checkpoint and checkpoint.get('features') not in (None, list(X.columns)):
+        logger.info("Feature set changed; falling back to full retrain")
+        return train_model(FULL)
+    model = fit_forest(X, train['pollen_index'], model=checkpoint['model'] if checkpoint else None)
+    fit_seconds = time.perf_counter() - started
+    metrics = dict(evaluate(model, featurize(valid), valid['pollen_index']), mode=mode,
+                   train_rows=int(len(train)), trees=len(model.estimators_),
+                   train_seconds=round(fit_seconds, 3))
+    meta = {'watermark': pd.Timestamp(split_time).to_pydatetime(), 'features': list(X.columns),
+            'window_start': (checkpoint or {}).get('window_start') or start,
+            'trained_at': datetime.utcnow(), 'parent': (checkpoint or {}).get('version'), 'metrics': metrics}
+    version = model_registry.publish(model, meta)
+    logger.info(f"Published allergen model {version} ({mode}: {metrics['train_rows']} rows in "
+                f"{fit_seconds:.2f}s, {metrics['trees']} trees, validation MAE {metrics['val_mae']})")
+    return dict(meta, model=model, version=version, model_path=model_registry.model_path(version))
+
+def train_and_persist(mode=None):
+    """Train (see train_model), then regenerate the pollen forecast; returns the checkpoint payload"""
+    with app.app_context():
+        payload = train_model(mode)
+        if payload is None:
+            return None
+        # produce short term forecast for next 3 days for grid of sensors
+        produce_forecast(payload['model'], model_path=payload.get('model_path'),
+                         model_version=payload.get('version') or 'v1')
+        return payload
+
+INSERT_BATCH_SIZE = 5000
+
+def produce_forecast(model, days=3, grid_step=0.25, chunk_size=PREDICT_CHUNK_SIZE,
+                     workers=None, tile_deg=None, model_path=None, model_version='v1'):
+    """
+    Predict the pollen grid for `days` days and persist it tile by tile.
+    With workers > 1 tiles are predicted on a process pool that memory-maps
+    the model from `model_path` (the model is dumped to a temporary file if
+    no path is given).
+    Rows are written as a new ForecastRun which replaces the active run
+    only once complete; superseded runs are then garbage-collected.
+    """
     # Build prediction grid from INDIA_BOUNDS (from config or default)
     from config import Config
-    bounds = Config.INDIA_BOUNDS
-    lats = np.arange(bounds['south'], bounds['north'], grid_step)
-    lons = np.arange(bounds['west'], bounds['east'], grid_step)
+    workers = workers or Config.FORECAST_WORKERS
+    tile_deg = tile_deg or Config.FORECAST_TILE_DEG
+    lats, lons = grid_axes(Config.INDIA_BOUNDS, grid_step)
     today = datetime.utcnow().date()
-    preds = []
-    for d in range(days):
-        target_date = today + timedelta(days=d)
-        dayofyear = target_date.timetuple().tm_yday
-        for lat in lats:
-            for lon in lons:
-                X = pd.DataFrame([{
-                    'lat': lat,
-                    'lon': lon,
-                    'pm25': 50,  # baseline — in production use forecasted PM2.5 from dispersion model
-                    'pm10': 50,
-                    'dayofyear_sin': np.sin(2*np.pi*dayofyear/365.0),
-                    'dayofyear_cos': np.cos(2*np.pi*dayofyear/365.0),
-                    'hour_sin': 0.0, 'hour_cos': 1.0
-                }])
-                val = model.predict(X.values)[0]
-                preds.append({'lat': float(lat), 'lon': float(lon), 'date': target_date, 'val': float(max(0, min(100, val)))})
-    # persist top-level forecasts (coarse)
-    # Delete existing forecasts for date range
-    for p in preds:
-        pf = PollenForecast(lat=p['lat'], lon=p['lon'], date=p['date'], pollen_index=p['val'], pollen_type='general', model_version='v1')
-        db.session.add(pf)
-    db.session.commit()
-    logger.info(f"Produced {len(preds)} pollen forecast points")
+    dates = [today + timedelta(days=d) for d in range(days)]
+    daysofyear = [target_date.timetuple().tm_yday for target_date in dates]
+
+    tmpdir = None
+    if workers > 1 and model_path is None:
+        tmpdir = tempfile.mkdtemp(prefix='allergen_model_')
+        model_path = os.path.join(tmpdir, 'model.pkl')
+        joblib.dump({'model': model}, model_path)
+
+    # persist top-level forecasts (coarse) as a new generation
+    run_id = begin_forecast_run(model_version)
+    stmt = insert(PollenForecast.__table__)
+    started = time.perf_counter()
+    total = 0
+    # dense copy of the run for forecast_store, filled tile by tile
+    grid_values = np.empty((len(dates), len(lats), len(lons)), dtype=np.float32)
+    try:
+        tiles = iter_forecast_tiles(lats, lons, daysofyear, model=model, model_path=model_path,
+                                    workers=workers, tile_cells=max(1, int(round(tile_deg / grid_step))),
+                                    chunk_size=chunk_size)
+        for (r0, r1, c0, c1), values in tiles:
+            grid_values[:, r0:r1, c0:c1] = values
+            lat_grid, lon_grid = np.meshgrid(lats[r0:r1], lons[c0:c1], indexing='ij')
+            cell_col = cell_id(lat_grid.ravel(), lon_grid.ravel()).tolist()
+            lat_col, lon_col = lat_grid.ravel().tolist(), lon_grid.ravel().tolist()
+            rows = [{'lat': lat, 'lon': lon, 'cell': cell, 'date': target_date, 'pollen_index': val,
+                     'pollen_type': 'general', 'model_version': model_version, 'run_id': run_id}
+                    for target_date, day_values in zip(dates, values)
+                    for lat, lon, cell, val in zip(lat_col, lon_col, cell_col, day_values.ravel().tolist())]
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                db.session.execute(stmt, rows[start:start + INSERT_BATCH_SIZE])
+            total += len(rows)
+        db.session.commit()
+        forecast_store.write(run_id, grid_values, lats[0], lons[0], grid_step, dates, model_version)
+        activate_forecast_run(run_id, total)
+    except Exception:
+        fail_forecast_run(run_id)
+        raise
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    seconds = time.perf_counter() - started
+    removed = collect_forecast_garbage()
+    logger.info(f"Produced {total} pollen forecast points (run {run_id}) in {seconds:.2f}s "
+                f"({total / max(seconds, 1e-9):,.0f} cells/s, {workers} workers); "
+                f"removed {removed} superseded rows")
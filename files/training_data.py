@@ -0,0 +1,104 @@
+# training_data.py
+"""
+Columnar, chunked readers for model training data.
+
+Rows are read with pandas.read_sql straight into DataFrames, without ORM
+objects or intermediate dicts. Only the columns training needs are
+selected, and rows come back in chunks of `chunksize` so callers can train
+incrementally without holding the whole window in memory. Floats are
+downcast to float32 and repeated strings (source, pollen type) become
+categoricals. On PostgreSQL the query runs on a server-side cursor.
+
+Sensor features come from the hourly rollups. Hourly rollups are only kept for
+ROLLUP_HOURLY_RETENTION, so days older than that are read from the daily
+rollups instead.
+"""
+from datetime import datetime, time, timedelta
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import and_, case, or_, select
+
+from config import Config
+from main import db, AllergenReading, SensorRollup
+from rollups import DAY, HOUR
+
+SENSOR_COLUMNS = ['lat', 'lon', 'pm25', 'pm10', 'timestamp', 'source']
+LABEL_COLUMNS = ['lat', 'lon', 'pollen_index', 'timestamp']
+
+
+def read_chunks(stmt, chunksize: int, float_columns: Sequence[str] = (),
+                category_columns: Sequence[str] = ()) -> Iterator[pd.DataFrame]:
+    """Execute stmt and yield DataFrames of up to chunksize rows with downcast dtypes"""
+    with db.engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        for chunk in pd.read_sql(stmt, conn, chunksize=chunksize):
+            for name in float_columns:
+                chunk[name] = pd.to_numeric(chunk[name], errors='coerce').astype(np.float32)
+            for name in category_columns:
+                chunk[name] = chunk[name].astype('category')
+            if 'timestamp' in chunk:
+                chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+            yield chunk
+
+
+def hourly_rollups_from(now: Optional[datetime] = None) -> datetime:
+    """Midnight from which hourly rollups are complete (cleanup keeps ROLLUP_HOURLY_RETENTION)"""
+    oldest = (now or datetime.utcnow()) - Config.ROLLUP_HOURLY_RETENTION
+    return datetime.combine(oldest.date() + timedelta(days=1), time.min)
+
+
+def sensor_chunks(start: datetime, end: Optional[datetime] = None,
+                  chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Per-station PM means from the sensor rollups, oldest first: hourly
+    rows, and daily rows for the days before hourly_rollups_from(). A daily
+    row is stamped at midday, so the label join pairs it with labels from
+    that day.
+    """
+    t = SensorRollup.__table__
+    hourly_from = hourly_rollups_from()
+    stmt = select(
+        t.c.latitude.label('lat'), t.c.longitude.label('lon'),
+        (t.c.pm25_sum / t.c.count).label('pm25'),
+        case((t.c.pm10_count > 0, t.c.pm10_sum / t.c.pm10_count), else_=None).label('pm10'),
+        t.c.bucket.label('timestamp'), t.c.source, t.c.resolution,
+    ).where(t.c.bucket >= start, or_(and_(t.c.resolution == HOUR, t.c.bucket >= hourly_from),
+                                     and_(t.c.resolution == DAY, t.c.bucket < hourly_from)))
+    if end is not None:
+        stmt = stmt.where(t.c.bucket < end)
+    chunks = read_chunks(stmt.order_by(t.c.bucket), chunksize or Config.TRAINING_CHUNK_SIZE,
+                         float_columns=('lat', 'lon', 'pm25', 'pm10'), category_columns=('source',))
+    for chunk in chunks:
+        daily = (chunk.pop('resolution') == DAY).to_numpy()
+        if daily.any():
+            chunk.loc[daily, 'timestamp'] += pd.Timedelta(hours=12)
+        yield chunk
+
+
+def label_chunks(start: datetime, end: Optional[datetime] = None,
+                 chunksize: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Allergen readings (pollen labels), oldest first"""
+    t = AllergenReading.__table__
+    stmt = select(
+        t.c.latitude.label('lat'), t.c.longitude.label('lon'), t.c.pollen_index, t.c.timestamp,
+    ).where(t.c.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(t.c.timestamp < end)
+    return read_chunks(stmt.order_by(t.c.timestamp), chunksize or Config.TRAINING_CHUNK_SIZE,
+                       float_columns=('lat', 'lon', 'pollen_index'))
+
+
+def concat_chunks(chunks: Iterable[pd.DataFrame], columns: Sequence[str] = ()) -> pd.DataFrame:
+    """One DataFrame from chunks, keeping categoricals (categories are unioned)"""
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    for name in frames[0].columns:
+        if isinstance(frames[0][name].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([f[name] for f in frames], ignore_order=True).categories
+            for f in frames:
+                f[name] = f[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)